@@ -1,15 +1,20 @@
 import asyncio
 import logging
-from collections.abc import AsyncIterable
+import os
+import re
+import time
+from collections.abc import AsyncIterable, Awaitable
 from datetime import UTC, datetime
+from functools import partial
 from pathlib import Path
 from random import random
+from typing import Any, TypeVar
 from uuid import uuid4
 
+import httpx
 from dotenv import load_dotenv
-from jinja2 import Environment, FileSystemLoader
 from langfuse import Langfuse
-from langfuse.client import StatefulClient
+from livekit import rtc
 from livekit.agents import (
     Agent,
     AgentSession,
@@ -17,14 +22,17 @@ from livekit.agents import (
     ChatMessage,
     FunctionTool,
     JobContext,
+    JobProcess,
     ModelSettings,
     RoomInputOptions,
     RunContext,
+    StopResponse,
     WorkerOptions,
     cli,
     function_tool,
     get_job_context,
     llm,
+    stt,
 )
 from livekit.api import DeleteRoomRequest
 from livekit.plugins import (
@@ -34,74 +42,441 @@ from livekit.plugins import (
     silero,
 )
 from livekit.plugins.turn_detector.english import EnglishModel
-
-from services.customer_service import CustomerService
+from openai import AsyncClient
+
+from services.adaptive_endpointing import AdaptiveEndpointing
+from services.audio_cache import (
+    AudioCache,
+    cache_key,
+    iter_frames,
+    normalize_phrase,
+    synthesize_frames,
+    voice_fingerprint,
+)
+from services.call_metadata import decode_customer_context
+from services.context_window import ContextWindow
+from services.customer_service import (
+    CALL_HISTORY_IN_MEMORY,
+    SEED_DEMO_DATA,
+    CustomerService,
+    appointment_hold_seconds,
+)
+from services.latency_metrics import (
+    TurnLatency,
+    mark_process_dead,
+    start_metrics_server,
+)
+from services.reservations import Hold
+from services.speculative_llm import SpeculativeGeneration
+from services.template_registry import TemplateRegistry
+from services.trace_exporter import TraceExporter
+from services.voicemail_detector import (
+    DEFAULT_VOICEMAIL_PHRASES,
+    VoicemailDetector,
+    load_phrases,
+)
+from services.worker_load import WorkerLoad
 
 logger = logging.getLogger("customer_service_agent")
 logger.setLevel(logging.INFO)
 
 load_dotenv()
 
+T = TypeVar("T")
+
 _langfuse = Langfuse()
+# All tracing goes through this exporter so Langfuse never runs on the audio path
+_trace_exporter = TraceExporter(_langfuse)
 
 # Setup Jinja2 environment for templates
 template_dir = Path(__file__).parent / "prompts"
-jinja_env = Environment(loader=FileSystemLoader(template_dir))
 
+# Opt-in cache of pre-synthesized greeting audio
+GREETING_AUDIO_CACHE = os.getenv("GREETING_AUDIO_CACHE", "").lower() in ("1", "true")
+greeting_cache_dir = Path(
+    os.getenv(
+        "GREETING_AUDIO_CACHE_DIR", Path(__file__).parent / ".cache" / "greetings"
+    )
+)
+greeting_cache_max_bytes = (
+    int(os.getenv("GREETING_AUDIO_CACHE_MAX_MB", "256")) * 1024 * 1024
+)
 
-class CustomerServiceAgent(Agent):
-    def __init__(self, ctx: JobContext) -> None:
-        # Extract call direction and phone number from room name
-        # Format can be: "inbound_{phone}" from LiveKit SIP dispatch or "inbound_{phone}_{random}" from outbound calls
-        parts = ctx.room.name.split("_")
-        call_direction = parts[0]
-        phone_number = parts[1] if len(parts) >= 2 else ""
-
-        # Lookup customer data using phone number
-        template_context = CustomerService.get_template_context(phone_number)
-
-        # Load templates based on call direction
-        instructions_template = jinja_env.get_template(
-            f"instructions_{call_direction}.j2"
+# Opt-in cache of synthesized audio for phrases the agent says repeatedly
+TTS_PHRASE_CACHE = os.getenv("TTS_PHRASE_CACHE", "").lower() in ("1", "true")
+phrase_cache_dir = Path(
+    os.getenv("TTS_PHRASE_CACHE_DIR", Path(__file__).parent / ".cache" / "phrases")
+)
+phrase_cache_max_bytes = int(os.getenv("TTS_PHRASE_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Longer sentences are rarely repeated verbatim and would only churn the cache
+PHRASE_CACHE_MAX_CHARS = 160
+_SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+# Opt-in speculative LLM generation on stable interim transcripts
+SPECULATIVE_LLM = os.getenv("SPECULATIVE_LLM", "").lower() in ("1", "true")
+
+# Bound the prompt on long calls: last N turns verbatim, older ones summarized
+context_max_turns = int(os.getenv("CONTEXT_MAX_TURNS", "8"))
+context_token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+context_summary_model = os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-4.1-mini")
+
+# Local voicemail detection on outbound calls, bypassing the LLM round trip
+VOICEMAIL_FAST_PATH = os.getenv("VOICEMAIL_FAST_PATH", "").lower() in ("1", "true")
+VOICEMAIL_BEEP_DETECTION = os.getenv("VOICEMAIL_BEEP_DETECTION", "1").lower() in (
+    "1",
+    "true",
+)
+voicemail_phrases = (
+    load_phrases(Path(os.environ["VOICEMAIL_PHRASES_FILE"]))
+    if os.getenv("VOICEMAIL_PHRASES_FILE")
+    else DEFAULT_VOICEMAIL_PHRASES
+)
+# How long to wait for the beep (or end of the greeting) once voicemail is detected
+voicemail_wait_timeout = 5.0
+
+# Per-turn latency histograms, served by the main worker process when set
+metrics_port = int(os.getenv("METRICS_PORT", "0"))
+
+# Stop accepting jobs when sessions, child process CPU or loop lag saturate
+load_threshold = float(os.getenv("LOAD_THRESHOLD", "0.75"))
+load_max_sessions = int(os.getenv("LOAD_MAX_SESSIONS", "8"))
+load_max_loop_lag = float(os.getenv("LOAD_MAX_LOOP_LAG", "0.1"))
+
+# Register under this name to be dispatched explicitly, by the dialer and by
+# dispatch rules, instead of into every new room
+agent_name = os.getenv("AGENT_NAME", "")
+# Oldest customer context from the dialer to use without looking it up again
+context_metadata_max_age = float(os.getenv("CONTEXT_METADATA_MAX_AGE", "300"))
+
+# Experimental: end turns after a silence window adapted to the turn detector's
+# confidence and the caller's pauses, instead of 0.8s of VAD silence and the
+# framework's endpointing delays. It holds the turn open by waiting inside the
+# turn detector's prediction, so it relies on how the framework schedules it.
+ADAPTIVE_ENDPOINTING = os.getenv("ADAPTIVE_ENDPOINTING", "").lower() in ("1", "true")
+vad_min_silence = (
+    float(os.getenv("ENDPOINTING_MIN_SILENCE", "0.3")) if ADAPTIVE_ENDPOINTING else 0.8
+)
+
+# Keep references to fire-and-forget tasks so they aren't garbage collected
+_background_tasks: set[asyncio.Task] = set()
+
+
+def greeting_cache_tags(templates: TemplateRegistry) -> set[str]:
+    """Current fingerprints of the templates greetings are rendered from."""
+    return {
+        templates.template_fingerprint(f"initial_prompt_{direction}.j2")
+        for direction in ("inbound", "outbound")
+    }
+
+
+def prewarm(proc: JobProcess) -> None:
+    """Load models and templates once per worker process, shared across jobs."""
+    started_at = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load(
+        activation_threshold=0.7,
+        min_speech_duration=0.15,
+        min_silence_duration=vad_min_silence,
+    )
+
+    # Open the customer database's connection pool before the first call
+    CustomerService.repository()
+
+    # Compile every prompt template up front so the first call doesn't pay for it
+    templates = TemplateRegistry(template_dir)
+    templates.precompile()
+    proc.userdata["templates"] = templates
+
+    if GREETING_AUDIO_CACHE:
+        greeting_cache = AudioCache(greeting_cache_dir, greeting_cache_max_bytes)
+        # Drop audio rendered from templates that have since changed
+        removed = greeting_cache.invalidate(greeting_cache_tags(templates))
+        if removed:
+            logger.info(f"Invalidated {removed} stale cached greetings")
+        proc.userdata["greeting_cache"] = greeting_cache
+
+    if TTS_PHRASE_CACHE:
+        proc.userdata["phrase_cache"] = AudioCache(
+            phrase_cache_dir, phrase_cache_max_bytes
         )
-        instructions = instructions_template.render(template_context)
 
-        initial_prompt_template = jinja_env.get_template(
+    logger.info(f"PREWARMED WORKER PROCESS in {time.perf_counter() - started_at:.3f}s")
+
+
+def parse_room_name(room_name: str) -> tuple[str, str]:
+    """Extract call direction and phone number from a room name."""
+    # Format can be: "inbound_{phone}" from LiveKit SIP dispatch or "inbound_{phone}_{random}" from outbound calls
+    parts = room_name.split("_")
+    call_direction = parts[0]
+    phone_number = parts[1] if len(parts) >= 2 else ""
+    return call_direction, phone_number
+
+
+class CustomerServiceAgent(Agent):
+    def __init__(
+        self, ctx: JobContext, template_context: dict[str, Any] | None = None
+    ) -> None:
+        call_direction, phone_number = parse_room_name(ctx.room.name)
+
+        # Lookup customer data using phone number, unless already resolved
+        if template_context is None:
+            template_context = CustomerService.get_template_context(phone_number)
+
+        # Render templates based on call direction
+        templates: TemplateRegistry = ctx.proc.userdata["templates"]
+        instructions, self.initial_prompt = templates.render_prompts(
+            call_direction, template_context
+        )
+        # Exact opening line, used when greeting audio is served from the cache
+        self.greeting = templates.render_greeting(call_direction, template_context)
+        self.greeting_tag = templates.template_fingerprint(
             f"initial_prompt_{call_direction}.j2"
         )
-        self.initial_prompt = initial_prompt_template.render(template_context)
+        logger.debug(f"Template registry stats: {templates.stats()}")
 
         # Only outbound calls have voicemail tool
         tools = [leave_voicemail] if call_direction == "outbound" else []
 
+        # The fast path detects voicemail locally and leaves a templated message
+        self.voicemail_detector = None
+        if call_direction == "outbound" and VOICEMAIL_FAST_PATH:
+            self.voicemail_detector = VoicemailDetector(
+                voicemail_phrases, detect_beep=VOICEMAIL_BEEP_DETECTION
+            )
+            self.voicemail_message = templates.get_template(
+                "voicemail_message.j2"
+            ).render(template_context)
+        self.voicemail_ready = asyncio.Event()
+
         super().__init__(instructions=instructions, tools=tools)
         self.ctx = ctx
+        self.call_direction = call_direction
+        self.phone_number = phone_number
+        self.service_area = template_context.get("service_area")
+        self.location = template_context.get("location")
+        # Window reserved while the customer confirms it
+        self.hold: Hold | None = None
         self.session_id = str(uuid4())
-        self.current_trace = None
+        self.current_trace_id: str | None = None
+        self.trace_sampled = _trace_exporter.should_sample()
+        self.phrase_cache: AudioCache | None = ctx.proc.userdata.get("phrase_cache")
+        self.speculation = SpeculativeGeneration() if SPECULATIVE_LLM else None
+        self.latency = TurnLatency(call_direction)
+        self.context_window = ContextWindow(
+            partial(openai.LLM, model=context_summary_model),
+            max_turns=context_max_turns,
+            token_budget=context_token_budget,
+        )
+        # Provider-side prompt cache usage, accumulated over the session
+        self.prompt_tokens_total = 0
+        self.cached_tokens_total = 0
 
     def close(self) -> None:
-        if self.current_trace:
-            self.current_trace = None
-        _langfuse.flush()
-
-    def get_current_trace(self) -> StatefulClient:
-        if self.current_trace:
-            return self.current_trace
-        self.current_trace = _langfuse.trace(
-            name="customer_service_agent", session_id=self.session_id
+        # Queued traces are exported by the background exporter, never flushed inline
+        self.current_trace_id = None
+        if self.phrase_cache is not None:
+            stats = self.phrase_cache.stats()
+            logger.info(
+                f"TTS PHRASE CACHE: hit_rate={stats['hit_rate']:.1%} "
+                f"hits={stats['hits']} bytes_saved={stats['bytes_served']}"
+            )
+        if self.speculation is not None:
+            self.speculation.cancel()
+            logger.info(f"SPECULATIVE LLM: {self.speculation.stats()}")
+
+    async def release_hold(self) -> None:
+        """Free a window the customer chose but never confirmed."""
+        if self.hold is not None:
+            hold, self.hold = self.hold, None
+            await CustomerService.reservations().release_async(hold)
+
+    @function_tool
+    async def hold_appointment(self, run_ctx: RunContext, window_start: str) -> str:
+        """Reserve an appointment window for the customer while you confirm the details with them. Call it as soon as they choose a window. window_start is the start of the chosen window as YYYY-MM-DD HH:MM in 24-hour time, e.g. 2026-10-19 13:00."""
+        return await self.reserve_window(window_start, book=False)
+
+    @function_tool
+    async def book_appointment(self, run_ctx: RunContext, window_start: str) -> str:
+        """Book the customer's appointment once they have confirmed the window. window_start is the start of the window as YYYY-MM-DD HH:MM in 24-hour time, e.g. 2026-10-19 13:00."""
+        return await self.reserve_window(window_start, book=True)
+
+    def open_windows(self) -> list[str]:
+        """Windows this caller can be offered, from the technicians nearest them."""
+        return CustomerService.available_time_windows(self.service_area, self.location)
+
+    async def reserve_window(self, window_start: str, book: bool) -> str:
+        """Hold or book a window for this caller; the result is read by the LLM."""
+        reservations = CustomerService.reservations()
+        try:
+            start = datetime.fromisoformat(window_start)
+        except ValueError:
+            return f"{window_start!r} is not a date and time like 2026-10-19 13:00."
+        window = reservations.availability.window_at(start)
+        if window is None or window.start <= datetime.now():
+            return (
+                f"{window_start} is not the start of an open window. Open windows: "
+                f"{', '.join(self.open_windows())}"
+            )
+        customer_id = CustomerService.find_customer_id(self.phone_number)
+        if customer_id is None:
+            return (
+                "The caller is not a customer on file, so no appointment can be "
+                "booked. Offer to have the office call them back."
+            )
+
+        for _ in range(2):
+            hold = self.hold
+            if hold is None or not window.start <= hold.start < window.end:
+                await self.release_hold()
+                hold = await reservations.hold_async(
+                    customer_id,
+                    window,
+                    self.service_area,
+                    CustomerService.nearby_technicians(self.location),
+                )
+            if hold is None:
+                return (
+                    f"{window} is no longer available. Open windows: "
+                    f"{', '.join(self.open_windows())}"
+                )
+            if not book:
+                self.hold = hold
+                return (
+                    f"{window} is held for {appointment_hold_seconds:.0f} seconds. "
+                    "Confirm it with the customer, then book it."
+                )
+            self.hold = None
+            appointment = await reservations.commit_async(hold)
+            if appointment is not None:
+                logger.info(
+                    f"Booked appointment {appointment.id} with technician "
+                    f"{appointment.technician_id} at {appointment.start}"
+                )
+                arrival = appointment.start.strftime("%I:%M %p").lstrip("0")
+                return f"Booked {window}, the technician arrives at {arrival}."
+            # The hold expired before the customer confirmed, hold it again
+        return f"{window} could not be booked. Offer another window."
+
+    def record_prompt_cache_usage(
+        self, usage: llm.CompletionUsage, ttft: float | None
+    ) -> None:
+        """Log cached prompt tokens for a turn and the running session hit rate."""
+        self.prompt_tokens_total += usage.prompt_tokens
+        self.cached_tokens_total += usage.prompt_cached_tokens
+        hit_rate = (
+            self.cached_tokens_total / self.prompt_tokens_total
+            if self.prompt_tokens_total
+            else 0.0
+        )
+        ttft_text = f"{ttft:.3f}s" if ttft is not None else "n/a"
+        logger.info(
+            f"LLM TURN: ttft={ttft_text} prompt_tokens={usage.prompt_tokens} "
+            f"cached_tokens={usage.prompt_cached_tokens} "
+            f"session_cache_hit_rate={hit_rate:.1%}"
         )
-        return self.current_trace
+
+    def get_current_trace_id(self) -> str:
+        if self.current_trace_id:
+            return self.current_trace_id
+        return self.start_trace()
+
+    def start_trace(self) -> str:
+        self.current_trace_id = str(uuid4())
+        if self.trace_sampled:
+            _trace_exporter.submit(
+                "trace",
+                id=self.current_trace_id,
+                name="customer_service_agent",
+                session_id=self.session_id,
+            )
+        return self.current_trace_id
 
     async def on_user_turn_completed(
         self,
         turn_ctx: ChatContext,
         new_message: ChatMessage,
     ) -> None:
-        # Reset the span when a new user turn is completed
-        if self.current_trace:
-            self.current_trace = None
-        self.current_trace = _langfuse.trace(
-            name="customer_service_agent", session_id=self.session_id
+        if self.voicemail_detector is not None:
+            # The voicemail fast path owns the call, don't answer the greeting
+            if self.voicemail_detector.detected:
+                raise StopResponse()
+            # Answering a person, the greeting is over
+            self.voicemail_detector.disarm()
+
+        # Start a new trace when a new user turn is completed
+        self.start_trace()
+
+    async def stt_node(
+        self, audio: AsyncIterable[rtc.AudioFrame], model_settings: ModelSettings
+    ) -> AsyncIterable[stt.SpeechEvent]:
+        if self.voicemail_detector is not None:
+            audio = self.listen_for_beep(audio)
+        async for event in Agent.default.stt_node(self, audio, model_settings):
+            if self.voicemail_detector is not None:
+                self.check_voicemail(event)
+            if self.speculation is not None:
+                self.speculation.on_speech_event(
+                    event, self.chat_ctx, self.speculative_llm_stream
+                )
+            yield event
+
+    async def listen_for_beep(
+        self, audio: AsyncIterable[rtc.AudioFrame]
+    ) -> AsyncIterable[rtc.AudioFrame]:
+        detector = self.voicemail_detector
+        async for frame in audio:
+            # Listened for during the greeting, or after a greeting phrase
+            if detector.feed_audio(frame):
+                logger.info("VOICEMAIL BEEP DETECTED")
+                if detector.matched_phrase is None:
+                    self.leave_voicemail_now()
+                self.voicemail_ready.set()
+            yield frame
+
+    def check_voicemail(self, event: stt.SpeechEvent) -> None:
+        detector = self.voicemail_detector
+        if (
+            event.type
+            in (
+                stt.SpeechEventType.INTERIM_TRANSCRIPT,
+                stt.SpeechEventType.FINAL_TRANSCRIPT,
+            )
+            and event.alternatives
+        ):
+            received_at = time.perf_counter()
+            if detector.feed_transcript(event.alternatives[0].text):
+                logger.info(
+                    f"VOICEMAIL DETECTED: phrase='{detector.matched_phrase}' "
+                    f"in {(detector.detected_at - received_at) * 1000:.2f}ms"
+                )
+                self.leave_voicemail_now()
+        elif (
+            event.type == stt.SpeechEventType.END_OF_SPEECH
+            and detector.detected
+            and not detector.detect_beep
+        ):
+            self.voicemail_ready.set()
+
+    def leave_voicemail_now(self) -> None:
+        # Stop the greeting, nobody is listening to it
+        self.session.interrupt()
+        task = asyncio.create_task(self.leave_detected_voicemail())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def leave_detected_voicemail(self) -> None:
+        try:
+            await asyncio.wait_for(
+                self.voicemail_ready.wait(), timeout=voicemail_wait_timeout
+            )
+        except TimeoutError:
+            logger.info("No beep heard, leaving voicemail anyway")
+        await leave_voicemail_and_hang_up(self.session, self.voicemail_message)
+
+    def speculative_llm_stream(
+        self, chat_ctx: llm.ChatContext
+    ) -> AsyncIterable[llm.ChatChunk]:
+        return Agent.default.llm_node(
+            self, self.context_window.apply(chat_ctx), self.tools, ModelSettings()
         )
 
     async def llm_node(
@@ -110,56 +485,225 @@ class CustomerServiceAgent(Agent):
         tools: list[FunctionTool],
         model_settings: ModelSettings,
     ) -> AsyncIterable[llm.ChatChunk]:
-        generation = self.get_current_trace().generation(
-            name="llm_generation",
-            model="gpt-4.1",
-            input=openai.utils.to_chat_ctx(chat_ctx, cache_key=self.llm),
-        )
+        stream = None
+        if self.speculation is not None:
+            stream = self.speculation.take(chat_ctx)
+        if stream is None:
+            chat_ctx = self.context_window.apply(chat_ctx)
+            stream = Agent.default.llm_node(self, chat_ctx, tools, model_settings)
+
+        trace_id = self.get_current_trace_id()
+        generation_input = None
+        if self.trace_sampled:
+            # Snapshot the context now; it's serialized later by the exporter
+            generation_input = partial(
+                openai.utils.to_chat_ctx, chat_ctx.copy(), cache_key=self.llm
+            )
+        start_time = datetime.now(UTC)
+        completion_start_time: datetime | None = None
+        level = None
         output = ""
-        set_completion_start_time = False
+        started_at = time.perf_counter()
+        ttft: float | None = None
+        usage: llm.CompletionUsage | None = None
         try:
-            async for chunk in Agent.default.llm_node(
-                self, chat_ctx, tools, model_settings
-            ):
-                if not set_completion_start_time:
-                    generation.update(
-                        completion_start_time=datetime.now(UTC),
-                    )
-                    set_completion_start_time = True
-                if chunk.delta and chunk.delta.content:
+            async for chunk in stream:
+                if completion_start_time is None:
+                    completion_start_time = datetime.now(UTC)
+                    ttft = time.perf_counter() - started_at
+                if self.trace_sampled and chunk.delta and chunk.delta.content:
                     output += chunk.delta.content
+                if chunk.usage:
+                    usage = chunk.usage
                 yield chunk
         except Exception:
-            generation.update(level="ERROR")
+            level = "ERROR"
             raise
         finally:
-            generation.end(output=output)
+            usage_details = None
+            if ttft is not None:
+                self.latency.record_llm_ttft(ttft)
+            if usage:
+                self.record_prompt_cache_usage(usage, ttft)
+                usage_details = {
+                    "input": usage.prompt_tokens - usage.prompt_cached_tokens,
+                    "input_cached_tokens": usage.prompt_cached_tokens,
+                    "output": usage.completion_tokens,
+                }
+            if self.trace_sampled:
+                _trace_exporter.submit(
+                    "generation",
+                    trace_id=trace_id,
+                    name="llm_generation",
+                    model="gpt-4.1",
+                    input=generation_input,
+                    output=output,
+                    start_time=start_time,
+                    completion_start_time=completion_start_time,
+                    end_time=datetime.now(UTC),
+                    usage_details=usage_details,
+                    level=level,
+                )
 
     async def tts_node(
         self, text: AsyncIterable[str], model_settings: ModelSettings
     ) -> AsyncIterable:
-        span = self.get_current_trace().span(
-            name="tts_node", metadata={"model": "elevenlabs"}
-        )
+        trace_id = self.get_current_trace_id()
+        start_time = datetime.now(UTC)
+        level = None
+        text = self.latency.watch_text(text)
+        first_audio = True
         try:
-            async for event in Agent.default.tts_node(self, text, model_settings):
+            if self.phrase_cache is not None:
+                frames = self.cached_tts_node(text, model_settings)
+            else:
+                frames = Agent.default.tts_node(self, text, model_settings)
+            async for event in frames:
+                if first_audio:
+                    first_audio = False
+                    self.latency.record_first_audio()
                 yield event
         except Exception:
-            span.update(level="ERROR")
+            level = "ERROR"
             raise
         finally:
-            span.end()
+            if self.trace_sampled:
+                _trace_exporter.submit(
+                    "span",
+                    trace_id=trace_id,
+                    name="tts_node",
+                    metadata={"model": "elevenlabs"},
+                    start_time=start_time,
+                    end_time=datetime.now(UTC),
+                    level=level,
+                )
+
+    async def cached_tts_node(
+        self, text: AsyncIterable[str], model_settings: ModelSettings
+    ) -> AsyncIterable[rtc.AudioFrame]:
+        """
+        Serve the sentences a reply opens with from the phrase cache, and stream
+        the rest of it to the TTS unchanged.
+
+        Text is held only until its first sentence ends, or is too long to be a
+        cached phrase. The first sentence that misses is synthesized on its
+        own and cached once spoken, in the background, while the remaining
+        text goes to a second streaming TTS request as it arrives, as without
+        the cache, so its audio is ready when the sentence ends.
+        """
+        voice = voice_fingerprint(self.session.tts)
+        chunks = aiter(text)
+        pending = ""
+        ended = False
+        cache_as: str | None = None
+        sentence = ""
+        while True:
+            match = _SENTENCE_END.search(pending)
+            while (
+                match is None and not ended and len(pending) <= PHRASE_CACHE_MAX_CHARS
+            ):
+                try:
+                    pending += await anext(chunks)
+                except StopAsyncIteration:
+                    ended = True
+                match = _SENTENCE_END.search(pending)
+            if match is None and not ended:
+                # Too long to be a cached phrase
+                break
+            split = match.end() if match is not None else len(pending)
+            phrase = normalize_phrase(pending[:split])
+            rest = pending[split:]
+            if phrase:
+                key = cache_key(voice, phrase)
+                cached = None
+                if key in self.phrase_cache:
+                    cached = await asyncio.to_thread(self.phrase_cache.get, key)
+                if cached is None:
+                    if len(phrase) <= PHRASE_CACHE_MAX_CHARS:
+                        cache_as = key
+                        sentence, pending = pending[:split], rest
+                    break
+                for frame in cached:
+                    yield frame
+            pending = rest
+            if ended and not pending.strip():
+                return
+
+        async def remaining_text() -> AsyncIterable[str]:
+            if pending:
+                yield pending
+            if not ended:
+                async for chunk in chunks:
+                    yield chunk
+
+        if cache_as is None:
+            async for frame in Agent.default.tts_node(
+                self, remaining_text(), model_settings
+            ):
+                yield frame
+            return
+
+        async def sentence_text() -> AsyncIterable[str]:
+            yield sentence
+
+        rest_frames: asyncio.Queue[rtc.AudioFrame | None] = asyncio.Queue()
+
+        async def synthesize_rest() -> None:
+            nonlocal pending, ended
+            try:
+                # Often the reply ends with the sentence, leaving nothing to send
+                while not pending.strip() and not ended:
+                    try:
+                        pending += await anext(chunks)
+                    except StopAsyncIteration:
+                        ended = True
+                if not pending.strip():
+                    return
+                async for frame in Agent.default.tts_node(
+                    self, remaining_text(), model_settings
+                ):
+                    rest_frames.put_nowait(frame)
+            finally:
+                rest_frames.put_nowait(None)
+
+        rest_task = asyncio.create_task(synthesize_rest())
+        try:
+            frames = []
+            async for frame in Agent.default.tts_node(
+                self, sentence_text(), model_settings
+            ):
+                frames.append(frame)
+                yield frame
+            if frames:
+                task = asyncio.create_task(
+                    asyncio.to_thread(self.phrase_cache.put, cache_as, frames)
+                )
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+            while (frame := await rest_frames.get()) is not None:
+                yield frame
+            # Raises if the rest of the reply failed to synthesize
+            await rest_task
+        finally:
+            if not rest_task.done():
+                rest_task.cancel()
 
 
 @function_tool
 async def leave_voicemail(run_ctx: RunContext, voicemail_message: str):
     """Leave a voicemail message after detecting a voicemail system. Use AFTER hearing the greeting/beep. The voicemail_message parameter should contain the complete message you want to leave for the customer."""
+    await leave_voicemail_and_hang_up(run_ctx.session, voicemail_message)
+
+
+async def leave_voicemail_and_hang_up(
+    session: AgentSession, voicemail_message: str
+) -> None:
+    """Speak the voicemail message, then end the call."""
     ctx = get_job_context()
-    await run_ctx.session.say(voicemail_message, allow_interruptions=False)
-    await asyncio.sleep(1)
+    await session.say(voicemail_message, allow_interruptions=False)
 
     # let the agent finish speaking
-    current_speech = run_ctx.session.current_speech
+    current_speech = session.current_speech
     if current_speech:
         await current_speech.wait_for_playout()
 
@@ -168,7 +712,7 @@ async def leave_voicemail(run_ctx: RunContext, voicemail_message: str):
             room=ctx.room.name,
         )
     )
-    await run_ctx.session.aclose()
+    await session.aclose()
     await ctx.shutdown("voicemail_left")
 
 
@@ -196,34 +740,196 @@ async def connect(ctx: JobContext, timeout: float = 3.0, max_retries: int = 3) -
     return False
 
 
+async def _timed(timings: dict[str, float], phase: str, aw: Awaitable[T]) -> T:
+    started_at = time.perf_counter()
+    try:
+        return await aw
+    finally:
+        timings[phase] = time.perf_counter() - started_at
+
+
+async def resolve_customer_context(
+    ctx: JobContext, phone_number: str
+) -> dict[str, Any]:
+    """
+    Template context resolved by the dialer, or looked up by phone.
+
+    A failed lookup, e.g. the database staying locked, must not end the call
+    once connected: the agent carries on as with an unknown caller.
+    """
+    try:
+        template_context = decode_customer_context(
+            ctx.job.metadata, phone_number, context_metadata_max_age
+        )
+        if template_context is not None:
+            logger.info("Using customer context from dispatch metadata")
+            return CustomerService.with_available_windows(template_context)
+        return await CustomerService.get_template_context_async(phone_number)
+    except Exception as e:
+        logger.warning(f"Customer lookup failed, continuing as unknown caller: {e}")
+        return CustomerService.unknown_caller_context()
+
+
+def llm_client() -> AsyncClient:
+    """The OpenAI plugin's default client, created here so it can be warmed up."""
+    return AsyncClient(
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0),
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=50, max_keepalive_connections=50, keepalive_expiry=120
+            ),
+        ),
+    )
+
+
+async def warmup_providers(
+    client: AsyncClient, tts: elevenlabs.TTS, timeout: float = 2.0
+) -> None:
+    """
+    Open provider connections before the first turn needs them.
+
+    The first chat completion reuses the client's kept-alive TLS connection.
+    ElevenLabs opens a websocket per reply on the plugin's HTTP session, which
+    reuses the DNS lookup and TLS connection of a request to the same host.
+    """
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(client.models.list(), tts.list_voices()), timeout=timeout
+        )
+    except Exception as e:
+        logger.warning(f"Provider warmup failed: {e}")
+
+
+async def cache_greeting(
+    session: AgentSession, greeting_cache: AudioCache, key: str, text: str, tag: str
+) -> None:
+    try:
+        frames = await synthesize_frames(session.tts, text)
+        await asyncio.to_thread(greeting_cache.put, key, frames, tag)
+    except Exception as e:
+        logger.warning(f"Failed to cache greeting audio: {e}")
+
+
+async def greet(
+    session: AgentSession,
+    agent: CustomerServiceAgent,
+    greeting_cache: AudioCache | None,
+) -> None:
+    """Speak the opening line, from cached audio when available."""
+    if greeting_cache is None:
+        await session.generate_reply(
+            instructions=agent.initial_prompt,
+            allow_interruptions=True,
+        )
+        return
+
+    key = cache_key(agent.greeting_tag, voice_fingerprint(session.tts), agent.greeting)
+    frames = await asyncio.to_thread(greeting_cache.get, key)
+    if frames is not None:
+        logger.info("Playing cached greeting audio")
+        await session.say(
+            agent.greeting, audio=iter_frames(frames), allow_interruptions=True
+        )
+        return
+
+    # Speak it live this time and synthesize it for the next call in the background
+    task = asyncio.create_task(
+        cache_greeting(session, greeting_cache, key, agent.greeting, agent.greeting_tag)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    await session.say(agent.greeting, allow_interruptions=True)
+
+
 async def entrypoint(ctx: JobContext):
+    job_started_at = time.perf_counter()
+    # The turn detector binds to this job's inference executor, so it is created
+    # per job; its model itself is loaded once in the worker's inference process.
+    turn_detection = EnglishModel()
+    endpointing = None
+    if ADAPTIVE_ENDPOINTING:
+        turn_detection = endpointing = AdaptiveEndpointing(
+            turn_detection, vad_min_silence
+        )
+    client = llm_client()
+    tts = elevenlabs.TTS()
     session = AgentSession(
         stt=deepgram.STT(),
-        llm=openai.LLM(model="gpt-4.1"),
-        tts=elevenlabs.TTS(),
-        vad=silero.VAD.load(
-            activation_threshold=0.7,
-            min_speech_duration=0.15,
-            min_silence_duration=0.8,
-        ),
-        turn_detection=EnglishModel(),
+        llm=openai.LLM(model="gpt-4.1", client=client),
+        tts=tts,
+        vad=ctx.proc.userdata["vad"],
+        turn_detection=turn_detection,
+        # The adaptive window replaces the framework's endpointing delays
+        min_endpointing_delay=0.0 if endpointing else 0.5,
     )
+    if endpointing is not None:
+        session.on(
+            "user_state_changed",
+            lambda ev: endpointing.on_user_state_changed(ev.new_state),
+        )
 
-    agent = CustomerServiceAgent(ctx)
-    await session.start(
-        room=ctx.room,
-        agent=agent,
-        room_input_options=RoomInputOptions(),
+    # Connect, resolve the customer and warm up providers concurrently
+    _, phone_number = parse_room_name(ctx.room.name)
+    timings: dict[str, float] = {}
+    connected, template_context, _ = await asyncio.gather(
+        _timed(timings, "connect", connect(ctx)),
+        _timed(
+            timings,
+            "customer_context",
+            resolve_customer_context(ctx, phone_number),
+        ),
+        _timed(timings, "provider_warmup", warmup_providers(client, tts)),
     )
-
-    if not await connect(ctx):
+    if not connected:
         return
 
-    await session.generate_reply(
-        instructions=agent.initial_prompt,
-        allow_interruptions=True,
+    agent = CustomerServiceAgent(ctx, template_context)
+
+    async def flush_traces() -> None:
+        await agent.release_hold()
+        agent.close()
+        if endpointing is not None:
+            logger.info(f"ADAPTIVE ENDPOINTING: {endpointing.policy.stats()}")
+        await _trace_exporter.aclose()
+        mark_process_dead()
+
+    ctx.add_shutdown_callback(flush_traces)
+    session.on("metrics_collected", lambda ev: agent.latency.on_metrics(ev.metrics))
+
+    await _timed(
+        timings,
+        "session_start",
+        session.start(
+            room=ctx.room,
+            agent=agent,
+            room_input_options=RoomInputOptions(),
+        ),
+    )
+    phases = " ".join(f"{phase}={elapsed:.3f}s" for phase, elapsed in timings.items())
+    logger.info(
+        f"SESSION STARTED in {time.perf_counter() - job_started_at:.3f}s after job assignment ({phases})"
     )
 
+    await greet(session, agent, ctx.proc.userdata.get("greeting_cache"))
+
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
+    if metrics_port:
+        start_metrics_server(metrics_port)
+    if SEED_DEMO_DATA:
+        # Here, once, before any job process opens the database
+        CustomerService.seed_demo_data()
+    if CALL_HISTORY_IN_MEMORY:
+        # Built once here and mapped by every job process
+        CustomerService.snapshot_call_history()
+    cli.run_app(
+        WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            load_fnc=WorkerLoad(load_max_sessions, load_max_loop_lag),
+            load_threshold=load_threshold,
+            agent_name=agent_name,
+        )
+    )
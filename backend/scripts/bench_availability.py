@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Availability benchmark: finding the next open appointment windows.
+
+Fills the schedules of hundreds of technicians across service areas over the
+horizon (default 90 days) to a target utilization, then measures "next N open
+windows for this service area" on the AvailabilityEngine against scanning
+every technician's appointments day by day, checks both give the same
+windows, and measures the incremental update of a booking and cancellation.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from services.availability import (  # noqa: E402
+    DEFAULT_WINDOWS,
+    AvailabilityEngine,
+    TimeWindow,
+)
+
+
+class ScanAvailability:
+    """Appointments as lists of intervals, scanned for every query."""
+
+    def __init__(self, origin: date, horizon_days: int, appointment: timedelta):
+        self.origin = origin
+        self.horizon_days = horizon_days
+        self.appointment = appointment
+        self.areas: dict[str, list[int]] = defaultdict(list)
+        self.booked: dict[int, dict[date, list[tuple[datetime, datetime]]]] = {}
+
+    def add_technician(self, technician_id: int, service_area: str) -> None:
+        self.areas[service_area].append(technician_id)
+        self.booked[technician_id] = defaultdict(list)
+
+    def book(self, technician_id: int, start: datetime, end: datetime) -> None:
+        self.booked[technician_id][start.date()].append((start, end))
+
+    def _fits(self, technician_id: int, window: TimeWindow) -> bool:
+        free_from = window.start
+        for start, end in sorted(self.booked[technician_id][window.start.date()]):
+            if end <= free_from:
+                continue
+            if start - free_from >= self.appointment:
+                break
+            free_from = max(free_from, end)
+        return window.end - free_from >= self.appointment
+
+    def next_windows(self, service_area: str, limit: int, after: datetime):
+        found = []
+        for d in range(self.horizon_days):
+            day = self.origin + timedelta(days=d)
+            if day.weekday() >= 5:
+                continue
+            for start, end in DEFAULT_WINDOWS:
+                window = TimeWindow(
+                    datetime.combine(day, start), datetime.combine(day, end)
+                )
+                if window.start > after and any(
+                    self._fits(t, window) for t in self.areas[service_area]
+                ):
+                    found.append(window)
+                    if len(found) == limit:
+                        return found
+        return found
+
+
+def fill(engines, technicians: int, areas: int, days: int, utilization: float):
+    """Book random appointments until about `utilization` of windows are full."""
+    rng = random.Random(0)
+    engine = engines[0]
+    origin = engine.origin
+    appointment = engine.appointment_duration
+    booked = 0
+    for technician_id in range(1, technicians + 1):
+        for e in engines:
+            e.add_technician(technician_id, f"area-{technician_id % areas}")
+        for d in range(days):
+            day = origin + timedelta(days=d)
+            if day.weekday() >= 5:
+                continue
+            for start, end in DEFAULT_WINDOWS:
+                window = TimeWindow(
+                    datetime.combine(day, start), datetime.combine(day, end)
+                )
+                while rng.random() < utilization:
+                    start_at = engine.appointment_start(technician_id, window)
+                    if start_at is None:
+                        break
+                    for e in engines:
+                        e.book(technician_id, start_at, start_at + appointment)
+                    booked += 1
+    return booked
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name: str, latencies: list[float]) -> None:
+    print(
+        f"{name:<28} {statistics.mean(latencies) * 1e6:>10.1f}us "
+        f"{_percentile(latencies, 50) * 1e6:>10.1f}us "
+        f"{_percentile(latencies, 99) * 1e6:>10.1f}us"
+    )
+
+
+def timed(fn, queries) -> tuple[list[float], list]:
+    latencies, results = [], []
+    for args in queries:
+        started_at = time.perf_counter()
+        results.append(fn(*args))
+        latencies.append(time.perf_counter() - started_at)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark appointment availability")
+    parser.add_argument("--technicians", type=int, default=500)
+    parser.add_argument("--areas", type=int, default=25)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument(
+        "--utilization",
+        type=float,
+        default=0.99,
+        help="Chance of booking each further appointment a window has room for",
+    )
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=5, help="Windows per query")
+    args = parser.parse_args()
+
+    origin = date.today()
+    engine = AvailabilityEngine(origin, args.days)
+    scan = ScanAvailability(origin, args.days, engine.appointment_duration)
+    started_at = time.perf_counter()
+    booked = fill(
+        [engine, scan], args.technicians, args.areas, args.days, args.utilization
+    )
+    print(
+        f"Booked {booked} appointments for {args.technicians} technicians in "
+        f"{args.areas} areas over {args.days} days in "
+        f"{time.perf_counter() - started_at:.1f}s"
+    )
+
+    rng = random.Random(1)
+    queries = [
+        (
+            f"area-{rng.randrange(args.areas)}",
+            args.limit,
+            datetime.combine(origin, datetime.min.time())
+            + timedelta(minutes=rng.randrange(0, 14 * 24 * 60)),
+        )
+        for _ in range(args.queries)
+    ]
+
+    print(f"\n=== next {args.limit} open windows of an area ===\n")
+    print(f"{'mode':<28} {'mean':>12} {'p50':>12} {'p99':>12}")
+    engine_latencies, engine_results = timed(engine.next_windows, queries)
+    report("availability engine", engine_latencies)
+    scan_latencies, scan_results = timed(scan.next_windows, queries)
+    report("scan appointments", scan_latencies)
+    mismatches = sum(a != b for a, b in zip(engine_results, scan_results, strict=True))
+    print(
+        f"\n{statistics.mean(scan_latencies) / statistics.mean(engine_latencies):.0f}x "
+        f"faster, {mismatches} queries with different windows"
+    )
+
+    # Book the first window offered and cancel it again
+    updates = []
+    for service_area, _, after in queries[:1000]:
+        windows = engine.next_windows(service_area, 1, after)
+        if not windows:
+            continue
+        technician_id = engine.technicians_for(windows[0], service_area)[0]
+        start_at = engine.appointment_start(technician_id, windows[0])
+        end_at = start_at + engine.appointment_duration
+        started_at = time.perf_counter()
+        engine.book(technician_id, start_at, end_at)
+        engine.cancel(technician_id, start_at, end_at)
+        updates.append((time.perf_counter() - started_at) / 2)
+    print()
+    report("book or cancel", updates)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Booking contention benchmark: many calls booking the same windows at once.
+
+Builds a customer database with a few technicians in a temporary directory,
+then runs hundreds of simulated bookers spread over several processes, as
+concurrent calls on different workers would. Each booker repeatedly takes
+one of the first open windows its process offers, holds it, waits while the
+"customer" confirms, and commits, or walks away and lets the hold expire.
+Afterwards it checks the appointments for overlaps and that every
+technician day's bitmap matches its appointments and live holds.
+
+With --unsafe the bookers check the appointments and insert theirs without
+holds or compare-and-swap, to show the double bookings that prevents.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from services.availability import FULL_DAY, AvailabilityEngine, slot_mask  # noqa: E402
+from services.customer_repository import CustomerRepository  # noqa: E402
+from services.reservations import ReservationStore  # noqa: E402
+
+SERVICE_AREA = "metro"
+
+
+def build(path: Path, technicians: int, customers: int) -> None:
+    repository = CustomerRepository(path)
+    for i in range(technicians):
+        repository.add_technician(f"Technician {i}", SERVICE_AREA)
+    repository.bulk_load(
+        customers=[
+            (i, f"First{i}", f"Last{i}", f"+1{2000000000 + i}", None)
+            for i in range(1, customers + 1)
+        ]
+    )
+    repository.close()
+
+
+def open_store(path: Path, hold_seconds: float) -> ReservationStore:
+    """A worker's view: its own connections and availability engine."""
+    repository = CustomerRepository(path)
+    availability = AvailabilityEngine()
+    for technician_id, _, service_area, work_days in repository.iter_technicians():
+        availability.add_technician(technician_id, service_area, work_days)
+    for technician_id, day, busy in repository.iter_technician_days(
+        availability.origin
+    ):
+        availability.set_day(technician_id, day, busy)
+    return ReservationStore(repository, availability, hold_seconds)
+
+
+async def booker(store, customer_id, args, rng, latencies, outcomes) -> None:
+    for _ in range(args.attempts):
+        # Everyone goes for the first few windows, as calls offer the same ones
+        windows = store.availability.next_windows(SERVICE_AREA, args.hot_windows)
+        if not windows:
+            outcomes["no_window"] += 1
+            return
+        window = rng.choice(windows)
+        started_at = time.perf_counter()
+        hold = await store.hold_async(customer_id, window, SERVICE_AREA)
+        hold_latency = time.perf_counter() - started_at
+        if hold is None:
+            outcomes["taken"] += 1
+            continue
+        await asyncio.sleep(rng.uniform(0, args.confirm_time))
+        if rng.random() < args.abandon_rate:
+            # Hung up, the hold expires on its own
+            outcomes["abandoned"] += 1
+            continue
+        started_at = time.perf_counter()
+        appointment = await store.commit_async(hold)
+        latencies.append(hold_latency + time.perf_counter() - started_at)
+        outcomes["booked" if appointment else "expired"] += 1
+
+
+async def unsafe_booker(conn, customer_id, args, rng, latencies, outcomes) -> None:
+    """Check the appointments, then insert: the race holds and CAS prevent."""
+    technicians = [row[0] for row in conn.execute("SELECT id FROM technicians")]
+    day = date.today() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    for _ in range(args.attempts):
+        start = datetime.combine(day, datetime.min.time()) + timedelta(
+            hours=rng.choice([9, 13, 15])
+        )
+        end = start + timedelta(hours=2)
+        technician_id = rng.choice(technicians)
+        started_at = time.perf_counter()
+        taken = conn.execute(
+            "SELECT 1 FROM appointments WHERE technician_id = ? "
+            "AND starts_at < ? AND ends_at > ?",
+            (technician_id, end.isoformat(), start.isoformat()),
+        ).fetchone()
+        if taken:
+            outcomes["taken"] += 1
+            continue
+        await asyncio.sleep(rng.uniform(0, args.confirm_time))
+        with conn:
+            conn.execute(
+                "INSERT INTO appointments "
+                "(customer_id, technician_id, starts_at, ends_at) VALUES (?, ?, ?, ?)",
+                (customer_id, technician_id, start.isoformat(), end.isoformat()),
+            )
+        latencies.append(time.perf_counter() - started_at)
+        outcomes["booked"] += 1
+
+
+def run_process(path: Path, process: int, args) -> tuple[list[float], dict]:
+    latencies: list[float] = []
+    outcomes = dict.fromkeys(
+        ["booked", "taken", "abandoned", "expired", "no_window"], 0
+    )
+
+    async def main() -> dict:
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(args.threads))
+        first = process * args.bookers + 1
+        if args.unsafe:
+            conn = sqlite3.connect(path, timeout=30.0)
+            await asyncio.gather(
+                *(
+                    unsafe_booker(
+                        conn,
+                        first + i,
+                        args,
+                        random.Random(first + i),
+                        latencies,
+                        outcomes,
+                    )
+                    for i in range(args.bookers)
+                )
+            )
+            return {}
+        store = open_store(path, args.hold_seconds)
+        await asyncio.gather(
+            *(
+                booker(
+                    store,
+                    first + i,
+                    args,
+                    random.Random(first + i),
+                    latencies,
+                    outcomes,
+                )
+                for i in range(args.bookers)
+            )
+        )
+        return store.stats()
+
+    stats = asyncio.run(main())
+    return latencies, {**outcomes, **stats}
+
+
+def check(path: Path) -> tuple[int, int]:
+    """Overlapping appointments, and technician days whose bitmap is wrong."""
+    conn = sqlite3.connect(path)
+    overlaps = conn.execute(
+        "SELECT COUNT(*) FROM appointments a JOIN appointments b "
+        "ON a.technician_id = b.technician_id AND a.id < b.id "
+        "AND a.starts_at < b.ends_at AND b.starts_at < a.ends_at"
+    ).fetchone()[0]
+    expected: dict[tuple[int, str], int] = {}
+    for table in ("appointments", "appointment_holds"):
+        for technician_id, starts_at, ends_at in conn.execute(
+            f"SELECT technician_id, starts_at, ends_at FROM {table}"
+        ):
+            start = datetime.fromisoformat(starts_at)
+            key = (technician_id, start.date().isoformat())
+            expected[key] = expected.get(key, 0) | slot_mask(
+                start, datetime.fromisoformat(ends_at)
+            )
+    mismatched = 0
+    for technician_id, day, busy in conn.execute(
+        "SELECT technician_id, day, busy FROM technician_days"
+    ):
+        if busy != FULL_DAY and busy != expected.get((technician_id, day), 0):
+            mismatched += 1
+    return overlaps, mismatched
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent booking")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--bookers", type=int, default=64, help="Per process")
+    parser.add_argument("--attempts", type=int, default=5, help="Per booker")
+    parser.add_argument("--technicians", type=int, default=20)
+    parser.add_argument(
+        "--hot-windows", type=int, default=3, help="Windows bookers choose from"
+    )
+    parser.add_argument("--confirm-time", type=float, default=0.05)
+    parser.add_argument("--abandon-rate", type=float, default=0.2)
+    parser.add_argument("--hold-seconds", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=4, help="DB threads per process")
+    parser.add_argument(
+        "--unsafe", action="store_true", help="Check-then-insert, no holds or CAS"
+    )
+    args = parser.parse_args()
+
+    total_bookers = args.processes * args.bookers
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "customers.db"
+        build(path, args.technicians, total_bookers)
+        print(
+            f"\n=== {total_bookers} bookers in {args.processes} processes, "
+            f"{args.technicians} technicians, "
+            f"{'check-then-insert' if args.unsafe else 'holds with CAS'} ===\n"
+        )
+        started_at = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.starmap(
+                run_process, [(path, p, args) for p in range(args.processes)]
+            )
+        elapsed = time.perf_counter() - started_at
+
+        latencies = [latency for result in results for latency in result[0]]
+        totals: dict[str, int] = {}
+        for _, stats in results:
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        overlaps, mismatched = check(path)
+
+    print(
+        f"{totals['booked']} booked in {elapsed:.1f}s "
+        f"({totals['booked'] / elapsed:.0f} bookings/s)"
+    )
+    if latencies:
+        print(
+            f"hold + commit latency: mean {statistics.mean(latencies) * 1000:.1f}ms "
+            f"p50 {_percentile(latencies, 50) * 1000:.1f}ms "
+            f"p99 {_percentile(latencies, 99) * 1000:.1f}ms"
+        )
+    print(", ".join(f"{key}={value}" for key, value in totals.items()))
+    print(f"\nDouble bookings: {overlaps}")
+    if not args.unsafe:
+        print(f"Technician days not matching their appointments: {mismatched}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Customer database benchmark: lookup latency by phone number at scale.
+
+Builds a SQLite customer database (default 1M customers, each with equipment
+and a few past calls) in a temporary directory, then measures lookups: the
+in-memory PhoneIndex with numbers in national format, and CustomerRepository
+queries, blocking from one thread and through the async API with many
+concurrent callers sharing the connection pool, as concurrent calls starting
+on a worker would. Finally it compares fetching a campaign wave one customer
+at a time against one batched fetch.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from services.customer_repository import CustomerRepository  # noqa: E402
+from services.customer_service import PhoneIndex  # noqa: E402
+
+EQUIPMENT_TYPES = ["hvac", "furnace", "hot_water_heater"]
+OUTCOMES = ["scheduled", "voicemail", "no_answer", "completed"]
+BATCH_SIZE = 50_000
+
+
+def phone_number(index: int) -> str:
+    return f"+1{2000000000 + index}"
+
+
+def build(repository: CustomerRepository, customers: int, calls_per_customer: int):
+    rng = random.Random(0)
+    today = date.today()
+    now = datetime.now()
+    for start in range(0, customers, BATCH_SIZE):
+        ids = range(start + 1, min(start + BATCH_SIZE, customers) + 1)
+        repository.bulk_load(
+            customers=[
+                (
+                    i,
+                    f"First{i}",
+                    f"Last{i}",
+                    phone_number(i),
+                    (today - timedelta(days=rng.randrange(30, 730))).isoformat(),
+                )
+                for i in ids
+            ],
+            equipment=[(i, rng.choice(EQUIPMENT_TYPES)) for i in ids],
+            calls=[
+                (
+                    i,
+                    "outbound",
+                    rng.choice(OUTCOMES),
+                    (now - timedelta(days=rng.randrange(1, 730))).isoformat(),
+                    "annual maintenance scheduling",
+                )
+                for i in ids
+                for _ in range(calls_per_customer)
+            ],
+        )
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name: str, latencies: list[float], elapsed: float) -> None:
+    print(
+        f"{name:<24} {len(latencies) / elapsed:>9.0f}/s "
+        f"{statistics.mean(latencies) * 1e6:>8.0f}us "
+        f"{_percentile(latencies, 50) * 1e6:>8.0f}us "
+        f"{_percentile(latencies, 99) * 1e6:>8.0f}us "
+        f"{max(latencies) * 1e6:>8.0f}us"
+    )
+
+
+def lookup_numbers(customers: int, lookups: int, miss_rate: float) -> list[str]:
+    rng = random.Random(1)
+    return [
+        phone_number(customers + rng.randrange(1, customers))
+        if rng.random() < miss_rate
+        else phone_number(rng.randrange(1, customers + 1))
+        for _ in range(lookups)
+    ]
+
+
+def bench_phone_index(index: PhoneIndex, numbers: list[str]) -> None:
+    # As dialed or shown by caller ID, not E.164
+    national = [f"({n[2:5]}) {n[5:8]}-{n[8:]}" for n in numbers]
+    latencies = []
+    started_at = time.perf_counter()
+    for number in national:
+        lookup_started_at = time.perf_counter()
+        index.get(number)
+        latencies.append(time.perf_counter() - lookup_started_at)
+    report("phone index, national", latencies, time.perf_counter() - started_at)
+
+
+def bench_blocking(repository: CustomerRepository, numbers: list[str]) -> None:
+    latencies = []
+    started_at = time.perf_counter()
+    for number in numbers:
+        lookup_started_at = time.perf_counter()
+        repository.get_by_phone_number(number)
+        latencies.append(time.perf_counter() - lookup_started_at)
+    report("blocking, 1 thread", latencies, time.perf_counter() - started_at)
+
+
+def bench_batch(repository: CustomerRepository, customers: int, size: int) -> None:
+    """Fetch a campaign wave one customer at a time, then with one batch."""
+    ids = random.Random(2).sample(range(1, customers + 1), min(size, customers))
+    started_at = time.perf_counter()
+    for customer_id in ids:
+        repository.get_by_id(customer_id)
+    one_by_one = time.perf_counter() - started_at
+    started_at = time.perf_counter()
+    repository.get_by_ids(ids)
+    batched = time.perf_counter() - started_at
+    print(
+        f"\nWave of {len(ids)} customers: {one_by_one * 1000:.0f}ms one by one, "
+        f"{batched * 1000:.0f}ms batched ({one_by_one / batched:.1f}x)"
+    )
+
+
+async def bench_async(
+    repository: CustomerRepository, numbers: list[str], concurrency: int
+) -> None:
+    latencies = []
+    pending = iter(numbers)
+
+    async def caller() -> None:
+        for number in pending:
+            lookup_started_at = time.perf_counter()
+            await repository.find_by_phone_number(number)
+            latencies.append(time.perf_counter() - lookup_started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    report(
+        f"async, {concurrency} concurrent", latencies, time.perf_counter() - started_at
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark customer lookups")
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--calls-per-customer", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument(
+        "--miss-rate", type=float, default=0.1, help="Share of unknown numbers"
+    )
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument(
+        "--concurrency",
+        default="1,16,64",
+        help="Comma-separated numbers of concurrent async callers",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=2000, help="Customers in a campaign wave"
+    )
+    parser.add_argument("--db", type=Path, help="Reuse or create this database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or Path(tmp) / "customers.db"
+        repository = CustomerRepository(path, args.pool_size)
+        existing = repository.count_customers()
+        if existing:
+            args.customers = existing
+            print(f"Using {existing} customers in {path}")
+        else:
+            started_at = time.perf_counter()
+            build(repository, args.customers, args.calls_per_customer)
+            print(
+                f"Built {args.customers} customers, "
+                f"{args.customers * args.calls_per_customer} calls in "
+                f"{time.perf_counter() - started_at:.1f}s "
+                f"({path.stat().st_size / 2**20:.0f}MB)"
+            )
+
+        started_at = time.perf_counter()
+        index = PhoneIndex.build(repository.iter_phone_numbers())
+        print(
+            f"Indexed {len(index)} phone numbers in "
+            f"{time.perf_counter() - started_at:.1f}s"
+        )
+
+        numbers = lookup_numbers(args.customers, args.lookups, args.miss_rate)
+        print(
+            f"\n=== {args.lookups} lookups, {args.miss_rate:.0%} unknown numbers, "
+            f"pool of {args.pool_size} connections ===\n"
+        )
+        print(
+            f"{'mode':<24} {'throughput':>11} {'mean':>10} {'p50':>10} "
+            f"{'p99':>10} {'max':>10}"
+        )
+        bench_phone_index(index, numbers)
+        bench_blocking(repository, numbers)
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            asyncio.run(bench_async(repository, numbers, concurrency))
+        bench_batch(repository, args.customers, args.batch_size)
+        repository.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: holding the customer base and its call history in memory.
+
+Compares the per-item memory of plain dataclasses (one __dict__ per instance),
+the slotted frozen dataclasses of services/customer_service.py, and the
+columnar CallHistoryStore, as rows read from the database would create them:
+fresh strings and datetimes for every row. Object forms are measured on a
+sample and extrapolated; the columnar store is built at full scale (default
+1M customers with 10M calls), then saved and mapped back as the worker's job
+processes do, measuring what mapping costs a job process.
+"""
+
+import argparse
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from services.call_history_store import CallHistoryStore  # noqa: E402
+from services.customer_service import CallHistory, Customer  # noqa: E402
+
+DIRECTIONS = ["inbound", "outbound"]
+OUTCOMES = ["scheduled", "voicemail", "no_answer", "completed"]
+NOTES = [
+    "annual maintenance scheduling",
+    "water heater service reminder",
+    "furnace tune-up follow up",
+    "customer asked to call back next week",
+]
+
+
+@dataclass
+class DictCustomer:
+    first_name: str
+    last_name: str
+    phone_primary: str
+
+
+@dataclass
+class DictCallHistory:
+    call_direction: str
+    call_outcome: str
+    created_at: datetime
+    notes: str
+
+
+def customer_fields(i: int) -> tuple[str, str, str]:
+    return f"First{i}", f"Last{i}", f"+1{2000000000 + i}"
+
+
+def call_fields(rng: random.Random, now: datetime) -> tuple[str, str, datetime, str]:
+    # Copies, as a database driver hands back a new string per row
+    return (
+        "".join(rng.choice(DIRECTIONS)),
+        "".join(rng.choice(OUTCOMES)),
+        now - timedelta(seconds=rng.randrange(0, 3 * 365 * 86400)),
+        "".join(rng.choice(NOTES)),
+    )
+
+
+def measure(build) -> tuple[int, float, object]:
+    """Bytes allocated by build(), and how long it took."""
+    gc.collect()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started_at
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated, elapsed, result
+
+
+def call_rows(customers: int, calls: int, seed: int):
+    """Sorted (customer_id, direction, outcome, epoch, notes) rows."""
+    rng = random.Random(seed)
+    now = int(time.time())
+    per_customer, extra = divmod(calls, customers)
+    for customer_id in range(1, customers + 1):
+        count = per_customer + (1 if customer_id <= extra else 0)
+        times = sorted(now - rng.randrange(0, 3 * 365 * 86400) for _ in range(count))
+        for created_at in times:
+            yield (
+                customer_id,
+                rng.choice(DIRECTIONS),
+                rng.choice(OUTCOMES),
+                created_at,
+                rng.choice(NOTES),
+            )
+
+
+def report(name: str, per_item: float, count: int) -> None:
+    print(
+        f"{name:<36} {per_item:>8.1f} B/item {per_item * count / 2**20:>10.0f}MB "
+        f"for {count:,}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark in-memory customer data")
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--calls", type=int, default=10_000_000)
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=500_000,
+        help="Objects built per object form, extrapolated to the full size",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sample = min(args.sample, args.customers, args.calls)
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    print(
+        f"\n=== {args.customers:,} customers, {args.calls:,} calls "
+        f"(object forms sampled at {sample:,}) ===\n"
+    )
+
+    for name, cls in (
+        ("Customer, dataclass", DictCustomer),
+        ("Customer, slots", Customer),
+    ):
+        allocated, _, objects = measure(
+            lambda cls=cls: [cls(*customer_fields(i)) for i in range(sample)]
+        )
+        report(name, allocated / sample, args.customers)
+        del objects
+
+    for name, cls in (
+        ("CallHistory, dataclass", DictCallHistory),
+        ("CallHistory, slots", CallHistory),
+    ):
+        allocated, _, objects = measure(
+            lambda cls=cls: [cls(*call_fields(rng, now)) for _ in range(sample)]
+        )
+        report(name, allocated / sample, args.calls)
+        del objects
+
+    allocated, elapsed, store = measure(
+        lambda: CallHistoryStore.build(call_rows(args.customers, args.calls, args.seed))
+    )
+    report("CallHistory, columnar store", allocated / args.calls, args.calls)
+    print(f"\nBuilt the columnar store in {elapsed:.1f}s")
+
+    started_at = time.perf_counter()
+    lookups = 10_000
+    for _ in range(lookups):
+        customer_id = rng.randrange(1, args.customers + 1)
+        store.recent(customer_id, 5)
+        store.outcome_counts(customer_id)
+    print(
+        f"Last 5 calls and outcome counts of a customer: "
+        f"{(time.perf_counter() - started_at) / lookups * 1e6:.1f}us"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "customers.db.calls"
+        started_at = time.perf_counter()
+        store.save(path)
+        print(
+            f"\nSaved the snapshot ({path.stat().st_size / 2**20:.0f}MB) in "
+            f"{time.perf_counter() - started_at:.2f}s"
+        )
+        del store
+        allocated, elapsed, store = measure(lambda: CallHistoryStore.open(path))
+        print(
+            f"Mapped it in a job process in {elapsed * 1000:.1f}ms, "
+            f"{allocated / 2**10:.0f}KB of heap; the columns are shared pages"
+        )
+        started_at = time.perf_counter()
+        for _ in range(lookups):
+            customer_id = rng.randrange(1, args.customers + 1)
+            store.recent(customer_id, 5)
+            store.outcome_counts(customer_id)
+        print(
+            f"Last 5 calls and outcome counts, mapped: "
+            f"{(time.perf_counter() - started_at) / lookups * 1e6:.1f}us"
+        )
+        del store
+
+
+if __name__ == "__main__":
+    main()
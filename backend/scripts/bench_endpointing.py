@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Endpointing benchmark: response latency against false interruptions.
+
+Replays the pauses of a set of calls through an endpointing policy. Every pause
+comes with the turn detector's end-of-turn probability at that point and
+whether the caller was actually done; a pause inside a turn that outlasts the
+policy's silence window is a false interruption (we cut in on the caller), and
+the window applied at the real end of a turn is the response latency it adds.
+
+The baselines are the framework's own endpointing with its default delays:
+the turn ends min_endpointing_delay (0.5s) after the end of speech, or
+max_endpointing_delay (6s) when the turn detector finds it unlikely, and never
+before the VAD has reported the end of speech. They are run with the VAD
+silence the agent uses without adaptive endpointing (0.8s) and with Silero's
+default (0.55s), and compared with the adaptive EndpointingPolicy for a sweep
+of its shortest window.
+
+By default the calls are synthetic speakers, each with their own pause habits.
+Recorded calls can be replayed with --pauses, a JSONL file with one pause per
+line: {"call": "...", "pause": 0.62, "probability": 0.08, "end_of_turn": false}
+in the order they happened within each call.
+"""
+
+import argparse
+import json
+import math
+import random
+import statistics
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from services.adaptive_endpointing import EndpointingPolicy  # noqa: E402
+
+
+class FixedWindow:
+    """The framework's endpointing: fixed delays, longer when the end is unlikely."""
+
+    def __init__(self, min_delay: float = 0.5, max_delay: float = 6.0):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+
+    def silence_window(self, probability: float, unlikely_threshold: float) -> float:
+        if probability < unlikely_threshold:
+            return self.max_delay
+        return self.min_delay
+
+    def on_pause_resumed(self, pause: float) -> None:
+        pass
+
+    def on_cut_in(self, pause: float) -> None:
+        pass
+
+    def on_turn_ended(self) -> None:
+        pass
+
+
+def synthetic_calls(
+    num_calls: int, turns_per_call: int, rng: random.Random
+) -> list[list[dict]]:
+    """Calls from speakers who differ in how long and how often they pause."""
+    calls = []
+    for _ in range(num_calls):
+        # Median pause inside a turn, from quick talkers to slow, hesitant ones
+        median_pause = rng.uniform(0.25, 0.9)
+        pauses_per_turn = rng.uniform(0.3, 2.5)
+        pauses = []
+        for _ in range(turns_per_call):
+            for _ in range(_poisson(pauses_per_turn, rng)):
+                # Mostly mid-sentence, sometimes after a complete clause
+                # ("My AC stopped working. ... It's making a noise.")
+                complete = rng.random() < 0.2
+                pauses.append(
+                    {
+                        "pause": rng.lognormvariate(math.log(median_pause), 0.5),
+                        "probability": rng.betavariate(5, 2)
+                        if complete
+                        else rng.betavariate(1, 8),
+                        "end_of_turn": False,
+                    }
+                )
+            # Short answers ("yes", a number) can look unfinished to the model;
+            # the caller then waits for us as long as it takes
+            looks_done = rng.random() < 0.85
+            pauses.append(
+                {
+                    "pause": math.inf,
+                    "probability": rng.betavariate(8, 1)
+                    if looks_done
+                    else rng.betavariate(2, 5),
+                    "end_of_turn": True,
+                }
+            )
+        calls.append(pauses)
+    return calls
+
+
+def _poisson(mean: float, rng: random.Random) -> int:
+    count, threshold, product = 0, math.exp(-mean), rng.random()
+    while product > threshold:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def load_calls(path: Path) -> list[list[dict]]:
+    calls: dict[str, list[dict]] = defaultdict(list)
+    with path.open() as f:
+        for line in f:
+            if line.strip():
+                pause = json.loads(line)
+                if pause["end_of_turn"]:
+                    pause["pause"] = math.inf
+                calls[pause.get("call", "")].append(pause)
+    return list(calls.values())
+
+
+def simulate(
+    make_policy,
+    calls: list[list[dict]],
+    unlikely_threshold: float,
+    vad_min_silence: float,
+) -> dict:
+    """Run every call through a fresh policy, as each session gets its own."""
+    latencies, turns, interruptions, mid_turn_pauses = [], 0, 0, 0
+    for call in calls:
+        policy = make_policy()
+        for pause in call:
+            # The VAD has to report the end of speech before any window applies
+            window = max(
+                policy.silence_window(pause["probability"], unlikely_threshold),
+                vad_min_silence,
+            )
+            if pause["end_of_turn"]:
+                turns += 1
+                latencies.append(window)
+                policy.on_turn_ended()
+            elif pause["pause"] >= window:
+                mid_turn_pauses += 1
+                interruptions += 1
+                policy.on_turn_ended()
+                policy.on_cut_in(pause["pause"])
+            else:
+                mid_turn_pauses += 1
+                policy.on_pause_resumed(pause["pause"])
+
+    latencies.sort()
+    return {
+        "latency_mean": statistics.mean(latencies),
+        "latency_p50": latencies[len(latencies) // 2],
+        "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "interruption_rate": interruptions / turns,
+        "interrupted_pauses": interruptions / max(mid_turn_pauses, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare endpointing policies on latency and false interruptions"
+    )
+    parser.add_argument("--pauses", type=Path, help="JSONL file of recorded pauses")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=12, help="Turns per call")
+    parser.add_argument(
+        "--unlikely-threshold",
+        type=float,
+        default=0.15,
+        help="Turn detector's unlikely threshold for the call language",
+    )
+    parser.add_argument(
+        "--min-silence",
+        type=float,
+        default=0.3,
+        help="VAD min_silence_duration used with adaptive endpointing",
+    )
+    parser.add_argument(
+        "--short-windows",
+        default="0.3,0.35,0.45,0.6",
+        help="Comma-separated shortest windows to sweep for the adaptive policy",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.pauses:
+        calls = load_calls(args.pauses)
+    else:
+        calls = synthetic_calls(args.calls, args.turns, random.Random(args.seed))
+    num_pauses = sum(len(call) for call in calls)
+    print(
+        f"\n=== Endpointing: {len(calls)} calls, {num_pauses} pauses, "
+        f"unlikely_threshold={args.unlikely_threshold} ===\n"
+    )
+    print(
+        f"{'policy':<28} {'mean':>7} {'p50':>7} {'p95':>7} "
+        f"{'interrupted turns':>18} {'interrupted pauses':>19}"
+    )
+
+    policies = [
+        ("default, VAD 0.8s", FixedWindow, 0.8),
+        ("default, VAD 0.55s", FixedWindow, 0.55),
+    ]
+    for short_window in (float(w) for w in args.short_windows.split(",")):
+        policies.append(
+            (
+                f"adaptive short={short_window:.2f}s",
+                lambda w=short_window: EndpointingPolicy(short_window=w),
+                args.min_silence,
+            )
+        )
+    for name, make_policy, min_silence in policies:
+        row = simulate(make_policy, calls, args.unlikely_threshold, min_silence)
+        print(
+            f"{name:<28} {row['latency_mean'] * 1000:>5.0f}ms "
+            f"{row['latency_p50'] * 1000:>5.0f}ms {row['latency_p95'] * 1000:>5.0f}ms "
+            f"{row['interruption_rate']:>18.1%} {row['interrupted_pauses']:>19.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
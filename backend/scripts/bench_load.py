@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Load test: how many concurrent calls one machine can carry.
+
+Ramps up the number of concurrent simulated jobs. Like the LiveKit worker, every
+job runs in its own process, prewarmed with the Silero VAD, and replays a
+scripted call through the agent with fake providers (see bench_replay.py), so
+no LiveKit server or provider account is needed. Turns end on the agent's turn
+detector, run for every job by one shared inference process as in the worker;
+its model is downloaded with `python agent.py download-files`. Each level
+reports CPU and RSS per session, event-loop lag and turn latency percentiles,
+i.e. the capacity curve to size the worker's LOAD_THRESHOLD and
+LOAD_MAX_SESSIONS against.
+"""
+
+import argparse
+import asyncio
+import functools
+import math
+import multiprocessing as mp
+import queue
+import statistics
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import psutil
+from bench_replay import BUILTIN_SCRIPT, load_script, replay
+from fake_providers import Latency
+from livekit.agents.inference_runner import _InferenceRunner
+from livekit.agents.ipc.inference_proc_executor import InferenceProcExecutor
+from livekit.agents.job import _JobContextVar
+from livekit.plugins import silero
+from livekit.plugins.turn_detector.english import EnglishModel
+
+
+class InferenceRelay:
+    """
+    The worker's inference process, shared by every simulated job.
+
+    As in the worker, jobs don't reach the inference process directly: their
+    requests go to this, the main process, which forwards them and sends each
+    response back to the job that asked, on that job's queue in `responses`.
+    """
+
+    def __init__(self, mp_ctx):
+        self.requests = mp_ctx.Queue()
+        self.responses: list[mp.Queue] = []
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        self._executor = self._call(self._start(mp_ctx))
+        threading.Thread(target=self._relay, daemon=True).start()
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _start(self, mp_ctx) -> InferenceProcExecutor:
+        # Configured like the worker's
+        executor = InferenceProcExecutor(
+            runners=_InferenceRunner.registered_runners,
+            initialize_timeout=30,
+            close_timeout=5,
+            memory_warn_mb=2000,
+            memory_limit_mb=0,
+            ping_interval=5,
+            ping_timeout=60,
+            high_ping_threshold=2.5,
+            mp_ctx=mp_ctx,
+            loop=self._loop,
+            http_proxy=None,
+        )
+        await executor.start()
+        await executor.initialize()
+        return executor
+
+    def _relay(self) -> None:
+        while (request := self.requests.get()) is not None:
+            index, request_id, method, data = request
+            future = asyncio.run_coroutine_threadsafe(
+                self._executor.do_inference(method, data), self._loop
+            )
+            future.add_done_callback(
+                functools.partial(self._respond, index, request_id)
+            )
+
+    def _respond(self, index: int, request_id: int, future) -> None:
+        error = future.exception()
+        response = (
+            (request_id, None, repr(error))
+            if error
+            else (request_id, future.result(), None)
+        )
+        # Jobs of an earlier level are gone
+        if index < len(self.responses):
+            self.responses[index].put(response)
+
+    def close(self) -> None:
+        self.requests.put(None)
+        self._call(self._executor.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class RelayedInferenceExecutor:
+    """A job's InferenceExecutor, sending its requests through the relay."""
+
+    def __init__(self, index: int, requests: mp.Queue, responses: mp.Queue):
+        self._index = index
+        self._requests = requests
+        self._responses = responses
+        self._loop = asyncio.get_running_loop()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        threading.Thread(target=self._receive, daemon=True).start()
+
+    def _receive(self) -> None:
+        while True:
+            response = self._responses.get()
+            try:
+                self._loop.call_soon_threadsafe(self._resolve, *response)
+            except RuntimeError:
+                # The session is over and its loop closed
+                return
+
+    def _resolve(self, request_id: int, data: bytes | None, error: str | None) -> None:
+        future = self._pending.pop(request_id, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(data)
+
+    async def do_inference(self, method: str, data: bytes) -> bytes | None:
+        self._next_id += 1
+        future = self._loop.create_future()
+        self._pending[self._next_id] = future
+        self._requests.put((self._index, self._next_id, method, data))
+        return await future
+
+
+def _turn_detector(executor: RelayedInferenceExecutor) -> EnglishModel:
+    # The model takes its inference executor from the job's context
+    token = _JobContextVar.set(SimpleNamespace(inference_executor=executor))
+    try:
+        return EnglishModel()
+    finally:
+        _JobContextVar.reset(token)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _watch_loop_lag(samples: list[float], interval: float = 0.05) -> None:
+    """Sample how late the event loop wakes up a sleeping task."""
+    while True:
+        started_at = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started_at - interval)
+
+
+async def _run_session(
+    args: argparse.Namespace, script: list[dict], vad, inference: tuple
+) -> dict:
+    turn_detection = _turn_detector(RelayedInferenceExecutor(*inference))
+    lag: list[float] = []
+    lag_task = asyncio.create_task(_watch_loop_lag(lag))
+    cpu_started = time.process_time()
+    started_at = time.perf_counter()
+    try:
+        result = await replay(args, script, vad=vad, turn_detection=turn_detection)
+    finally:
+        lag_task.cancel()
+    return {
+        "cpu": time.process_time() - cpu_started,
+        "wall": time.perf_counter() - started_at,
+        "rss": psutil.Process().memory_info().rss,
+        "loop_lag": lag,
+        "turns": [turn["total"] for turn in result["turns"]],
+        "overhead": [
+            turn["total"] - turn["sentence"] - turn["provider"]
+            for turn in result["turns"]
+        ],
+    }
+
+
+def job_process(
+    args: argparse.Namespace,
+    script: list[dict],
+    index: int,
+    ready: mp.Queue,
+    start: mp.Event,
+    results: mp.Queue,
+    inference_requests: mp.Queue,
+    inference_responses: mp.Queue,
+) -> None:
+    """One simulated job, in its own process like the worker's process pool."""
+    vad = silero.VAD.load(
+        activation_threshold=0.7,
+        min_speech_duration=0.15,
+        min_silence_duration=0.8,
+    )
+    ready.put(index)
+    start.wait()
+    # Calls don't all arrive in the same instant
+    time.sleep(index * args.stagger)
+    args.seed = args.seed + index
+    try:
+        inference = (index, inference_requests, inference_responses)
+        results.put(asyncio.run(_run_session(args, script, vad, inference)))
+    except Exception as e:
+        results.put({"error": repr(e)})
+
+
+def run_level(
+    args: argparse.Namespace,
+    script: list[dict],
+    sessions: int,
+    inference: InferenceRelay,
+) -> list:
+    ctx = mp.get_context("spawn")
+    ready, results, start = ctx.Queue(), ctx.Queue(), ctx.Event()
+    inference.responses = [ctx.Queue() for _ in range(sessions)]
+    procs = [
+        ctx.Process(
+            target=job_process,
+            args=(
+                args,
+                script,
+                i,
+                ready,
+                start,
+                results,
+                inference.requests,
+                inference.responses[i],
+            ),
+        )
+        for i in range(sessions)
+    ]
+    for proc in procs:
+        proc.start()
+    # Start every call once all processes have imported and prewarmed
+    for _ in procs:
+        ready.get(timeout=args.timeout)
+    # Reset the machine-wide CPU measurement window
+    psutil.cpu_percent(interval=None)
+    start.set()
+
+    collected = []
+    try:
+        for _ in procs:
+            collected.append(results.get(timeout=args.timeout))
+    except queue.Empty:
+        print(f"  timed out waiting for {sessions - len(collected)} sessions")
+    machine_cpu = psutil.cpu_percent(interval=None)
+    for proc in procs:
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.kill()
+    for session in collected:
+        session["machine_cpu"] = machine_cpu
+    return collected
+
+
+def summarize(sessions: int, collected: list[dict]) -> dict:
+    ok = [s for s in collected if "error" not in s]
+    for s in collected:
+        if "error" in s:
+            print(f"  session failed: {s['error']}")
+    if not ok:
+        return {"sessions": sessions}
+    turns = [t for s in ok for t in s["turns"]]
+    lag = [v for s in ok for v in s["loop_lag"]]
+    return {
+        "sessions": sessions,
+        "failed": len(collected) - len(ok) + (sessions - len(collected)),
+        "cpu_per_session": statistics.mean(s["cpu"] / s["wall"] for s in ok),
+        "machine_cpu": ok[0]["machine_cpu"],
+        "rss_mb": statistics.mean(s["rss"] for s in ok) / 2**20,
+        "lag_p99": _percentile(lag, 99),
+        "lag_max": max(lag),
+        "turn_p50": _percentile(turns, 50),
+        "turn_p95": _percentile(turns, 95),
+        "turn_p99": _percentile(turns, 99),
+        "overhead_p95": _percentile([o for s in ok for o in s["overhead"]], 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp concurrent simulated calls")
+    parser.add_argument(
+        "--levels",
+        default="1,2,4,8",
+        help="Comma-separated numbers of concurrent sessions to ramp through",
+    )
+    parser.add_argument("--script", type=Path, help="JSONL file of scripted turns")
+    parser.add_argument(
+        "--direction", choices=["inbound", "outbound"], default="inbound"
+    )
+    parser.add_argument("--phone", default="+15551234567", help="Caller number")
+    parser.add_argument("--stt-final", default="0.15:0.05")
+    parser.add_argument("--llm-ttft", default="0.35:0.1")
+    parser.add_argument("--llm-token", default="0.02:0.005")
+    parser.add_argument("--tts-ttfb", default="0.25:0.05")
+    parser.add_argument(
+        "--playout-speed",
+        type=float,
+        default=1.0,
+        help="Play agent audio this many times faster than real time",
+    )
+    parser.add_argument(
+        "--stagger", type=float, default=0.2, help="Seconds between call arrivals"
+    )
+    parser.add_argument(
+        "--max-lag",
+        type=float,
+        default=0.05,
+        help="Event-loop lag p99 (s) above which a level is considered overloaded",
+    )
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=1.2,
+        help="Turn latency p95 relative to one session above which a level is overloaded",
+    )
+    parser.add_argument(
+        "--load-threshold",
+        type=float,
+        default=0.75,
+        help="The worker's LOAD_THRESHOLD, to suggest LOAD_MAX_SESSIONS for",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    script = load_script(args.script) if args.script else BUILTIN_SCRIPT
+    levels = [int(n) for n in args.levels.split(",")]
+    print(
+        f"\n=== Load test: {len(script)} turns per call, levels {levels}, "
+        f"{psutil.cpu_count()} CPUs, llm_ttft={Latency.parse(args.llm_ttft)} "
+        f"tts_ttfb={Latency.parse(args.tts_ttfb)} ===\n"
+    )
+    print(
+        f"{'sessions':>8} {'cpu/sess':>9} {'machine':>8} {'rss/sess':>9} "
+        f"{'lag p99':>8} {'lag max':>8} {'turn p50':>9} {'turn p95':>9} "
+        f"{'turn p99':>9} {'ovh p95':>8}"
+    )
+
+    curve = []
+    inference = InferenceRelay(mp.get_context("spawn"))
+    try:
+        for sessions in levels:
+            row = summarize(sessions, run_level(args, script, sessions, inference))
+            if "turn_p50" not in row:
+                print(f"{sessions:>8} all sessions failed")
+                continue
+            curve.append(row)
+            print(
+                f"{sessions:>8} {row['cpu_per_session']:>8.1%} {row['machine_cpu']:>7.0f}% "
+                f"{row['rss_mb']:>7.0f}MB {row['lag_p99'] * 1000:>6.1f}ms "
+                f"{row['lag_max'] * 1000:>6.1f}ms {row['turn_p50'] * 1000:>7.0f}ms "
+                f"{row['turn_p95'] * 1000:>7.0f}ms {row['turn_p99'] * 1000:>7.0f}ms "
+                f"{row['overhead_p95'] * 1000:>6.1f}ms"
+                + (f"  ({row['failed']} failed)" if row["failed"] else "")
+            )
+    finally:
+        inference.close()
+
+    if not curve:
+        return
+    baseline = curve[0]["turn_p95"]
+    healthy = [
+        row
+        for row in curve
+        if not row["failed"]
+        and row["lag_p99"] <= args.max_lag
+        and row["turn_p95"] <= baseline * args.max_slowdown
+    ]
+    if not healthy:
+        print("\nEven the first level is overloaded")
+        return
+    best = healthy[-1]
+    print(
+        f"\nHighest healthy level: {best['sessions']} concurrent sessions "
+        f"(machine CPU {best['machine_cpu']:.0f}%, "
+        f"{best['cpu_per_session']:.1%} of a core per session)."
+    )
+    # The worker's load is the most saturated of sessions / LOAD_MAX_SESSIONS,
+    # its child processes' CPU and loop lag; it stops taking jobs once that
+    # reaches LOAD_THRESHOLD
+    threshold = args.load_threshold
+    max_sessions = max(math.floor(best["sessions"] / threshold), 1)
+    child_cpu = best["machine_cpu"] / 100
+    print(
+        f"With LOAD_THRESHOLD={threshold:.2f}, LOAD_MAX_SESSIONS={max_sessions} "
+        f"stops the worker taking jobs around this level."
+    )
+    if child_cpu >= threshold:
+        print(
+            f"Its child process CPU load there is already {child_cpu:.2f}, so the "
+            f"CPU component stops it earlier; raise LOAD_THRESHOLD to use this level."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark job startup time with and without worker prewarming.
+
+Measures the time from job assignment until the agent is ready to start its
+session, i.e. the work `entrypoint` does before `session.start`, for a number
+of simulated jobs handled by a single worker process.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from livekit.plugins import silero
+
+from agent import CustomerServiceAgent, prewarm, template_dir
+from services.template_registry import TemplateRegistry
+
+
+def _fake_ctx(proc: SimpleNamespace, room_name: str) -> SimpleNamespace:
+    return SimpleNamespace(proc=proc, room=SimpleNamespace(name=room_name))
+
+
+def run_cold(num_jobs: int, room_name: str) -> list[float]:
+    """Every job loads its own VAD and prompt templates (previous behaviour)."""
+    timings = []
+    for _ in range(num_jobs):
+        started_at = time.perf_counter()
+        proc = SimpleNamespace(userdata={})
+        proc.userdata["vad"] = silero.VAD.load(
+            activation_threshold=0.7,
+            min_speech_duration=0.15,
+            min_silence_duration=0.8,
+        )
+        proc.userdata["templates"] = TemplateRegistry(template_dir)
+        CustomerServiceAgent(_fake_ctx(proc, room_name))
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def run_warm(num_jobs: int, room_name: str) -> tuple[float, list[float]]:
+    """The worker process is prewarmed once and every job reuses its userdata."""
+    proc = SimpleNamespace(userdata={})
+    started_at = time.perf_counter()
+    prewarm(proc)
+    prewarm_time = time.perf_counter() - started_at
+
+    timings = []
+    for _ in range(num_jobs):
+        started_at = time.perf_counter()
+        CustomerServiceAgent(_fake_ctx(proc, room_name))
+        timings.append(time.perf_counter() - started_at)
+    return prewarm_time, timings
+
+
+def _summary(label: str, timings: list[float]) -> None:
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(
+        f"{label:<6} mean={statistics.mean(ms):8.2f}ms  "
+        f"median={statistics.median(ms):8.2f}ms  p95={p95:8.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker prewarming")
+    parser.add_argument("--jobs", type=int, default=20, help="Jobs per worker")
+    parser.add_argument(
+        "--room", default="inbound_+15551234567", help="Room name to simulate"
+    )
+    args = parser.parse_args()
+
+    print(f"\n=== Job startup: {args.jobs} jobs on one worker process ===\n")
+    cold = run_cold(args.jobs, args.room)
+    prewarm_time, warm = run_warm(args.jobs, args.room)
+
+    _summary("cold", cold)
+    _summary("warm", warm)
+    print(f"\nOne-time prewarm cost: {prewarm_time * 1000:.2f}ms")
+    saved = statistics.mean(cold) - statistics.mean(warm)
+    print(f"Saved per job: {saved * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Replay scripted calls through the agent offline and measure our own overhead.
+
+Runs the real CustomerServiceAgent in an AgentSession whose STT, LLM, TTS and
+room audio are fakes with configurable latency distributions (see
+fake_providers.py), so no network access is needed. Each turn's response time
+is split into stages, and the time not spent waiting on a provider is reported
+as overhead. Separate passes profile event-loop time and memory allocations in
+our code (llm_node/tts_node wrappers, tracing, template rendering, ...).
+
+Script file format (JSONL), one user turn per line:
+    {"user": "I'd like to book a tune-up", "reply": "Sure, when works for you?"}
+"reply" is what the fake LLM answers. The optional "audio" is a 16-bit PCM WAV
+played as the caller's microphone during the turn, e.g. for beep detection.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from fake_providers import (
+    FakeAudioOutput,
+    FakeLLM,
+    FakeSTT,
+    FakeTTS,
+    Latency,
+    ScriptedAudioInput,
+    fake_job_context,
+    read_wav,
+)
+from livekit.agents import AgentSession
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+# Keep the replay offline: the Langfuse client is disabled without keys, while
+# traces still go through our exporter. Must be set before agent loads .env.
+os.environ["LANGFUSE_PUBLIC_KEY"] = ""
+os.environ["LANGFUSE_SECRET_KEY"] = ""
+
+from agent import CustomerServiceAgent, greet, template_dir  # noqa: E402
+from services.customer_service import CustomerService  # noqa: E402
+from services.template_registry import TemplateRegistry  # noqa: E402
+
+BUILTIN_SCRIPT = [
+    {
+        "user": "Hi, yes, this is John. My furnace has been making a rattling noise.",
+        "reply": "I'm sorry to hear that, John. Is that the Carrier furnace we installed in 2019?",
+    },
+    {
+        "user": "Yeah, that's the one in the basement.",
+        "reply": "Got it. I'd recommend having a technician take a look. Would you like to schedule a visit?",
+    },
+    {
+        "user": "Sure, what do you have this week?",
+        "reply": "I have Tuesday between nine and eleven, or Wednesday between one and three. Which works better?",
+    },
+    {
+        "user": "Wednesday afternoon is better for me.",
+        "reply": "Great, I'll put you down for Wednesday between one and three.",
+    },
+    {
+        "user": "Will the technician call before coming?",
+        "reply": "Yes, they'll call about thirty minutes before they arrive.",
+    },
+    {
+        "user": "Perfect. Is there a charge for the visit?",
+        "reply": "As a maintenance plan member, the diagnostic visit is covered. Repairs are quoted on site.",
+    },
+    {
+        "user": "Okay, that sounds good.",
+        "reply": "Wonderful. Is there anything else I can help you with today?",
+    },
+    {
+        "user": "No, that's all, thanks.",
+        "reply": "Thanks for calling Acme HVAC, John. Have a great day!",
+    },
+]
+
+# Our code, as opposed to the agents framework and the fakes
+OUR_FILES = [PROJECT_ROOT / "agent.py", PROJECT_ROOT / "services"]
+
+
+def _is_ours(filename: str) -> bool:
+    path = Path(filename)
+    return any(path == p or p in path.parents for p in OUR_FILES)
+
+
+def _short(filename: str) -> str:
+    return str(Path(filename).relative_to(PROJECT_ROOT))
+
+
+def load_script(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines() if line]
+
+
+async def replay(
+    args: argparse.Namespace,
+    script: list[dict],
+    on_turns=None,
+    vad=None,
+    turn_detection=None,
+) -> dict:
+    """
+    Run one call through the agent.
+
+    on_turns, if given, is a context manager factory wrapped around the user
+    turns (after the greeting), e.g. to profile just the steady state. A VAD
+    and a turn detector model can be given to include their inference in the
+    measurements; without a model, turns end on the STT's end of speech.
+    """
+    rng = random.Random(args.seed)
+    loop = asyncio.get_running_loop()
+    stt = FakeSTT(Latency.parse(args.stt_final), rng)
+    llm = FakeLLM(
+        Latency.parse(args.llm_ttft),
+        Latency.parse(args.llm_token),
+        rng,
+        replies=["Hi, this is Sarah from Acme HVAC. How can I help you today?"]
+        + [turn["reply"] for turn in script],
+    )
+    tts = FakeTTS(Latency.parse(args.tts_ttfb), rng)
+
+    first_audio: asyncio.Future | None = None
+    listening = asyncio.Event()
+
+    def on_first_frame(captured_at: float) -> None:
+        if first_audio is not None and not first_audio.done():
+            listening.clear()
+            first_audio.set_result(captured_at)
+
+    session = AgentSession(
+        stt=stt,
+        llm=llm,
+        tts=tts,
+        vad=vad,
+        turn_detection=turn_detection or "stt",
+        min_endpointing_delay=0.0,
+        # Scripted turns are complete: measure the model's inference, not the
+        # wait for more speech after a turn it finds unfinished
+        max_endpointing_delay=0.0,
+    )
+    audio_input = ScriptedAudioInput()
+    session.input.audio = audio_input
+    session.output.audio = FakeAudioOutput(args.playout_speed, on_first_frame)
+    session.on(
+        "agent_state_changed",
+        lambda ev: listening.set() if ev.new_state == "listening" else None,
+    )
+
+    templates = TemplateRegistry(template_dir)
+    templates.precompile()
+    room_name = f"{args.direction}_{args.phone}"
+    started_at = time.perf_counter()
+    template_context = CustomerService.get_template_context(args.phone)
+    agent = CustomerServiceAgent(
+        fake_job_context(room_name, {"templates": templates}), template_context
+    )
+    setup_time = time.perf_counter() - started_at
+    # Summaries of long calls go to a fake too
+    summary_llm = FakeLLM(Latency(0.5), Latency(0.0), rng, ["Earlier summary."])
+    agent.context_window._summary_llm_factory = lambda: summary_llm
+
+    await session.start(agent)
+    await greet(session, agent, None)
+
+    turns = []
+    with on_turns() if on_turns else contextlib.nullcontext():
+        for turn in script:
+            llm.requests.clear()
+            tts.requests.clear()
+            first_audio = loop.create_future()
+            listening.clear()
+            if turn.get("audio"):
+                audio_input.play(read_wav(Path(turn["audio"])))
+            stt.say(turn["user"])
+
+            audio_at = await asyncio.wait_for(first_audio, timeout=args.turn_timeout)
+            speech_ended_at = stt.speech_ended_at
+            llm_request, tts_request = llm.requests[0], tts.requests[0]
+            tts_first_byte_at = tts_request["started_at"] + tts_request["ttfb"]
+            turns.append(
+                {
+                    "stt_final": stt.last_final_latency,
+                    "pre_llm": llm_request["started_at"]
+                    - speech_ended_at
+                    - stt.last_final_latency,
+                    "llm_ttft": llm_request["first_token_at"]
+                    - llm_request["started_at"],
+                    "sentence": tts_request["started_at"]
+                    - llm_request["first_token_at"],
+                    "tts_ttfb": tts_request["ttfb"],
+                    "post_tts": audio_at - tts_first_byte_at,
+                    "total": audio_at - speech_ended_at,
+                    "provider": stt.last_final_latency
+                    + llm_request["ttft"]
+                    + tts_request["ttfb"],
+                }
+            )
+            await asyncio.wait_for(listening.wait(), timeout=args.turn_timeout)
+
+    agent.close()
+    await session.aclose()
+    return {"setup_time": setup_time, "turns": turns}
+
+
+def _ms(values: list[float]) -> str:
+    ms = sorted(v * 1000 for v in values)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return f"mean={statistics.mean(ms):7.2f}ms p95={p95:7.2f}ms"
+
+
+def report_latency(result: dict) -> None:
+    turns = result["turns"]
+    print(f"agent setup (lookup + templates): {result['setup_time'] * 1000:.2f}ms")
+    print("stages, end of speech to first audio:")
+    stages = ("stt_final", "pre_llm", "llm_ttft", "sentence", "tts_ttfb", "post_tts")
+    for stage in (*stages, "total"):
+        print(f"  {stage:<9} {_ms([t[stage] for t in turns])}")
+    # Time the turn took beyond what the providers were told to take. The
+    # sentence stage is excluded, it is the LLM streaming the first sentence.
+    overhead = [t["total"] - t["sentence"] - t["provider"] for t in turns]
+    print(f"overhead  {_ms(overhead)}")
+
+
+def report_cpu(profile: cProfile.Profile, num_turns: int, top: int) -> None:
+    stats = pstats.Stats(profile).stats
+    # Busy time only, not the loop waiting in select/epoll
+    loop_time = sum(
+        tt
+        for (filename, _, name), (_, _, tt, _, _) in stats.items()
+        if not (filename == "~" and "of 'select." in name)
+    )
+    ours = [
+        (tt, ct, nc, f"{_short(filename)}:{line} {name}")
+        for (filename, line, name), (_, nc, tt, ct, _) in stats.items()
+        if _is_ours(filename)
+    ]
+    our_time = sum(tt for tt, *_ in ours)
+    print(
+        f"event loop time per turn: {loop_time / num_turns * 1000:.2f}ms, "
+        f"of which our code {our_time / num_turns * 1000:.2f}ms "
+        f"({our_time / loop_time:.1%})"
+    )
+    print(f"  {'self/turn':>10} {'cum/turn':>10} {'calls':>7}  function")
+    for tt, ct, nc, label in sorted(ours, reverse=True)[:top]:
+        print(
+            f"  {tt / num_turns * 1e6:8.1f}us {ct / num_turns * 1e6:8.1f}us "
+            f"{nc:7d}  {label}"
+        )
+
+
+def report_alloc(
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    peak: int,
+    num_turns: int,
+    top: int,
+) -> None:
+    # Attribute each allocation to the innermost frame in our code
+    by_line: dict[str, list[int]] = {}
+    for diff in after.compare_to(before, "traceback"):
+        frame = next(
+            (f for f in reversed(diff.traceback) if _is_ours(f.filename)), None
+        )
+        if frame is None:
+            continue
+        totals = by_line.setdefault(f"{_short(frame.filename)}:{frame.lineno}", [0, 0])
+        totals[0] += diff.size_diff
+        totals[1] += diff.count_diff
+
+    retained = sum(size for size, _ in by_line.values())
+    print(
+        f"peak traced memory during the turns: {peak / 1024:.1f}KiB, "
+        f"retained by our code per turn: {retained / num_turns / 1024:.2f}KiB"
+    )
+    print(f"  {'bytes/turn':>10} {'blocks':>7}  line")
+    ranked = sorted(by_line.items(), key=lambda item: abs(item[1][0]), reverse=True)
+    for label, (size, count) in ranked[:top]:
+        print(f"  {size / num_turns:10.0f} {count:7d}  {label}")
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    script = load_script(args.script) if args.script else BUILTIN_SCRIPT
+    script = script * args.repeat
+    passes = args.passes.split(",")
+    print(
+        f"\n=== Replay: {len(script)} turns, {args.direction} call, "
+        f"stt_final={Latency.parse(args.stt_final)} "
+        f"llm_ttft={Latency.parse(args.llm_ttft)} "
+        f"tts_ttfb={Latency.parse(args.tts_ttfb)} ===\n"
+    )
+
+    if "latency" in passes:
+        print("--- latency ---")
+        report_latency(await replay(args, script))
+
+    if "cpu" in passes:
+        print("\n--- event loop time (cProfile, inflates latency) ---")
+        profile = cProfile.Profile()
+
+        @contextlib.contextmanager
+        def profiled():
+            profile.enable()
+            yield
+            profile.disable()
+
+        await replay(args, script, on_turns=profiled)
+        report_cpu(profile, len(script), args.top)
+
+    if "alloc" in passes:
+        print("\n--- allocations (tracemalloc) ---")
+        snapshots = {}
+
+        @contextlib.contextmanager
+        def traced():
+            tracemalloc.start(25)
+            snapshots["before"] = tracemalloc.take_snapshot()
+            yield
+            snapshots["after"] = tracemalloc.take_snapshot()
+            snapshots["peak"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        await replay(args, script, on_turns=traced)
+        report_alloc(
+            snapshots["before"],
+            snapshots["after"],
+            snapshots["peak"],
+            len(script),
+            args.top,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay calls through the agent")
+    parser.add_argument("--script", type=Path, help="JSONL file of scripted turns")
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Replay the script N times"
+    )
+    parser.add_argument(
+        "--direction", choices=["inbound", "outbound"], default="inbound"
+    )
+    parser.add_argument("--phone", default="+15551234567", help="Caller number")
+    parser.add_argument(
+        "--stt-final", default="0.15:0.05", help="STT final latency, mean[:stddev] s"
+    )
+    parser.add_argument(
+        "--llm-ttft",
+        default="0.35:0.1",
+        help="LLM time to first token, mean[:stddev] s",
+    )
+    parser.add_argument(
+        "--llm-token", default="0.02:0.005", help="LLM time between tokens"
+    )
+    parser.add_argument(
+        "--tts-ttfb",
+        default="0.25:0.05",
+        help="TTS time to first byte, mean[:stddev] s",
+    )
+    parser.add_argument(
+        "--playout-speed",
+        type=float,
+        default=10.0,
+        help="Play agent audio this many times faster than real time",
+    )
+    parser.add_argument(
+        "--passes", default="latency,cpu,alloc", help="Comma-separated passes to run"
+    )
+    parser.add_argument("--top", type=int, default=15, help="Rows per report")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Service area benchmark: the technicians nearest to a customer's address.
+
+Places thousands of technician bases and customer addresses over a metro area
+about 100km across, denser towards the centre, then measures "k nearest
+technicians" on the GeoIndex against computing the distance to every base,
+and checks both give the same technicians. It then fills the technicians'
+schedules to a target utilization and measures what the agent does on a
+call: the nearest technician with room in a window, and the next open
+windows of the technicians nearest the customer.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from math import cos, hypot, radians
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from services.availability import AvailabilityEngine  # noqa: E402
+from services.service_areas import KM_PER_DEGREE, ServiceAreas  # noqa: E402
+
+CENTRE = (41.88, -87.63)
+
+
+def random_location(rng: random.Random, radius_km: float) -> tuple[float, float]:
+    """A point around the centre, normally distributed and clipped to the metro."""
+    while True:
+        x, y = rng.gauss(0, radius_km / 2), rng.gauss(0, radius_km / 2)
+        if hypot(x, y) <= radius_km:
+            break
+    latitude = CENTRE[0] + y / KM_PER_DEGREE
+    return latitude, CENTRE[1] + x / (KM_PER_DEGREE * cos(radians(CENTRE[0])))
+
+
+class ScanNearest:
+    """
+    Every base in a list, with the distance to each computed per query,
+    projected like the GeoIndex around the first base's latitude.
+    """
+
+    def __init__(self):
+        self.lon_scale: float | None = None
+        self.bases: list[tuple[int, float, float]] = []
+
+    def add(self, point_id: int, latitude: float, longitude: float) -> None:
+        if self.lon_scale is None:
+            self.lon_scale = cos(radians(latitude)) * KM_PER_DEGREE
+        self.bases.append(
+            (point_id, longitude * self.lon_scale, latitude * KM_PER_DEGREE)
+        )
+
+    def nearest(self, latitude: float, longitude: float, k: int, max_km: float):
+        x, y = longitude * self.lon_scale, latitude * KM_PER_DEGREE
+        distances = sorted(
+            (hypot(px - x, py - y), point_id) for point_id, px, py in self.bases
+        )
+        return [(point_id, km) for km, point_id in distances[:k] if km <= max_km]
+
+
+def fill(availability: AvailabilityEngine, days: int, utilization: float) -> int:
+    """Book random appointments until about `utilization` of windows are full."""
+    rng = random.Random(0)
+    booked = 0
+    for technician_id in range(1, len(availability) + 1):
+        windows = availability.next_windows(
+            limit=days * len(availability.windows),
+            after=datetime.combine(availability.origin, datetime.min.time()),
+            technicians=[technician_id],
+        )
+        for window in windows:
+            while rng.random() < utilization:
+                start = availability.appointment_start(technician_id, window)
+                if start is None:
+                    break
+                availability.book(
+                    technician_id, start, start + availability.appointment_duration
+                )
+                booked += 1
+    return booked
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name: str, latencies: list[float]) -> None:
+    print(
+        f"{name:<32} {statistics.mean(latencies) * 1e6:>10.1f}us "
+        f"{_percentile(latencies, 50) * 1e6:>10.1f}us "
+        f"{_percentile(latencies, 99) * 1e6:>10.1f}us"
+    )
+
+
+def timed(fn, queries) -> tuple[list[float], list]:
+    latencies, results = [], []
+    for args in queries:
+        started_at = time.perf_counter()
+        results.append(fn(*args))
+        latencies.append(time.perf_counter() - started_at)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark nearest technicians")
+    parser.add_argument("--technicians", type=int, default=5000)
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--radius-km", type=float, default=50.0, help="Metro radius")
+    parser.add_argument("--max-km", type=float, default=40.0, help="Service radius")
+    parser.add_argument("--cell-km", type=float, default=5.0)
+    parser.add_argument("-k", type=int, default=5, help="Technicians per query")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--utilization", type=float, default=0.9)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    origin = date.today()
+    availability = AvailabilityEngine(origin, args.days)
+    customers = [
+        (customer_id, *random_location(rng, args.radius_km))
+        for customer_id in range(1, args.customers + 1)
+    ]
+    service_areas = ServiceAreas(
+        availability, args.max_km, args.cell_km, lambda: customers
+    )
+    scan = ScanNearest()
+    started_at = time.perf_counter()
+    for technician_id in range(1, args.technicians + 1):
+        latitude, longitude = random_location(rng, args.radius_km)
+        availability.add_technician(technician_id, "metro")
+        service_areas.add_technician(technician_id, latitude, longitude)
+        scan.add(technician_id, latitude, longitude)
+    print(
+        f"Indexed {args.technicians} technicians in "
+        f"{time.perf_counter() - started_at:.2f}s"
+    )
+
+    queries = [
+        (latitude, longitude, args.k, args.max_km)
+        for _, latitude, longitude in rng.sample(customers, args.queries)
+    ]
+    print(f"\n=== {args.k} nearest of {args.technicians} technicians ===\n")
+    print(f"{'mode':<32} {'mean':>12} {'p50':>12} {'p99':>12}")
+    index_latencies, index_results = timed(service_areas.technicians.nearest, queries)
+    report("geo index", index_latencies)
+    scan_latencies, scan_results = timed(scan.nearest, queries)
+    report("scan every base", scan_latencies)
+    mismatches = sum(
+        [t for t, _ in a] != [t for t, _ in b]
+        for a, b in zip(index_results, scan_results, strict=True)
+    )
+    print(
+        f"\n{statistics.mean(scan_latencies) / statistics.mean(index_latencies):.0f}x "
+        f"faster, {mismatches} queries with different technicians"
+    )
+
+    started_at = time.perf_counter()
+    booked = fill(availability, args.days, args.utilization)
+    print(
+        f"\nBooked {booked} appointments over {args.days} days in "
+        f"{time.perf_counter() - started_at:.1f}s"
+    )
+    after = datetime.combine(origin, datetime.min.time()) + timedelta(days=1)
+    calls = [(latitude, longitude) for latitude, longitude, _, _ in queries]
+    print(f"\n=== on a call, {args.utilization:.0%} of windows booked ===\n")
+    print(f"{'query':<32} {'mean':>12} {'p50':>12} {'p99':>12}")
+    latencies, found = timed(
+        lambda latitude, longitude: service_areas.next_windows(
+            latitude, longitude, 5, args.k, after
+        ),
+        calls,
+    )
+    report(f"next windows of {args.k} nearest", latencies)
+    latencies, nearest = timed(
+        lambda latitude, longitude, windows: (
+            service_areas.nearest_available_technician(latitude, longitude, windows[0])
+            if windows
+            else None
+        ),
+        [(*call, windows) for call, windows in zip(calls, found, strict=True)],
+    )
+    report("nearest with room in window", latencies)
+    distances = [result[1] for result in nearest if result is not None]
+    if distances:
+        print(
+            f"\nNearest technician with room: mean {statistics.mean(distances):.1f}km, "
+            f"{len(calls) - len(distances)} calls with none within {args.max_km:.0f}km"
+        )
+
+    started_at = time.perf_counter()
+    nearby = service_areas.customers_near(*CENTRE, 2.0)
+    print(
+        f"\nIndexed {args.customers} customers and found the {len(nearby)} within "
+        f"2km of the centre in {time.perf_counter() - started_at:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
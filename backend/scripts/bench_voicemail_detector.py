@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark the voicemail fast-path detector for precision and latency.
+
+Replays transcripts (as the growing interim results Deepgram would emit) and
+optionally WAV recordings through VoicemailDetector. Without --samples a small
+built-in set of scripted voicemail greetings and live answers is used,
+including answers with the words greetings use. Greetings without an opener
+or recording cue are misses here; on a call they are caught by the beep or
+left to the LLM's voicemail tool.
+
+Sample file format (JSONL), one call per line:
+    {"label": "voicemail", "transcript": "Hi, you've reached ...", "audio": "call.wav"}
+"audio" is optional; it must be 16-bit PCM and is used for beep detection.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from livekit import rtc
+
+from services.voicemail_detector import (
+    DEFAULT_VOICEMAIL_PHRASES,
+    VoicemailDetector,
+    load_phrases,
+)
+
+BUILTIN_SAMPLES = [
+    ("voicemail", "Hi, you've reached John. Please leave a message after the tone."),
+    (
+        "voicemail",
+        "The person you are calling is not available. Please record your message.",
+    ),
+    (
+        "voicemail",
+        "Hey it's Sarah, I can't come to the phone right now, leave me a message.",
+    ),
+    ("voicemail", "You have reached the voicemail of 555 123 4567."),
+    (
+        "voicemail",
+        "Sorry we missed your call. Leave your name and number and we'll call back.",
+    ),
+    ("voicemail", "The mailbox is full and cannot accept any messages at this time."),
+    (
+        "voicemail",
+        "Hello, I'm unable to take your call. At the tone, please record your message.",
+    ),
+    ("voicemail", "The number you have dialed is not in service."),
+    ("voicemail", "Mike Davis. Leave a message."),
+    (
+        "voicemail",
+        "Hi this is the Johnsons, we're not home right now, you know what to do.",
+    ),
+    ("human", "Hello?"),
+    ("human", "Yeah this is John, who's calling?"),
+    ("human", "Hi Sarah, yes I was waiting for your call about the furnace."),
+    ("human", "Sorry, I'm not available on Tuesday, can we do Thursday?"),
+    ("human", "I got your message yesterday, thanks for calling back."),
+    ("human", "Speaking. What's this about?"),
+    ("human", "Oh the maintenance, sure, what times do you have?"),
+    ("human", "Not interested, please take me off your list."),
+    ("human", "Hang on, let me grab a pen."),
+    ("human", "Can you call back later, I'm driving."),
+    # Words that voicemail greetings use too
+    ("human", "Oh hi, I got your voicemail, yes I want to book"),
+    ("human", "She is not available right now but I can help"),
+    ("human", "Can you leave a message with my wife?"),
+    ("human", "The mailbox key is broken"),
+    ("human", "Hi, yes, I can't take your call for long, what's up?"),
+    ("human", "Sorry, the person you want is out, this is his son."),
+]
+
+
+def interim_results(transcript: str) -> list[str]:
+    """Emulate growing interim transcripts, one more word per event."""
+    words = transcript.split()
+    return [" ".join(words[: i + 1]) for i in range(len(words))]
+
+
+def read_frames(path: Path, frame_ms: int = 20) -> list[rtc.AudioFrame]:
+    with wave.open(str(path), "rb") as f:
+        sample_rate, num_channels = f.getframerate(), f.getnchannels()
+        samples_per_frame = sample_rate * frame_ms // 1000
+        frames = []
+        while data := f.readframes(samples_per_frame):
+            frames.append(
+                rtc.AudioFrame(
+                    data=data,
+                    sample_rate=sample_rate,
+                    num_channels=num_channels,
+                    samples_per_channel=len(data) // (2 * num_channels),
+                )
+            )
+    return frames
+
+
+def run_sample(detector: VoicemailDetector, sample: dict) -> dict:
+    event_times = []
+    detected_after_words = None
+    for i, text in enumerate(interim_results(sample["transcript"])):
+        started_at = time.perf_counter()
+        hit = detector.feed_transcript(text)
+        event_times.append(time.perf_counter() - started_at)
+        if hit:
+            detected_after_words = i + 1
+            break
+
+    beep_at = None
+    frame_times = []
+    if sample.get("audio") and detector.detected:
+        elapsed = 0.0
+        for frame in read_frames(Path(sample["audio"])):
+            started_at = time.perf_counter()
+            hit = detector.feed_audio(frame)
+            frame_times.append(time.perf_counter() - started_at)
+            elapsed += frame.samples_per_channel / frame.sample_rate
+            if hit:
+                beep_at = elapsed
+                break
+
+    return {
+        "label": sample["label"],
+        "detected": detector.detected,
+        "phrase": detector.matched_phrase,
+        "words": len(sample["transcript"].split()),
+        "detected_after_words": detected_after_words,
+        "beep_at": beep_at,
+        "event_times": event_times,
+        "frame_times": frame_times,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark voicemail detection")
+    parser.add_argument("--samples", type=Path, help="JSONL file of labelled calls")
+    parser.add_argument("--phrases", type=Path, help="Phrase set, one per line")
+    parser.add_argument("--verbose", action="store_true", help="Show every sample")
+    args = parser.parse_args()
+
+    if args.samples:
+        samples = [
+            json.loads(line) for line in args.samples.read_text().splitlines() if line
+        ]
+    else:
+        samples = [{"label": lbl, "transcript": t} for lbl, t in BUILTIN_SAMPLES]
+    phrases = load_phrases(args.phrases) if args.phrases else DEFAULT_VOICEMAIL_PHRASES
+
+    results = [run_sample(VoicemailDetector(phrases), sample) for sample in samples]
+
+    tp = sum(r["detected"] and r["label"] == "voicemail" for r in results)
+    fp = sum(r["detected"] and r["label"] != "voicemail" for r in results)
+    fn = sum(not r["detected"] and r["label"] == "voicemail" for r in results)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+
+    print(f"\n=== Voicemail detection: {len(results)} samples ===\n")
+    print(f"precision={precision:.1%} recall={recall:.1%} (tp={tp} fp={fp} fn={fn})")
+
+    event_us = [t * 1e6 for r in results for t in r["event_times"]]
+    print(
+        f"transcript event: mean={statistics.mean(event_us):.1f}us "
+        f"p99={np.percentile(event_us, 99):.1f}us"
+    )
+    frame_us = [t * 1e6 for r in results for t in r["frame_times"]]
+    if frame_us:
+        print(
+            f"audio frame:      mean={statistics.mean(frame_us):.1f}us "
+            f"p99={np.percentile(frame_us, 99):.1f}us"
+        )
+    heard = [
+        r["detected_after_words"] / r["words"]
+        for r in results
+        if r["detected"] and r["label"] == "voicemail"
+    ]
+    if heard:
+        print(f"greeting heard before detection: mean={statistics.mean(heard):.0%}")
+
+    beeps = [r["beep_at"] for r in results if r["beep_at"] is not None]
+    if beeps:
+        print(f"beep detected at: mean={statistics.mean(beeps):.2f}s into the audio")
+
+    for r in results:
+        wrong = r["detected"] != (r["label"] == "voicemail")
+        if args.verbose or wrong:
+            status = "MISS" if r["label"] == "voicemail" else "FALSE POSITIVE"
+            if not wrong:
+                status = "ok"
+            sample = samples[results.index(r)]
+            print(
+                f"  [{status}] {r['label']}: {sample['transcript']!r} ({r['phrase']})"
+            )
+
+
+if __name__ == "__main__":
+    main()
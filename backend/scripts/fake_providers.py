@@ -0,0 +1,375 @@
+"""
+Offline stand-ins for the STT, LLM, TTS and room audio used by AgentSession.
+
+Used by the replay and load benchmarks to drive the real agent without any
+network access. Each provider waits for a latency drawn from a configurable
+distribution, so the time left over is the cost of our own code and the
+agents framework.
+"""
+
+import asyncio
+import collections
+import random
+import time
+import wave
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from livekit import rtc
+from livekit.agents import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    APIConnectOptions,
+    llm,
+    stt,
+    tts,
+    utils,
+)
+from livekit.agents.voice.io import AudioInput, AudioOutput
+
+SAMPLE_RATE = 24000
+FRAME_MS = 20
+# Roughly 15 characters of speech per second
+SPEECH_SECONDS_PER_CHAR = 0.065
+
+
+@dataclass
+class Latency:
+    """A normal latency distribution, clipped at zero."""
+
+    mean: float
+    stddev: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """Parse "mean" or "mean:stddev", both in seconds."""
+        mean, _, stddev = spec.partition(":")
+        return cls(float(mean), float(stddev or 0))
+
+    def sample(self, rng: random.Random) -> float:
+        return max(0.0, rng.gauss(self.mean, self.stddev))
+
+    def __str__(self) -> str:
+        return f"{self.mean * 1000:.0f}±{self.stddev * 1000:.0f}ms"
+
+
+def fake_job_context(room_name: str, userdata: dict[str, Any]) -> SimpleNamespace:
+    """The parts of JobContext that CustomerServiceAgent reads."""
+    return SimpleNamespace(
+        proc=SimpleNamespace(userdata=userdata), room=SimpleNamespace(name=room_name)
+    )
+
+
+def silence(duration: float, sample_rate: int = SAMPLE_RATE) -> list[rtc.AudioFrame]:
+    samples_per_frame = sample_rate * FRAME_MS // 1000
+    num_frames = max(1, round(duration * 1000 / FRAME_MS))
+    return [
+        rtc.AudioFrame.create(sample_rate, 1, samples_per_frame)
+        for _ in range(num_frames)
+    ]
+
+
+class FakeSTT(stt.STT):
+    """
+    STT that emits scripted user turns instead of transcribing.
+
+    `say()` plays one user turn: start of speech, an interim transcript per word,
+    the final transcript `final_latency` after the last word, then end of speech.
+    Without streaming, e.g. behind a StreamAdapter, `recognize()` returns the
+    next turn said as the final transcript of the buffered speech instead.
+    """
+
+    def __init__(
+        self,
+        final_latency: Latency,
+        rng: random.Random,
+        word_interval: float = 0.05,
+    ):
+        super().__init__(
+            capabilities=stt.STTCapabilities(streaming=True, interim_results=True)
+        )
+        self.final_latency = final_latency
+        self.word_interval = word_interval
+        self._rng = rng
+        self._turns: asyncio.Queue[str] = asyncio.Queue()
+        # End of the last user turn and how long its final transcript took
+        self.speech_ended_at: float | None = None
+        self.last_final_latency = 0.0
+
+    async def _recognize_impl(self, buffer, *, language, conn_options):
+        # The buffer ends where the speech it holds did
+        speech_ended_at = time.perf_counter()
+        final_latency = self.final_latency.sample(self._rng)
+        await asyncio.sleep(final_latency)
+        text = "" if self._turns.empty() else self._turns.get_nowait()
+        self.speech_ended_at = speech_ended_at
+        self.last_final_latency = final_latency
+        return stt.SpeechEvent(
+            type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+            alternatives=[
+                stt.SpeechData(language=language or "en", text=text, confidence=1.0)
+            ],
+        )
+
+    def stream(
+        self,
+        *,
+        language: Any = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> "FakeRecognizeStream":
+        return FakeRecognizeStream(stt=self, conn_options=conn_options)
+
+    def say(self, text: str) -> None:
+        self._turns.put_nowait(text)
+
+
+class FakeRecognizeStream(stt.RecognizeStream):
+    async def _run(self) -> None:
+        fake: FakeSTT = self._stt
+
+        async def drain_audio() -> None:
+            async for _ in self._input_ch:
+                pass
+
+        drain_task = asyncio.create_task(drain_audio())
+        try:
+            while True:
+                text = await fake._turns.get()
+                self._send(stt.SpeechEventType.START_OF_SPEECH)
+                words = text.split()
+                for i in range(len(words)):
+                    await asyncio.sleep(fake.word_interval)
+                    self._send(
+                        stt.SpeechEventType.INTERIM_TRANSCRIPT,
+                        " ".join(words[: i + 1]),
+                    )
+                speech_ended_at = time.perf_counter()
+                final_latency = fake.final_latency.sample(fake._rng)
+                await asyncio.sleep(final_latency)
+                self._send(stt.SpeechEventType.FINAL_TRANSCRIPT, text)
+                fake.speech_ended_at = speech_ended_at
+                fake.last_final_latency = final_latency
+                self._send(stt.SpeechEventType.END_OF_SPEECH)
+        finally:
+            await utils.aio.cancel_and_wait(drain_task)
+
+    def _send(self, type: stt.SpeechEventType, text: str | None = None) -> None:
+        alternatives = []
+        if text is not None:
+            alternatives = [stt.SpeechData(language="en", text=text, confidence=1.0)]
+        self._event_ch.send_nowait(
+            stt.SpeechEvent(type=type, alternatives=alternatives)
+        )
+
+
+class FakeLLM(llm.LLM):
+    """Streams canned replies after a sampled time to first token."""
+
+    def __init__(
+        self,
+        ttft: Latency,
+        token_interval: Latency,
+        rng: random.Random,
+        replies: list[str] | None = None,
+    ):
+        super().__init__()
+        self.ttft = ttft
+        self.token_interval = token_interval
+        self._rng = rng
+        self._replies = replies or ["Sure, I can help with that."]
+        self._next_reply = 0
+        # Start time, sampled TTFT and first token time of each request
+        self.requests: list[dict[str, float]] = []
+
+    def next_reply(self) -> str:
+        reply = self._replies[self._next_reply % len(self._replies)]
+        self._next_reply += 1
+        return reply
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        **kwargs: Any,
+    ) -> "FakeLLMStream":
+        return FakeLLMStream(
+            self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options
+        )
+
+
+class FakeLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        fake: FakeLLM = self._llm
+        reply = fake.next_reply()
+        request = {
+            "started_at": time.perf_counter(),
+            "ttft": fake.ttft.sample(fake._rng),
+        }
+        fake.requests.append(request)
+        await asyncio.sleep(request["ttft"])
+        request["first_token_at"] = time.perf_counter()
+
+        request_id = utils.shortuuid()
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(fake.token_interval.sample(fake._rng))
+            content = word if i == len(words) - 1 else word + " "
+            self._event_ch.send_nowait(
+                llm.ChatChunk(
+                    id=request_id,
+                    delta=llm.ChoiceDelta(role="assistant", content=content),
+                )
+            )
+
+        prompt_tokens = sum(
+            len(item.text_content or "") // 4
+            for item in self._chat_ctx.items
+            if item.type == "message"
+        )
+        self._event_ch.send_nowait(
+            llm.ChatChunk(
+                id=request_id,
+                usage=llm.CompletionUsage(
+                    completion_tokens=len(words),
+                    prompt_tokens=prompt_tokens,
+                    total_tokens=prompt_tokens + len(words),
+                ),
+            )
+        )
+
+
+class FakeTTS(tts.TTS):
+    """Returns silence as long as the text would take to speak, after a sampled TTFB."""
+
+    def __init__(self, ttfb: Latency, rng: random.Random):
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.ttfb = ttfb
+        self._rng = rng
+        # Start time and sampled TTFB of each request
+        self.requests: list[dict[str, float]] = []
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> "FakeChunkedStream":
+        return FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self) -> None:
+        fake: FakeTTS = self._tts
+        request = {
+            "started_at": time.perf_counter(),
+            "ttfb": fake.ttfb.sample(fake._rng),
+        }
+        fake.requests.append(request)
+        await asyncio.sleep(request["ttfb"])
+
+        request_id = utils.shortuuid()
+        emitter = tts.SynthesizedAudioEmitter(
+            event_ch=self._event_ch, request_id=request_id
+        )
+        for frame in silence(len(self._input_text) * SPEECH_SECONDS_PER_CHAR):
+            emitter.push(frame)
+        emitter.flush()
+
+
+class ScriptedAudioInput(AudioInput):
+    """
+    The caller's microphone, paced in real time.
+
+    Plays recorded frames queued with `play()`, and silence otherwise.
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        self._silence = silence(FRAME_MS / 1000, sample_rate)[0]
+        self._queued: collections.deque[rtc.AudioFrame] = collections.deque()
+
+    def play(self, frames: list[rtc.AudioFrame]) -> None:
+        self._queued.extend(frames)
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        frame = self._queued.popleft() if self._queued else self._silence
+        await asyncio.sleep(frame.duration)
+        return frame
+
+
+def read_wav(path: Path) -> list[rtc.AudioFrame]:
+    """Split a 16-bit PCM WAV file into 20ms frames."""
+    with wave.open(str(path), "rb") as f:
+        sample_rate, num_channels = f.getframerate(), f.getnchannels()
+        samples_per_frame = sample_rate * FRAME_MS // 1000
+        frames = []
+        while data := f.readframes(samples_per_frame):
+            frames.append(
+                rtc.AudioFrame(
+                    data=data,
+                    sample_rate=sample_rate,
+                    num_channels=num_channels,
+                    samples_per_channel=len(data) // (2 * num_channels),
+                )
+            )
+    return frames
+
+
+class FakeAudioOutput(AudioOutput):
+    """
+    Plays audio into the void, `speed` times faster than real time.
+
+    `on_first_frame` is called with the time the first frame of every segment
+    is captured, i.e. when the caller would start hearing the reply.
+    """
+
+    def __init__(
+        self, speed: float = 1.0, on_first_frame: Callable[[float], None] | None = None
+    ):
+        super().__init__(sample_rate=None)
+        self.speed = speed
+        self.on_first_frame = on_first_frame
+        self._pushed_duration = 0.0
+        self._capturing = False
+        self._playout: asyncio.TimerHandle | None = None
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if not self._capturing:
+            self._capturing = True
+            if self.on_first_frame is not None:
+                self.on_first_frame(time.perf_counter())
+        self._pushed_duration += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if not self._capturing:
+            return
+        self._capturing = False
+        duration = self._pushed_duration
+        self._pushed_duration = 0.0
+        self._playout = asyncio.get_running_loop().call_later(
+            duration / self.speed, self._finish, duration, False
+        )
+
+    def clear_buffer(self) -> None:
+        if self._playout is not None:
+            self._playout.cancel()
+            self._playout = None
+            self._finish(0.0, True)
+        elif self._capturing:
+            self._capturing = False
+            self._pushed_duration = 0.0
+            self._finish(0.0, True)
+
+    def _finish(self, position: float, interrupted: bool) -> None:
+        self._playout = None
+        self.on_playback_finished(playback_position=position, interrupted=interrupted)
@@ -23,13 +23,24 @@ logger = logging.getLogger(__name__)
 async def main():
     parser = argparse.ArgumentParser(description="Make outbound customer service calls")
     parser.add_argument(
-        "phone_number", help="Phone number to call (e.g., +15551234567)"
+        "phone_numbers",
+        nargs="+",
+        help="Phone numbers to call (e.g., +15551234567)",
+    )
+    parser.add_argument(
+        "--wave-size",
+        type=int,
+        default=10,
+        help="Calls placed concurrently when calling several numbers",
     )
     args = parser.parse_args()
 
     service = OutboundCallService()
     try:
-        result = await service.make_call(args.phone_number)
+        if len(args.phone_numbers) == 1:
+            result = await service.make_call(args.phone_numbers[0])
+        else:
+            result = await service.make_calls(args.phone_numbers, args.wave_size)
         print(json.dumps(result, indent=2))
     finally:
         await service.close()
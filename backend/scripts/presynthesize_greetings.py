@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Pre-synthesize greeting audio for customers into the greeting audio cache.
+
+Run this ahead of a campaign (with GREETING_AUDIO_CACHE=1 on the agent) so the
+first thing each customer hears is played straight from disk.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+import aiohttp
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from livekit.plugins import elevenlabs
+
+from agent import (
+    greeting_cache_dir,
+    greeting_cache_max_bytes,
+    greeting_cache_tags,
+    template_dir,
+)
+from services.audio_cache import (
+    AudioCache,
+    cache_key,
+    synthesize_frames,
+    voice_fingerprint,
+)
+from services.customer_service import CustomerService
+from services.template_registry import TemplateRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Pre-synthesize greeting audio")
+    parser.add_argument(
+        "phone_numbers", nargs="+", help="Customer phone numbers (e.g., +15551234567)"
+    )
+    parser.add_argument(
+        "--direction",
+        choices=["inbound", "outbound"],
+        action="append",
+        help="Call direction(s) to synthesize for (default: both)",
+    )
+    args = parser.parse_args()
+    directions = args.direction or ["inbound", "outbound"]
+
+    templates = TemplateRegistry(template_dir)
+    templates.precompile()
+    cache = AudioCache(greeting_cache_dir, greeting_cache_max_bytes)
+    removed = cache.invalidate(greeting_cache_tags(templates))
+    if removed:
+        logger.info(f"Invalidated {removed} stale cached greetings")
+
+    async with aiohttp.ClientSession() as http_session:
+        tts = elevenlabs.TTS(http_session=http_session)
+        voice = voice_fingerprint(tts)
+        for phone_number in args.phone_numbers:
+            template_context = CustomerService.get_template_context(phone_number)
+            for direction in directions:
+                greeting = templates.render_greeting(direction, template_context)
+                tag = templates.template_fingerprint(f"initial_prompt_{direction}.j2")
+                key = cache_key(tag, voice, greeting)
+                if key in cache:
+                    logger.info(f"Already cached: {direction} {phone_number}")
+                    continue
+                frames = await synthesize_frames(tts, greeting)
+                size = cache.put(key, frames, tag)
+                logger.info(f"Cached {direction} {phone_number}: {size} bytes")
+
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Add the demo customers and technicians to the customer database.
+
+For trying the agent out; customers and technicians already in the database
+are kept, so it is safe to run again. The agent does the same on startup with
+SEED_DEMO_DATA=1.
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.customer_service import CustomerService, customer_db_path
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    customers, technicians = CustomerService.seed_demo_data()
+    print(
+        f"Added {customers} customers and {technicians} technicians to "
+        f"{customer_db_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
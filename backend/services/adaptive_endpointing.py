@@ -0,0 +1,176 @@
+"""
+Adaptive end-of-turn silence window driven by the turn detector.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Literal
+
+from livekit.agents import llm
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointingPolicy:
+    """
+    Decides how long a pause has to last before the user's turn is over.
+
+    The window shrinks towards `short_window` as the turn detector grows
+    confident the utterance is complete, and grows towards `long_window` as it
+    becomes unlikely. It also adapts to the speaker: pauses after which they
+    resumed talking raise the window for uncertain utterances, and each time we
+    cut in on them (they resumed right after the turn was committed) the window
+    gets a penalty that decays again over clean turns.
+    """
+
+    def __init__(
+        self,
+        short_window: float = 0.35,
+        long_window: float = 2.0,
+        max_window: float = 3.0,
+        confident_probability: float = 0.9,
+        cut_in_penalty: float = 0.15,
+        penalty_decay: float = 0.8,
+        pause_margin: float = 1.25,
+    ):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.max_window = max_window
+        self.confident_probability = confident_probability
+        self.cut_in_penalty = cut_in_penalty
+        self.penalty_decay = penalty_decay
+        self.pause_margin = pause_margin
+        # Learned about this speaker during the call
+        self.pause_estimate = 0.0
+        self.penalty = 0.0
+        self.turns = 0
+        self.cut_ins = 0
+        self.resumed_pauses = 0
+
+    def silence_window(self, probability: float, unlikely_threshold: float) -> float:
+        """Seconds of silence after which to end a turn with this EOU probability."""
+        if probability >= self.confident_probability:
+            window = self.short_window
+        elif probability < unlikely_threshold:
+            window = self.long_window
+        else:
+            confidence = (probability - unlikely_threshold) / (
+                self.confident_probability - unlikely_threshold
+            )
+            window = self.long_window - confidence * (
+                self.long_window - self.short_window
+            )
+            # Outlast the pauses this speaker makes mid-sentence
+            window = max(window, self.pause_estimate * self.pause_margin)
+        return min(window + self.penalty, self.max_window)
+
+    def on_pause_resumed(self, pause: float) -> None:
+        """The speaker resumed talking after a pause, before the turn was ended."""
+        self.resumed_pauses += 1
+        self._update_pause_estimate(pause)
+
+    def on_cut_in(self, pause: float) -> None:
+        """The turn was ended but the speaker went on talking: we cut in on them."""
+        self.cut_ins += 1
+        self.penalty = min(self.penalty + self.cut_in_penalty, self.max_window)
+        self._update_pause_estimate(pause)
+
+    def on_turn_ended(self) -> None:
+        self.turns += 1
+        self.penalty *= self.penalty_decay
+
+    def _update_pause_estimate(self, pause: float) -> None:
+        # Tracks the longer pauses: jumps up quickly, comes down slowly
+        weight = 0.5 if pause > self.pause_estimate else 0.1
+        self.pause_estimate += weight * (pause - self.pause_estimate)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "cut_ins": self.cut_ins,
+            "resumed_pauses": self.resumed_pauses,
+            "pause_estimate": self.pause_estimate,
+            "penalty": self.penalty,
+        }
+
+
+class AdaptiveEndpointing:
+    """
+    Turn detector for AgentSession wrapping the EnglishModel with an adaptive window.
+
+    The VAD reports the end of speech after a short `vad_min_silence`. This
+    wrapper asks the model for the end-of-turn probability, then holds the turn
+    open until the policy's silence window has passed since the user stopped
+    speaking; if they start speaking again first, the framework cancels the
+    wait. The session's own endpointing delays should be zero, and
+    `on_user_state_changed` must be fed the session's user_state_changed events.
+
+    Holding the turn open this way relies on the framework awaiting the
+    prediction before it commits the turn and cancelling it when speech
+    resumes, which is not a documented contract; it is off by default.
+
+    A call has a single caller, so one instance per session tracks one speaker.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        vad_min_silence: float,
+        policy: EndpointingPolicy | None = None,
+        cut_in_window: float = 1.5,
+    ):
+        self._model = model
+        self.vad_min_silence = vad_min_silence
+        self.policy = policy or EndpointingPolicy()
+        self.cut_in_window = cut_in_window
+        self._language: str | None = None
+        self._speech_ended_at: float | None = None
+        self._waiting = False
+        self._ended_at: float | None = None
+
+    def supports_language(self, language: str | None) -> bool:
+        self._language = language
+        return self._model.supports_language(language)
+
+    def unlikely_threshold(self, language: str | None) -> float | None:
+        # The window is applied here, the framework must never add its own
+        return None
+
+    async def predict_end_of_turn(self, chat_ctx: llm.ChatContext) -> float:
+        probability = await self._model.predict_end_of_turn(chat_ctx)
+        unlikely = self._model.unlikely_threshold(self._language) or 0.0
+        window = self.policy.silence_window(probability, unlikely)
+        speech_ended_at = self._speech_ended_at or time.time()
+        logger.info(
+            f"ENDPOINTING: eou_probability={probability:.3f} window={window:.2f}s "
+            f"pause_estimate={self.policy.pause_estimate:.2f}s "
+            f"penalty={self.policy.penalty:.2f}s"
+        )
+
+        self._waiting = True
+        try:
+            await asyncio.sleep(max(speech_ended_at + window - time.time(), 0))
+        finally:
+            self._waiting = False
+        self._ended_at = time.time()
+        self.policy.on_turn_ended()
+        return 1.0
+
+    def on_user_state_changed(
+        self, state: Literal["speaking", "listening", "away"]
+    ) -> None:
+        now = time.time()
+        if state == "listening":
+            # The VAD only reports the end of speech once the silence has lasted
+            self._speech_ended_at = now - self.vad_min_silence
+        elif state == "speaking" and self._speech_ended_at is not None:
+            pause = now - self._speech_ended_at
+            if self._waiting:
+                self.policy.on_pause_resumed(pause)
+            elif (
+                self._ended_at is not None and now - self._ended_at < self.cut_in_window
+            ):
+                logger.info(f"ENDPOINTING: cut in after a {pause:.2f}s pause")
+                self.policy.on_cut_in(pause)
+            self._ended_at = None
@@ -0,0 +1,246 @@
+"""
+On-disk LRU cache for synthesized speech audio.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable
+from pathlib import Path
+from typing import Any
+
+from livekit import rtc
+
+logger = logging.getLogger(__name__)
+
+# magic, sample rate, channels, tag
+_HEADER = struct.Struct("<4sIH16s")
+_MAGIC = b"LKAC"
+_FRAME_MS = 20
+_PUNCTUATION_MAP = str.maketrans(
+    {"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"'}
+)
+
+
+def voice_fingerprint(tts: Any) -> str:
+    """Identify the voice a TTS instance speaks with, for use in cache keys."""
+    opts = getattr(tts, "_opts", None)
+    parts = [
+        getattr(tts, "label", type(tts).__name__),
+        str(getattr(opts, "voice_id", "")),
+        str(getattr(opts, "model", "")),
+        str(getattr(opts, "voice_settings", "")),
+        str(tts.sample_rate),
+        str(tts.num_channels),
+    ]
+    return "|".join(parts)
+
+
+def normalize_phrase(text: str) -> str:
+    """Normalize text so trivially different renderings share a cache entry."""
+    text = text.translate(_PUNCTUATION_MAP)
+    return " ".join(text.split())
+
+
+def cache_key(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode()).hexdigest()
+
+
+class AudioCache:
+    """
+    Content-addressed PCM audio store with size-bounded LRU eviction.
+
+    Each entry is a single file holding a small header followed by 16-bit PCM,
+    read in one call; AudioFrame copies its data, so mapping the file would
+    save nothing. Reads and writes touch the disk, so call them off the event
+    loop; the index is locked for that. Entries carry a short tag (e.g. a
+    template fingerprint) so that every entry produced from an outdated source
+    can be invalidated at once.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        # key -> size in bytes, ordered from least to most recently used
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pcm"
+
+    def _load_index(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pcm"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def get(self, key: str) -> list[rtc.AudioFrame] | None:
+        """Return the cached frames for a key, or None on a miss."""
+        if key not in self._index:
+            with self._lock:
+                self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            magic, sample_rate, num_channels, _ = _HEADER.unpack_from(data)
+            if magic != _MAGIC:
+                raise ValueError("bad magic")
+            frames = list(
+                _split_frames(
+                    memoryview(data)[_HEADER.size :], sample_rate, num_channels
+                )
+            )
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker process sharing the directory
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+        except (ValueError, struct.error):
+            logger.warning(f"Discarding corrupt audio cache entry {key}")
+            self.delete(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.bytes_served += len(data) - _HEADER.size
+            if key in self._index:
+                self._index.move_to_end(key)
+        return frames
+
+    def put(self, key: str, frames: Iterable[rtc.AudioFrame], tag: str = "") -> int:
+        """
+        Store frames under a key.
+
+        Returns:
+            Number of bytes written
+        """
+        frames = list(frames)
+        if not frames:
+            return 0
+        header = _HEADER.pack(
+            _MAGIC,
+            frames[0].sample_rate,
+            frames[0].num_channels,
+            tag.encode()[:16],
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            for frame in frames:
+                f.write(frame.data.cast("B"))
+        os.replace(tmp_path, self._path(key))
+
+        size = self._path(key).stat().st_size
+        with self._lock:
+            self._forget(key)
+            self._index[key] = size
+            self._total_bytes += size
+            self._evict()
+        return size
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+        with self._lock:
+            self._forget(key)
+
+    def invalidate(self, keep_tags: set[str]) -> int:
+        """
+        Delete every entry whose tag is not in keep_tags.
+
+        Returns:
+            Number of entries deleted
+        """
+        keep = {tag.encode()[:16] for tag in keep_tags}
+        removed = 0
+        with self._lock:
+            keys = list(self._index)
+        for key in keys:
+            try:
+                with open(self._path(key), "rb") as f:
+                    header = f.read(_HEADER.size)
+            except FileNotFoundError:
+                with self._lock:
+                    self._forget(key)
+                continue
+            if _HEADER.unpack(header)[3].rstrip(b"\x00") not in keep:
+                self.delete(key)
+                removed += 1
+        return removed
+
+    def _forget(self, key: str) -> None:
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            self.delete(key)
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bytes_served": self.bytes_served,
+        }
+
+
+def _split_frames(
+    pcm: memoryview, sample_rate: int, num_channels: int
+) -> Iterable[rtc.AudioFrame]:
+    samples_per_frame = sample_rate * _FRAME_MS // 1000
+    frame_bytes = samples_per_frame * num_channels * 2
+    for offset in range(0, len(pcm), frame_bytes):
+        chunk = pcm[offset : offset + frame_bytes]
+        yield rtc.AudioFrame(
+            data=chunk,
+            sample_rate=sample_rate,
+            num_channels=num_channels,
+            samples_per_channel=len(chunk) // (num_channels * 2),
+        )
+
+
+async def iter_frames(frames: list[rtc.AudioFrame]) -> AsyncIterator[rtc.AudioFrame]:
+    """Adapt cached frames to the async iterator session.say() expects."""
+    for frame in frames:
+        yield frame
+
+
+async def synthesize_frames(tts: Any, text: str) -> list[rtc.AudioFrame]:
+    """Synthesize text in one request and collect the resulting frames."""
+    started_at = time.perf_counter()
+    frames = []
+    async with tts.synthesize(text) as stream:
+        async for audio in stream:
+            frames.append(audio.frame)
+    logger.debug(
+        f"Synthesized {len(text)} chars in {time.perf_counter() - started_at:.3f}s"
+    )
+    return frames
@@ -0,0 +1,318 @@
+"""
+Technician availability: the appointment windows that can still be offered.
+"""
+
+import threading
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+# Bit 0 is Monday, as date.weekday() counts
+WEEKDAYS = 0b0011111
+DEFAULT_WINDOWS = ((time(9), time(12)), (time(13), time(17)))
+
+
+def slot_mask(start: datetime, end: time | datetime) -> int:
+    """Bitmap of the slots from start to end on start's day."""
+    end_time = end.time() if isinstance(end, datetime) else end
+    first = (start.hour * 60 + start.minute) // SLOT_MINUTES
+    last = -(-(end_time.hour * 60 + end_time.minute) // SLOT_MINUTES)
+    if end_time == time(0):
+        last = SLOTS_PER_DAY
+    return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+
+def _clock(t: datetime) -> str:
+    return f"{t.hour % 12 or 12}:{t.minute:02d} {'AM' if t.hour < 12 else 'PM'}"
+
+
+@dataclass(frozen=True, slots=True)
+class TimeWindow:
+    start: datetime
+    end: datetime
+
+    def __str__(self) -> str:
+        return (
+            f"{self.start:%A %B} {self.start.day}, "
+            f"{_clock(self.start)} - {_clock(self.end)}"
+        )
+
+
+@dataclass(slots=True)
+class _Schedule:
+    """Per-day bitmaps of one technician, or the open windows of an area."""
+
+    # Open windows by day, bit w for the w-th window of the day
+    open: list[int]
+    # Bit d set when day d has any open window
+    days: int = 0
+
+
+@dataclass(slots=True)
+class _Technician(_Schedule):
+    service_area: str = ""
+    # Booked or off-duty slots by day, bit s for the s-th slot of the day
+    busy: list[int] | None = None
+
+
+@dataclass(slots=True)
+class _Area(_Schedule):
+    # Technicians with each window open, at day * windows per day + window
+    counts: list[int] | None = None
+
+
+class AvailabilityEngine:
+    """
+    Open appointment windows of every technician, `horizon_days` ahead.
+
+    Each technician's days are bitmaps of 30-minute slots, set where they are
+    booked or off duty. A window of the day (9-12 and 1-5 by default) is open
+    when it still has room for one appointment of `appointment_minutes`,
+    checked with a few shifts and ands of the day's bitmap, and each
+    technician keeps a bitmap of their open windows per day. Service areas
+    count the technicians with each window open, so a booking or cancellation
+    updates only the day it touches, in time independent of the number of
+    technicians, and each area keeps a bitmap of the days that have any
+    window open. "Next open windows" jumps from one such day to the next with
+    integer bit tricks instead of scanning technicians or empty days.
+
+    The horizon starts on `origin` and is not rolled forward: the engine is
+    built when a process first needs it, and worker processes are started per
+    job. All methods are thread-safe.
+    """
+
+    def __init__(
+        self,
+        origin: date | None = None,
+        horizon_days: int = 90,
+        windows: Sequence[tuple[time, time]] = DEFAULT_WINDOWS,
+        appointment_minutes: int = 120,
+    ):
+        self.origin = origin or date.today()
+        self.horizon_days = horizon_days
+        self.windows = tuple(windows)
+        self._window_masks = [
+            slot_mask(datetime.combine(self.origin, start), end)
+            for start, end in self.windows
+        ]
+        self._appointment_slots = -(-appointment_minutes // SLOT_MINUTES)
+        self._technicians: dict[int, _Technician] = {}
+        # By service area, and under None for all technicians together
+        self._areas: dict[str | None, _Area] = {None: self._new_area()}
+        self._lock = threading.Lock()
+
+    def _new_area(self) -> _Area:
+        return _Area(
+            open=[0] * self.horizon_days,
+            counts=[0] * (self.horizon_days * len(self.windows)),
+        )
+
+    def _day(self, day: date) -> int:
+        index = (day - self.origin).days
+        if not 0 <= index < self.horizon_days:
+            raise ValueError(f"{day} is outside the availability horizon")
+        return index
+
+    def _fits(self, free: int) -> int:
+        """Slots of `free` where an appointment can start."""
+        starts = free
+        for shift in range(1, self._appointment_slots):
+            starts &= free >> shift
+        return starts
+
+    def _open_windows(self, busy: int) -> int:
+        open_windows = 0
+        for w, mask in enumerate(self._window_masks):
+            if self._fits(mask & ~busy):
+                open_windows |= 1 << w
+        return open_windows
+
+    def add_technician(
+        self, technician_id: int, service_area: str, work_days: int = WEEKDAYS
+    ) -> None:
+        """A technician with every window open on their `work_days` weekdays."""
+        with self._lock:
+            if technician_id in self._technicians:
+                raise ValueError(f"Technician {technician_id} already added")
+            self._areas.setdefault(service_area, self._new_area())
+            technician = _Technician(
+                open=[0] * self.horizon_days,
+                service_area=service_area,
+                busy=[FULL_DAY] * self.horizon_days,
+            )
+            self._technicians[technician_id] = technician
+            for day in range(self.horizon_days):
+                if work_days >> (self.origin + timedelta(days=day)).weekday() & 1:
+                    self._set_busy(technician, day, 0)
+
+    def _set_busy(self, technician: _Technician, day: int, busy: int) -> None:
+        """Store a day's bitmap and carry its open windows to the areas."""
+        technician.busy[day] = busy
+        before = technician.open[day]
+        after = self._open_windows(busy)
+        if before == after:
+            return
+        technician.open[day] = after
+        if bool(before) != bool(after):
+            technician.days ^= 1 << day
+        base = day * len(self.windows)
+        for area in (self._areas[technician.service_area], self._areas[None]):
+            day_open = area.open[day]
+            changed = before ^ after
+            while changed:
+                bit = changed & -changed
+                changed ^= bit
+                index = base + bit.bit_length() - 1
+                if after & bit:
+                    area.counts[index] += 1
+                    day_open |= bit
+                else:
+                    area.counts[index] -= 1
+                    if not area.counts[index]:
+                        day_open &= ~bit
+            if bool(day_open) != bool(area.open[day]):
+                area.days ^= 1 << day
+            area.open[day] = day_open
+
+    def book(self, technician_id: int, start: datetime, end: datetime) -> bool:
+        """
+        Mark a technician busy from start to end, within one day.
+
+        Returns False, changing nothing, if any of that time is already taken.
+        """
+        day = self._day(start.date())
+        midnight = datetime.combine(start.date(), time(0)) + timedelta(days=1)
+        if not start < end <= midnight:
+            raise ValueError("Bookings must start and end on the same day")
+        slots = slot_mask(start, end)
+        with self._lock:
+            technician = self._technicians[technician_id]
+            busy = technician.busy[day]
+            if busy & slots:
+                return False
+            self._set_busy(technician, day, busy | slots)
+            return True
+
+    def cancel(self, technician_id: int, start: datetime, end: datetime) -> None:
+        """Free a technician's time taken by book()."""
+        day = self._day(start.date())
+        slots = slot_mask(start, end)
+        with self._lock:
+            technician = self._technicians[technician_id]
+            self._set_busy(technician, day, technician.busy[day] & ~slots)
+
+    def set_day(self, technician_id: int, day: date, busy: int) -> None:
+        """Replace a technician's day with a bitmap read from elsewhere."""
+        index = self._day(day)
+        with self._lock:
+            self._set_busy(self._technicians[technician_id], index, busy)
+
+    def is_available(self, technician_id: int, after: datetime | None = None) -> bool:
+        """Whether a technician has any window open from after's day on."""
+        first_day = max(0, ((after or datetime.now()).date() - self.origin).days)
+        with self._lock:
+            technician = self._technicians.get(technician_id)
+            return technician is not None and technician.days >> first_day != 0
+
+    def window_at(self, start: datetime) -> TimeWindow | None:
+        """The window of the day starting at start, if within the horizon."""
+        if not 0 <= (start.date() - self.origin).days < self.horizon_days:
+            return None
+        for window_start, window_end in self.windows:
+            if start.time() == window_start:
+                return TimeWindow(start, datetime.combine(start.date(), window_end))
+        return None
+
+    def next_windows(
+        self,
+        service_area: str | None = None,
+        limit: int = 5,
+        after: datetime | None = None,
+        technicians: Iterable[int] | None = None,
+    ) -> list[TimeWindow]:
+        """
+        The first `limit` windows starting after `after` (default now) that a
+        technician of the service area, of any area if None, or one of the
+        given technicians can still take.
+        """
+        after = after or datetime.now()
+        first_day = (after.date() - self.origin).days
+        if first_day >= self.horizon_days:
+            return []
+        with self._lock:
+            if technicians is None:
+                schedule = self._areas.get(service_area)
+                if schedule is None:
+                    return []
+                days, open_by_day = schedule.days, schedule.open.__getitem__
+            else:
+                schedules = [
+                    self._technicians[t] for t in technicians if t in self._technicians
+                ]
+                days = 0
+                for schedule in schedules:
+                    days |= schedule.days
+
+                def open_by_day(day: int) -> int:
+                    open_windows = 0
+                    for schedule in schedules:
+                        open_windows |= schedule.open[day]
+                    return open_windows
+
+            if first_day > 0:
+                days &= ~((1 << first_day) - 1)
+            found = []
+            while days and len(found) < limit:
+                day = (days & -days).bit_length() - 1
+                days &= days - 1
+                open_windows = open_by_day(day)
+                on = self.origin + timedelta(days=day)
+                for w, (start, end) in enumerate(self.windows):
+                    if open_windows >> w & 1:
+                        window = TimeWindow(
+                            datetime.combine(on, start), datetime.combine(on, end)
+                        )
+                        if window.start > after:
+                            found.append(window)
+                            if len(found) == limit:
+                                break
+            return found
+
+    def technicians_for(
+        self, window: TimeWindow, service_area: str | None = None
+    ) -> list[int]:
+        """Technicians of the area, or any, who can take an appointment in window."""
+        day = self._day(window.start.date())
+        slots = slot_mask(window.start, window.end)
+        with self._lock:
+            return [
+                technician_id
+                for technician_id, technician in self._technicians.items()
+                if (service_area is None or technician.service_area == service_area)
+                and self._fits(slots & ~technician.busy[day])
+            ]
+
+    def appointment_start(
+        self, technician_id: int, window: TimeWindow
+    ) -> datetime | None:
+        """Earliest start in window with room for an appointment, or None."""
+        day = self._day(window.start.date())
+        slots = slot_mask(window.start, window.end)
+        with self._lock:
+            starts = self._fits(slots & ~self._technicians[technician_id].busy[day])
+        if not starts:
+            return None
+        slot = (starts & -starts).bit_length() - 1
+        return datetime.combine(window.start.date(), time(0)) + timedelta(
+            minutes=slot * SLOT_MINUTES
+        )
+
+    @property
+    def appointment_duration(self) -> timedelta:
+        return timedelta(minutes=self._appointment_slots * SLOT_MINUTES)
+
+    def __len__(self) -> int:
+        return len(self._technicians)
@@ -0,0 +1,199 @@
+"""
+Columnar in-memory call history of every customer.
+"""
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from pathlib import Path
+
+from services.customer_service import CallHistory
+
+# Magic, last call id, offsets, rows, length of the interned values' JSON
+_HEADER = struct.Struct("<8sqqqq")
+_MAGIC = b"CALLS\x00\x00\x01"
+
+
+class CallHistoryStore:
+    """
+    Call history held as flat arrays instead of one object per call.
+
+    Calls are grouped by customer and ordered by time: the calls of customer
+    `i` are rows `offsets[i]` to `offsets[i + 1]`. Each row is an int64 epoch
+    timestamp and one byte each for the outcome and direction codes, plus an
+    index into the interned notes, which repeat across most calls. That is
+    14 bytes per call against several hundred for CallHistory objects with
+    their datetimes and strings. Customer ids index the offsets directly, so
+    they should be dense, as SQLite rowids are.
+
+    Calls added after the build are kept per customer on the side and merged
+    on read. Timestamps are naive datetimes stored as if they were UTC, which
+    round-trips them unchanged.
+
+    Job processes share one copy: the worker builds the store once and saves
+    it, and each job process maps the file read-only with open(), so the
+    columns live in the page cache instead of every process's heap. Calls
+    written since, up from `last_call_id`, are added from the database.
+    """
+
+    def __init__(self) -> None:
+        self._offsets = array("q", [0])
+        self._created_at = array("q")
+        self._outcomes = bytearray()
+        self._directions = bytearray()
+        self._notes = array("I")
+        # Interned values, by code
+        self._outcome_values: list[str] = []
+        self._direction_values: list[str] = []
+        self._note_values: list[str] = []
+        self._codes: dict[tuple[int, str], int] = {}
+        self._added: dict[int, list[CallHistory]] = {}
+        # Highest call id in the columns
+        self.last_call_id = 0
+
+    @classmethod
+    def build(
+        cls, rows: Iterable[tuple[int, str, str, int, str]], last_call_id: int = 0
+    ) -> "CallHistoryStore":
+        """
+        Load (customer_id, direction, outcome, created_at epoch, notes) rows in
+        one pass. They must be sorted by customer id, then created_at, and be
+        the calls with ids up to `last_call_id`.
+        """
+        store = cls()
+        store.last_call_id = last_call_id
+        offsets = store._offsets
+        current = 0
+        for customer_id, direction, outcome, created_at, notes in rows:
+            if customer_id < current:
+                raise ValueError("Call history rows must be sorted by customer id")
+            while current < customer_id:
+                # Close every customer up to this one, calls or not
+                offsets.append(len(store._created_at))
+                current += 1
+            store._created_at.append(created_at)
+            store._outcomes.append(store._code(0, outcome, store._outcome_values))
+            store._directions.append(store._code(1, direction, store._direction_values))
+            store._notes.append(store._code(2, notes, store._note_values))
+        offsets.append(len(store._created_at))
+        return store
+
+    def _columns(self) -> tuple:
+        return (
+            self._offsets,
+            self._created_at,
+            self._notes,
+            self._outcomes,
+            self._directions,
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the columns for open(), replacing the file atomically."""
+        values = json.dumps(
+            [self._outcome_values, self._direction_values, self._note_values]
+        ).encode()
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    _MAGIC,
+                    self.last_call_id,
+                    len(self._offsets),
+                    len(self._created_at),
+                    len(values),
+                )
+            )
+            for column in self._columns():
+                f.write(column)
+            f.write(values)
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: Path) -> "CallHistoryStore":
+        """Map a saved store read-only; the columns are never copied."""
+        with open(path, "rb") as f:
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        magic, last_call_id, offsets, rows, values_length = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a saved call history")
+        store = cls()
+        store.last_call_id = last_call_id
+        position = _HEADER.size
+        columns = []
+        for fmt, length in (("q", offsets), ("q", rows), ("I", rows)):
+            size = length * struct.calcsize(fmt)
+            columns.append(view[position : position + size].cast(fmt))
+            position += size
+        store._offsets, store._created_at, store._notes = columns
+        store._outcomes = view[position : position + rows]
+        store._directions = view[position + rows : position + 2 * rows]
+        position += 2 * rows
+        (
+            store._outcome_values,
+            store._direction_values,
+            store._note_values,
+        ) = json.loads(bytes(view[position : position + values_length]))
+        return store
+
+    def _code(self, column: int, value: str, values: list[str]) -> int:
+        code = self._codes.get((column, value))
+        if code is None:
+            code = self._codes[(column, value)] = len(values)
+            values.append(value)
+        return code
+
+    def _range(self, customer_id: int) -> tuple[int, int]:
+        if 0 <= customer_id < len(self._offsets) - 1:
+            return self._offsets[customer_id], self._offsets[customer_id + 1]
+        return 0, 0
+
+    def _call(self, row: int) -> CallHistory:
+        return CallHistory(
+            call_direction=self._direction_values[self._directions[row]],
+            call_outcome=self._outcome_values[self._outcomes[row]],
+            created_at=datetime.fromtimestamp(self._created_at[row], UTC).replace(
+                tzinfo=None
+            ),
+            notes=self._note_values[self._notes[row]],
+        )
+
+    def add(self, customer_id: int, call: CallHistory) -> None:
+        self._added.setdefault(customer_id, []).append(call)
+
+    def recent(self, customer_id: int, limit: int) -> list[CallHistory]:
+        """The last `limit` calls of a customer, oldest first."""
+        start, end = self._range(customer_id)
+        calls = [self._call(row) for row in range(max(start, end - limit), end)]
+        added = self._added.get(customer_id)
+        if added:
+            calls = sorted(calls + added, key=lambda c: c.created_at)[-limit:]
+        return calls
+
+    def outcome_counts(self, customer_id: int) -> dict[str, int]:
+        """Number of calls of a customer by outcome."""
+        start, end = self._range(customer_id)
+        outcomes = bytes(self._outcomes[start:end])
+        counts = {
+            value: outcomes.count(code)
+            for code, value in enumerate(self._outcome_values)
+            if code in outcomes
+        }
+        for call in self._added.get(customer_id, ()):
+            counts[call.call_outcome] = counts.get(call.call_outcome, 0) + 1
+        return counts
+
+    def total_calls(self, customer_id: int) -> int:
+        start, end = self._range(customer_id)
+        return end - start + len(self._added.get(customer_id, ()))
+
+    def __len__(self) -> int:
+        return len(self._created_at) + sum(len(c) for c in self._added.values())
+
+    def nbytes(self) -> int:
+        """Memory held by the columns, not counting the interned strings."""
+        return sum(memoryview(column).nbytes for column in self._columns())
@@ -0,0 +1,72 @@
+"""
+Customer context carried in agent dispatch metadata from the dialer to the agent.
+
+The dialer dispatches the agent into the room it creates and attaches the
+customer's resolved template context to the dispatch. Unlike room metadata,
+dispatch metadata goes to the agent's job only, so room participants, the SIP
+leg included, never see the customer's details.
+"""
+
+import json
+import logging
+import time
+from datetime import date
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the payload or the template context changes shape, so agents
+# running an older or newer release look the customer up themselves instead
+CONTEXT_METADATA_VERSION = 3
+
+
+def encode_customer_context(phone_number: str, template_context: dict[str, Any]) -> str:
+    """Serialize a template context, just read from the database, for a dispatch."""
+    return json.dumps(
+        {
+            "customer_context": {
+                "version": CONTEXT_METADATA_VERSION,
+                "phone_number": phone_number,
+                "resolved_at": time.time(),
+                "template_context": template_context,
+            }
+        },
+        separators=(",", ":"),
+    )
+
+
+def decode_customer_context(
+    metadata: str, phone_number: str, max_age: float
+) -> dict[str, Any] | None:
+    """
+    Template context attached by the dialer, or None when it can't be trusted.
+
+    It is ignored when missing, from another schema version, for another
+    number than the one in the room's name, older than `max_age` seconds, or
+    resolved on a different day (the context holds "N days ago" text and the
+    current date).
+    """
+    if not metadata:
+        return None
+    try:
+        payload = json.loads(metadata)["customer_context"]
+        version = payload["version"]
+        resolved_at = float(payload["resolved_at"])
+        template_context = payload["template_context"]
+        current_date = template_context.get("current_date")
+    except (ValueError, TypeError, KeyError, AttributeError):
+        logger.warning("Ignoring malformed customer context in dispatch metadata")
+        return None
+
+    if version != CONTEXT_METADATA_VERSION:
+        reason = f"version {version}"
+    elif payload.get("phone_number") != phone_number:
+        reason = "different phone number"
+    elif time.time() - resolved_at > max_age:
+        reason = f"resolved {time.time() - resolved_at:.0f}s ago"
+    elif current_date != date.today().strftime("%Y-%m-%d"):
+        reason = "resolved on another day"
+    else:
+        return template_context
+    logger.info(f"Ignoring stale customer context in dispatch metadata: {reason}")
+    return None
@@ -0,0 +1,138 @@
+"""
+In-process TTL/LRU cache of resolved customer contexts.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class ContextCache(Generic[V]):
+    """
+    Values by key, expiring `ttl` seconds after they were loaded and evicted
+    least recently used first beyond `max_entries`.
+
+    `get_or_load` is single-flight: concurrent misses on the same key await one
+    load instead of each querying the database. `invalidate` may be called from
+    any thread, e.g. by the repository's write hooks; a load that was already
+    in flight when its key was invalidated is returned to its callers but not
+    cached.
+
+    Invalidation only reaches this process. Callers caching data that other
+    processes write keep a version with each value, e.g. a counter the
+    database bumps on every write, and check it before using a cached value.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires at, value), ordered from least to most recently used
+        self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._loading: dict[Hashable, asyncio.Future[V]] = {}
+        # Bumped by invalidate() so in-flight loads know their result is stale
+        self._generations: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable) -> V | None:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _get(self, key: Hashable) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: V, generation: int | None = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key, 0):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, key: Hashable) -> int:
+        """Pass to put() to drop a value loaded before the key was invalidated."""
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for key in self._generations:
+                self._generations[key] += 1
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[V]]) -> V:
+        value = self._get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        loading = self._loading.get(key)
+        if loading is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(loading)
+            except asyncio.CancelledError:
+                if not loading.cancelled():
+                    raise
+                # The caller that was loading it went away, load it ourselves
+                return await self.get_or_load(key, load)
+
+        self.misses += 1
+        generation = self.generation(key)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved, there may be nobody else waiting
+            future.exception()
+            raise
+        else:
+            self.put(key, value, generation)
+            future.set_result(value)
+            return value
+        finally:
+            del self._loading[key]
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
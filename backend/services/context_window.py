@@ -0,0 +1,161 @@
+"""
+Bounded chat context with a rolling summary of older turns.
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from livekit.agents import llm
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize this phone conversation between Sarah from Acme HVAC and a customer "
+    "in a few sentences. Keep names, equipment, dates, times, appointments and any "
+    "commitments made. If a previous summary is given, merge it into the new one."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token for English."""
+    return len(text) // 4 + 1
+
+
+def _item_text(item: llm.ChatItem) -> str:
+    if item.type == "message":
+        return f"{item.role}: {item.text_content or ''}"
+    if item.type == "function_call":
+        return f"tool call {item.name}({item.arguments})"
+    return f"tool result {item.name}: {item.output}"
+
+
+class ContextWindow:
+    """
+    Keeps the LLM prompt bounded on long calls.
+
+    The system prompt and the last `max_turns` user turns are sent verbatim.
+    Older turns are folded into a running summary, produced asynchronously by a
+    separate LLM between turns. Until the summary covers them they stay verbatim,
+    unless the prompt exceeds `token_budget`, in which case the oldest are dropped.
+    """
+
+    def __init__(
+        self,
+        summary_llm_factory: Callable[[], llm.LLM],
+        max_turns: int = 8,
+        token_budget: int = 4000,
+    ):
+        # Created on first use, most calls never need a summary
+        self._summary_llm_factory = summary_llm_factory
+        self._summary_llm: llm.LLM | None = None
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary = ""
+        self._summarized_ids: set[str] = set()
+        self._summary_task: asyncio.Task | None = None
+
+    def apply(self, chat_ctx: llm.ChatContext) -> llm.ChatContext:
+        """Return a bounded copy of chat_ctx to send to the LLM."""
+        items = chat_ctx.items
+        # Leading system/developer messages are the (cacheable) instructions
+        num_instructions = 0
+        while (
+            num_instructions < len(items)
+            and items[num_instructions].type == "message"
+            and items[num_instructions].role in ("system", "developer")
+        ):
+            num_instructions += 1
+        instructions = items[:num_instructions]
+        conversation = items[num_instructions:]
+
+        # Turns start at user messages, so tool calls stay with their outputs
+        turn_starts = [
+            i
+            for i, item in enumerate(conversation)
+            if item.type == "message" and item.role == "user"
+        ]
+        if len(turn_starts) <= self.max_turns:
+            self._log_prompt_size(len(items), items, dropped=0)
+            return chat_ctx
+
+        split = turn_starts[-self.max_turns]
+        older = [
+            item for item in conversation[:split] if item.id not in self._summarized_ids
+        ]
+        recent = conversation[split:]
+
+        if older and (self._summary_task is None or self._summary_task.done()):
+            self._summary_task = asyncio.create_task(
+                self._summarize(list(older)), name="context_summary"
+            )
+
+        summary_items = []
+        if self.summary:
+            summary_items.append(
+                llm.ChatMessage(
+                    role="system",
+                    content=[f"Summary of the earlier conversation: {self.summary}"],
+                )
+            )
+
+        fixed_tokens = sum(
+            estimate_tokens(_item_text(item))
+            for item in [*instructions, *summary_items, *recent]
+        )
+        # Whole turns are dropped, a tool output without its call is rejected
+        older_turns: list[list[llm.ChatItem]] = []
+        for item in older:
+            if not older_turns or (item.type == "message" and item.role == "user"):
+                older_turns.append([])
+            older_turns[-1].append(item)
+        older_tokens = sum(estimate_tokens(_item_text(item)) for item in older)
+        dropped = 0
+        while older_turns and fixed_tokens + older_tokens > self.token_budget:
+            turn = older_turns.pop(0)
+            older_tokens -= sum(estimate_tokens(_item_text(item)) for item in turn)
+            dropped += len(turn)
+        older = [item for turn in older_turns for item in turn]
+
+        bounded = llm.ChatContext([*instructions, *summary_items, *older, *recent])
+        self._log_prompt_size(len(items), bounded.items, dropped)
+        return bounded
+
+    def _log_prompt_size(
+        self, num_items: int, sent: list[llm.ChatItem], dropped: int
+    ) -> None:
+        est_tokens = sum(estimate_tokens(_item_text(item)) for item in sent)
+        logger.info(
+            f"CHAT CONTEXT: items={num_items}->{len(sent)} est_tokens={est_tokens} "
+            f"summarized_items={len(self._summarized_ids)} dropped_items={dropped}"
+        )
+
+    async def _summarize(self, items: list[llm.ChatItem]) -> None:
+        transcript = "\n".join(_item_text(item) for item in items)
+        if self.summary:
+            transcript = f"Previous summary: {self.summary}\n\n{transcript}"
+
+        summary_ctx = llm.ChatContext()
+        summary_ctx.add_message(role="system", content=SUMMARY_INSTRUCTIONS)
+        summary_ctx.add_message(role="user", content=transcript)
+        try:
+            if self._summary_llm is None:
+                self._summary_llm = self._summary_llm_factory()
+            summary = ""
+            async with self._summary_llm.chat(chat_ctx=summary_ctx) as stream:
+                async for chunk in stream:
+                    if chunk.delta and chunk.delta.content:
+                        summary += chunk.delta.content
+        except Exception as e:
+            logger.warning(f"Failed to summarize chat context: {e}")
+            return
+
+        self.summary = summary.strip()
+        self._summarized_ids.update(item.id for item in items)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "summarized_items": len(self._summarized_ids),
+            "summary_tokens": estimate_tokens(self.summary) if self.summary else 0,
+        }
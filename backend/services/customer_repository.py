@@ -0,0 +1,919 @@
+"""
+SQLite store of customers, their equipment and call history, and technicians.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import queue
+import sqlite3
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import TypeVar
+
+from services.availability import FULL_DAY, WEEKDAYS, slot_mask
+from services.customer_service import CallHistory, Customer, Equipment
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    phone_e164 TEXT NOT NULL,
+    last_service_date TEXT,
+    service_area TEXT,
+    -- Geocoded address
+    latitude REAL,
+    longitude REAL,
+    -- Bumped whenever the customer's calls or appointments are written, so
+    -- processes caching the customer can tell their copy is stale
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS customers_phone_e164 ON customers (phone_e164);
+
+CREATE TABLE IF NOT EXISTS equipment (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    equipment_type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS equipment_customer_id ON equipment (customer_id);
+
+CREATE TABLE IF NOT EXISTS call_history (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    call_direction TEXT NOT NULL,
+    call_outcome TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    notes TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS call_history_customer_created
+    ON call_history (customer_id, created_at);
+
+-- Maintained on every call written: the last calls and totals by outcome, so
+-- reading a customer costs the same however long their history is
+CREATE TABLE IF NOT EXISTS call_digests (
+    customer_id INTEGER PRIMARY KEY REFERENCES customers (id),
+    total_calls INTEGER NOT NULL,
+    outcome_counts TEXT NOT NULL,
+    recent_calls TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS technicians (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    service_area TEXT NOT NULL,
+    -- Weekdays worked, bit 0 for Monday
+    work_days INTEGER NOT NULL DEFAULT 31,
+    -- Where they start their day
+    base_latitude REAL,
+    base_longitude REAL
+);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    technician_id INTEGER NOT NULL REFERENCES technicians (id),
+    starts_at TEXT NOT NULL,
+    ends_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS appointments_technician_starts
+    ON appointments (technician_id, starts_at);
+
+-- Booked and held slots of a technician's day, as AvailabilityEngine bitmaps.
+-- Bookers swap in a new bitmap only if the version is the one they read, so
+-- concurrent calls can never take the same slots.
+CREATE TABLE IF NOT EXISTS technician_days (
+    technician_id INTEGER NOT NULL REFERENCES technicians (id),
+    day TEXT NOT NULL,
+    busy INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (technician_id, day)
+) WITHOUT ROWID;
+
+-- Slots taken while the customer confirms, freed once expires_at has passed.
+-- Ids are never reused, so a stale hold can't commit a newer one.
+CREATE TABLE IF NOT EXISTS appointment_holds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    technician_id INTEGER NOT NULL REFERENCES technicians (id),
+    starts_at TEXT NOT NULL,
+    ends_at TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS appointment_holds_expires_at
+    ON appointment_holds (expires_at);
+"""
+
+# Columns added since the first schema, created on older databases on open
+MIGRATIONS = {
+    "customers": {
+        "service_area": "TEXT",
+        "latitude": "REAL",
+        "longitude": "REAL",
+        "version": "INTEGER NOT NULL DEFAULT 0",
+    },
+    "technicians": {"base_latitude": "REAL", "base_longitude": "REAL"},
+}
+
+CUSTOMER_COLUMNS = (
+    "id, first_name, last_name, phone_e164, last_service_date, service_area, "
+    "latitude, longitude, version"
+)
+
+# Recomputes the digests of every customer with calls, or of the :ids JSON array
+REBUILD_DIGESTS = """
+INSERT OR REPLACE INTO call_digests
+    (customer_id, total_calls, outcome_counts, recent_calls)
+SELECT
+    c.customer_id,
+    c.total_calls,
+    (
+        SELECT json_group_object(call_outcome, n) FROM (
+            SELECT call_outcome, COUNT(*) AS n FROM call_history
+            WHERE customer_id = c.customer_id GROUP BY call_outcome
+        )
+    ),
+    (
+        SELECT json_group_array(
+            json_array(call_direction, call_outcome, created_at, notes)
+        ) FROM (
+            SELECT * FROM (
+                SELECT call_direction, call_outcome, created_at, notes
+                FROM call_history WHERE customer_id = c.customer_id
+                ORDER BY created_at DESC LIMIT :size
+            ) ORDER BY created_at
+        )
+    )
+FROM (
+    SELECT customer_id, COUNT(*) AS total_calls FROM call_history
+    WHERE :ids IS NULL OR customer_id IN (SELECT value FROM json_each(:ids))
+    GROUP BY customer_id
+) AS c
+"""
+
+
+@dataclass(slots=True)
+class CustomerRecord:
+    id: int
+    customer: Customer
+    last_service_date: date | None
+    service_area: str | None = None
+    # Of the customer's address, if geocoded
+    location: tuple[float, float] | None = None
+    equipment: list[Equipment] = field(default_factory=list)
+    # The most recent calls, oldest first, out of total_calls
+    call_history: list[CallHistory] = field(default_factory=list)
+    total_calls: int = 0
+    outcome_counts: dict[str, int] = field(default_factory=dict)
+    # Of the customer's calls and appointments, see customer_version
+    version: int = 0
+
+
+def _next_day(day: date) -> str:
+    return (day + timedelta(days=1)).isoformat()
+
+
+class CustomerRepository:
+    """
+    Customers keyed by their E.164 phone number, in a SQLite database.
+
+    The database runs in WAL mode so lookups never wait on writers. Every
+    method has a blocking form, and the async ones run it on a small pool of
+    threads, each query borrowing one of `pool_size` connections, so the event
+    loop never waits on disk.
+
+    Records carry a digest of the call history instead of all of it: the last
+    `digest_size` calls and the number of calls by outcome, kept up to date as
+    calls are written. With `load_call_history` off, records are read without
+    them, for callers that keep the call history elsewhere.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        pool_size: int = 4,
+        digest_size: int = 5,
+        load_call_history: bool = True,
+    ):
+        self.path = Path(path)
+        self.digest_size = digest_size
+        self.load_call_history = load_call_history
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._pool: queue.Queue[sqlite3.Connection] = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="customer-db"
+        )
+        # Called with the customer id after anything about a customer is written
+        self._write_listeners: list[Callable[[int], None]] = []
+        with self._connection() as conn:
+            self._migrate(conn)
+            conn.executescript(SCHEMA)
+            # Databases from before digests existed
+            if conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM call_history) "
+                "AND NOT EXISTS (SELECT 1 FROM call_digests)"
+            ).fetchone()[0]:
+                logger.info("Building call history digests")
+                with conn:
+                    self._rebuild_digests(conn, None)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        for table, columns in MIGRATIONS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, definition in columns.items():
+                if existing and column not in existing:
+                    logger.info(f"Adding column {table}.{column}")
+                    conn.execute(
+                        f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                    )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints only; a crash may lose the last writes, never corrupt
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, fn, *args
+        )
+
+    def add_write_listener(self, listener: Callable[[int], None]) -> None:
+        """Get notified, from the writing thread, when a customer's data changes."""
+        self._write_listeners.append(listener)
+
+    def _notify_write(self, customer_id: int) -> None:
+        for listener in self._write_listeners:
+            try:
+                listener(customer_id)
+            except Exception:
+                logger.exception("Customer write listener failed")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    # Reads
+
+    def get_by_phone_number(self, phone_e164: str) -> CustomerRecord | None:
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE phone_e164 = ?",
+                (phone_e164,),
+            ).fetchone()
+            return self._load_record(conn, row) if row else None
+
+    def get_by_id(self, customer_id: int) -> CustomerRecord | None:
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE id = ?",
+                (customer_id,),
+            ).fetchone()
+            return self._load_record(conn, row) if row else None
+
+    def get_by_ids(
+        self, customer_ids: Iterable[int], load_call_history: bool | None = None
+    ) -> dict[int, CustomerRecord]:
+        """
+        Records of many customers at once, by id; unknown ids are left out.
+
+        Three set-based queries regardless of how many customers are asked
+        for, the ids passed as one JSON array parameter. `load_call_history`
+        overrides the repository's setting.
+        """
+        if load_call_history is None:
+            load_call_history = self.load_call_history
+        ids = json.dumps(sorted(set(customer_ids)))
+        with self._connection() as conn:
+            records = {
+                row[0]: self._record(row)
+                for row in conn.execute(
+                    f"SELECT {CUSTOMER_COLUMNS} FROM customers "
+                    "WHERE id IN (SELECT value FROM json_each(?))",
+                    (ids,),
+                )
+            }
+            for customer_id, equipment_type in conn.execute(
+                "SELECT customer_id, equipment_type FROM equipment "
+                "WHERE customer_id IN (SELECT value FROM json_each(?)) ORDER BY id",
+                (ids,),
+            ):
+                records[customer_id].equipment.append(Equipment(equipment_type))
+            if not load_call_history:
+                return records
+            for customer_id, *digest in conn.execute(
+                "SELECT customer_id, total_calls, outcome_counts, recent_calls "
+                "FROM call_digests "
+                "WHERE customer_id IN (SELECT value FROM json_each(?))",
+                (ids,),
+            ):
+                self._apply_digest(records[customer_id], digest)
+        return records
+
+    def _load_record(self, conn: sqlite3.Connection, row: tuple) -> CustomerRecord:
+        record = self._record(row)
+        record.equipment = [
+            Equipment(equipment_type=e[0])
+            for e in conn.execute(
+                "SELECT equipment_type FROM equipment WHERE customer_id = ? "
+                "ORDER BY id",
+                (record.id,),
+            )
+        ]
+        if not self.load_call_history:
+            return record
+        digest = conn.execute(
+            "SELECT total_calls, outcome_counts, recent_calls FROM call_digests "
+            "WHERE customer_id = ?",
+            (record.id,),
+        ).fetchone()
+        if digest:
+            self._apply_digest(record, digest)
+        return record
+
+    def _apply_digest(self, record: CustomerRecord, digest: tuple | list) -> None:
+        record.total_calls = digest[0]
+        record.outcome_counts = json.loads(digest[1])
+        recent = json.loads(digest[2])[-self.digest_size :]
+        record.call_history = [self._call(c) for c in recent]
+
+    @staticmethod
+    def _record(row: tuple) -> CustomerRecord:
+        return CustomerRecord(
+            id=row[0],
+            customer=Customer(
+                first_name=row[1], last_name=row[2], phone_primary=row[3]
+            ),
+            last_service_date=date.fromisoformat(row[4]) if row[4] else None,
+            service_area=row[5],
+            location=(row[6], row[7]) if row[6] is not None else None,
+            version=row[8],
+        )
+
+    @staticmethod
+    def _call(row: tuple | list) -> CallHistory:
+        return CallHistory(
+            call_direction=row[0],
+            call_outcome=row[1],
+            created_at=datetime.fromisoformat(row[2]),
+            notes=row[3],
+        )
+
+    async def find_by_phone_number(self, phone_e164: str) -> CustomerRecord | None:
+        return await self._run(self.get_by_phone_number, phone_e164)
+
+    async def find_by_id(self, customer_id: int) -> CustomerRecord | None:
+        return await self._run(self.get_by_id, customer_id)
+
+    async def find_by_ids(
+        self, customer_ids: Iterable[int], load_call_history: bool | None = None
+    ) -> dict[int, CustomerRecord]:
+        return await self._run(self.get_by_ids, list(customer_ids), load_call_history)
+
+    def iter_phone_numbers(self) -> Iterator[tuple[int, str]]:
+        """(customer id, phone number) of every customer, streamed from the table."""
+        with self._connection() as conn:
+            yield from conn.execute("SELECT id, phone_e164 FROM customers")
+
+    def iter_call_history(
+        self, up_to_id: int | None = None
+    ) -> Iterator[tuple[int, str, str, int, str]]:
+        """
+        (customer id, direction, outcome, created_at epoch, notes) of every call,
+        or those with ids up to `up_to_id`, by customer then time, as
+        CallHistoryStore.build takes them.
+        """
+        with self._connection() as conn:
+            yield from conn.execute(
+                "SELECT customer_id, call_direction, call_outcome, "
+                "CAST(strftime('%s', created_at) AS INTEGER), notes "
+                "FROM call_history WHERE ? IS NULL OR id <= ? "
+                "ORDER BY customer_id, created_at",
+                (up_to_id, up_to_id),
+            )
+
+    def last_call_id(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT MAX(id) FROM call_history").fetchone()[0] or 0
+
+    def iter_calls_since(self, call_id: int) -> Iterator[tuple[int, int, CallHistory]]:
+        """(id, customer id, call) of the calls written after call_id, in order."""
+        with self._connection() as conn:
+            for written_id, customer_id, *row in conn.execute(
+                "SELECT id, customer_id, call_direction, call_outcome, created_at, "
+                "notes FROM call_history WHERE id > ? ORDER BY id",
+                (call_id,),
+            ):
+                yield written_id, customer_id, self._call(row)
+
+    def customer_version(self, customer_id: int) -> int | None:
+        """How many times the customer's calls or appointments were written."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT version FROM customers WHERE id = ?", (customer_id,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def customer_versions(self, customer_ids: Iterable[int]) -> dict[int, int]:
+        with self._connection() as conn:
+            return dict(
+                conn.execute(
+                    "SELECT id, version FROM customers "
+                    "WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(sorted(set(customer_ids))),),
+                )
+            )
+
+    def customer_versions_by_phone(
+        self, phone_e164s: Iterable[str]
+    ) -> dict[str, tuple[int, int]]:
+        """(customer id, version) by phone number, of the numbers that have one."""
+        with self._connection() as conn:
+            return {
+                phone_e164: (customer_id, version)
+                for phone_e164, customer_id, version in conn.execute(
+                    "SELECT phone_e164, id, version FROM customers "
+                    "WHERE phone_e164 IN (SELECT value FROM json_each(?))",
+                    (json.dumps(sorted(set(phone_e164s))),),
+                )
+            }
+
+    async def find_customer_version(self, customer_id: int) -> int | None:
+        return await self._run(self.customer_version, customer_id)
+
+    async def find_customer_versions(
+        self, customer_ids: Iterable[int]
+    ) -> dict[int, int]:
+        return await self._run(self.customer_versions, list(customer_ids))
+
+    async def find_customer_versions_by_phone(
+        self, phone_e164s: Iterable[str]
+    ) -> dict[str, tuple[int, int]]:
+        return await self._run(self.customer_versions_by_phone, list(phone_e164s))
+
+    def count_customers(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+
+    def iter_technicians(self) -> Iterator[tuple[int, str, str, int]]:
+        """(id, name, service area, work days bitmap) of every technician."""
+        with self._connection() as conn:
+            yield from conn.execute(
+                "SELECT id, name, service_area, work_days FROM technicians ORDER BY id"
+            )
+
+    def iter_technician_bases(self) -> Iterator[tuple[int, float, float]]:
+        """(id, latitude, longitude) of every technician with a known base."""
+        with self._connection() as conn:
+            yield from conn.execute(
+                "SELECT id, base_latitude, base_longitude FROM technicians "
+                "WHERE base_latitude IS NOT NULL AND base_longitude IS NOT NULL"
+            )
+
+    def iter_customer_locations(self) -> Iterator[tuple[int, float, float]]:
+        """(id, latitude, longitude) of every customer with a geocoded address."""
+        with self._connection() as conn:
+            yield from conn.execute(
+                "SELECT id, latitude, longitude FROM customers "
+                "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+            )
+
+    def iter_appointments(
+        self, since: datetime
+    ) -> Iterator[tuple[int, datetime, datetime]]:
+        """(technician id, start, end) of every appointment ending after since."""
+        with self._connection() as conn:
+            for technician_id, starts_at, ends_at in conn.execute(
+                "SELECT technician_id, starts_at, ends_at FROM appointments "
+                "WHERE ends_at > ? ORDER BY starts_at",
+                (since.isoformat(),),
+            ):
+                yield (
+                    technician_id,
+                    datetime.fromisoformat(starts_at),
+                    datetime.fromisoformat(ends_at),
+                )
+
+    def count_technicians(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM technicians").fetchone()[0]
+
+    def iter_technician_days(self, since: date) -> Iterator[tuple[int, date, int]]:
+        """(technician id, day, busy bitmap) of the days bookings were made on."""
+        with self._connection() as conn:
+            for technician_id, day, busy in conn.execute(
+                "SELECT technician_id, day, busy FROM technician_days WHERE day >= ?",
+                (since.isoformat(),),
+            ):
+                yield technician_id, date.fromisoformat(day), busy
+
+    # Reservations
+
+    def technician_day(self, technician_id: int, day: date) -> tuple[int, int]:
+        """
+        Busy bitmap and version of a technician's day.
+
+        Created on first use from the technician's work days and the
+        appointments already on it; appointments written other than through
+        hold_slots and commit_hold afterwards are not seen.
+        """
+        key = (technician_id, day.isoformat())
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT busy, version FROM technician_days "
+                "WHERE technician_id = ? AND day = ?",
+                key,
+            ).fetchone()
+            if row:
+                return row
+            (work_days,) = conn.execute(
+                "SELECT work_days FROM technicians WHERE id = ?", (technician_id,)
+            ).fetchone()
+            busy = 0 if work_days >> day.weekday() & 1 else FULL_DAY
+            for starts_at, ends_at in conn.execute(
+                "SELECT starts_at, ends_at FROM appointments "
+                "WHERE technician_id = ? AND starts_at >= ? AND starts_at < ?",
+                (technician_id, day.isoformat(), _next_day(day)),
+            ):
+                busy |= slot_mask(
+                    datetime.fromisoformat(starts_at), datetime.fromisoformat(ends_at)
+                )
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO technician_days "
+                    "(technician_id, day, busy, version) VALUES (?, ?, ?, 0)",
+                    (*key, busy),
+                )
+            return conn.execute(
+                "SELECT busy, version FROM technician_days "
+                "WHERE technician_id = ? AND day = ?",
+                key,
+            ).fetchone()
+
+    def hold_slots(
+        self,
+        technician_id: int,
+        version: int,
+        busy: int,
+        customer_id: int,
+        starts_at: datetime,
+        ends_at: datetime,
+        expires_at: float,
+    ) -> int | None:
+        """
+        Compare-and-swap: store `busy` as the bitmap of the hold's day and record
+        the hold, only if the day is still at `version`.
+
+        Returns the hold id, or None if the day changed since it was read.
+        """
+        with self._connection() as conn, conn:
+            swapped = conn.execute(
+                "UPDATE technician_days SET busy = ?, version = version + 1 "
+                "WHERE technician_id = ? AND day = ? AND version = ?",
+                (busy, technician_id, starts_at.date().isoformat(), version),
+            ).rowcount
+            if not swapped:
+                return None
+            return conn.execute(
+                "INSERT INTO appointment_holds "
+                "(customer_id, technician_id, starts_at, ends_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    customer_id,
+                    technician_id,
+                    starts_at.isoformat(),
+                    ends_at.isoformat(),
+                    expires_at,
+                ),
+            ).lastrowid
+
+    def commit_hold(self, hold_id: int, now: float) -> int | None:
+        """
+        Turn a hold that has not expired into an appointment, keeping its slots.
+
+        Returns the appointment id, or None if the hold expired or is gone.
+        """
+        with self._connection() as conn, conn:
+            hold = conn.execute(
+                "DELETE FROM appointment_holds WHERE id = ? AND expires_at > ? "
+                "RETURNING customer_id, technician_id, starts_at, ends_at",
+                (hold_id, now),
+            ).fetchone()
+            if hold is None:
+                return None
+            appointment_id = conn.execute(
+                "INSERT INTO appointments "
+                "(customer_id, technician_id, starts_at, ends_at) VALUES (?, ?, ?, ?)",
+                hold,
+            ).lastrowid
+            self._bump_version(conn, hold[0])
+        self._notify_write(hold[0])
+        return appointment_id
+
+    def release_hold(self, hold_id: int) -> list[tuple[int, date]]:
+        """Drop a hold and free its slots; returns the day changed, if any."""
+        with self._connection() as conn, conn:
+            return self._free_slots(
+                conn,
+                conn.execute(
+                    "DELETE FROM appointment_holds WHERE id = ? "
+                    "RETURNING technician_id, starts_at, ends_at",
+                    (hold_id,),
+                ).fetchall(),
+            )
+
+    def release_expired_holds(
+        self, now: float, technician_id: int | None = None
+    ) -> list[tuple[int, date]]:
+        """Drop the expired holds, of one technician or all; returns days changed."""
+        with self._connection() as conn:
+            # Only take the write lock when there is something to drop
+            if not conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM appointment_holds WHERE expires_at <= ? "
+                "AND (? IS NULL OR technician_id = ?))",
+                (now, technician_id, technician_id),
+            ).fetchone()[0]:
+                return []
+        with self._connection() as conn, conn:
+            return self._free_slots(
+                conn,
+                conn.execute(
+                    "DELETE FROM appointment_holds WHERE expires_at <= ? "
+                    "AND (? IS NULL OR technician_id = ?) "
+                    "RETURNING technician_id, starts_at, ends_at",
+                    (now, technician_id, technician_id),
+                ).fetchall(),
+            )
+
+    def cancel_appointment(self, appointment_id: int) -> list[tuple[int, date]]:
+        """Delete an appointment and free its slots; returns the day changed."""
+        with self._connection() as conn, conn:
+            appointment = conn.execute(
+                "DELETE FROM appointments WHERE id = ? "
+                "RETURNING customer_id, technician_id, starts_at, ends_at",
+                (appointment_id,),
+            ).fetchone()
+            if appointment is None:
+                return []
+            changed = self._free_slots(conn, [appointment[1:]])
+            self._bump_version(conn, appointment[0])
+        self._notify_write(appointment[0])
+        return changed
+
+    @staticmethod
+    def _free_slots(
+        conn: sqlite3.Connection, rows: list[tuple[int, str, str]]
+    ) -> list[tuple[int, date]]:
+        """Clear the slots of (technician id, starts_at, ends_at) rows."""
+        freed: dict[tuple[int, date], int] = {}
+        for technician_id, starts_at, ends_at in rows:
+            start = datetime.fromisoformat(starts_at)
+            key = (technician_id, start.date())
+            freed[key] = freed.get(key, 0) | slot_mask(
+                start, datetime.fromisoformat(ends_at)
+            )
+        for (technician_id, day), slots in freed.items():
+            conn.execute(
+                "UPDATE technician_days SET busy = busy & ~?, version = version + 1 "
+                "WHERE technician_id = ? AND day = ?",
+                (slots, technician_id, day.isoformat()),
+            )
+        return list(freed)
+
+    # Writes
+
+    def add_customer(
+        self,
+        customer: Customer,
+        equipment: Iterable[Equipment] = (),
+        last_service_date: date | None = None,
+        service_area: str | None = None,
+        location: tuple[float, float] | None = None,
+    ) -> int:
+        latitude, longitude = location or (None, None)
+        with self._connection() as conn, conn:
+            customer_id = conn.execute(
+                "INSERT INTO customers "
+                "(first_name, last_name, phone_e164, last_service_date, service_area, "
+                "latitude, longitude) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    customer.first_name,
+                    customer.last_name,
+                    customer.phone_primary,
+                    last_service_date.isoformat() if last_service_date else None,
+                    service_area,
+                    latitude,
+                    longitude,
+                ),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO equipment (customer_id, equipment_type) VALUES (?, ?)",
+                [(customer_id, e.equipment_type) for e in equipment],
+            )
+        return customer_id
+
+    def add_technician(
+        self,
+        name: str,
+        service_area: str,
+        work_days: int = WEEKDAYS,
+        base: tuple[float, float] | None = None,
+    ) -> int:
+        latitude, longitude = base or (None, None)
+        with self._connection() as conn, conn:
+            return conn.execute(
+                "INSERT INTO technicians "
+                "(name, service_area, work_days, base_latitude, base_longitude) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (name, service_area, work_days, latitude, longitude),
+            ).lastrowid
+
+    def seed(
+        self,
+        customers: Iterable[CustomerRecord],
+        technicians: Iterable[tuple[str, str, tuple[float, float] | None]],
+    ) -> tuple[int, int]:
+        """
+        Add the customers, with their equipment and calls, and the (name,
+        service area, base) technicians missing from the database.
+
+        One transaction, and customers already there by phone number or
+        technicians by name and area are left alone, so processes seeding the
+        same database at once, or again, add each of them once. Returns how
+        many customers and technicians were added.
+        """
+        added_customers = added_technicians = 0
+        with self._connection() as conn, conn:
+            for record in customers:
+                latitude, longitude = record.location or (None, None)
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO customers "
+                    "(first_name, last_name, phone_e164, last_service_date, "
+                    "service_area, latitude, longitude) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        record.customer.first_name,
+                        record.customer.last_name,
+                        record.customer.phone_primary,
+                        record.last_service_date.isoformat()
+                        if record.last_service_date
+                        else None,
+                        record.service_area,
+                        latitude,
+                        longitude,
+                    ),
+                )
+                if not cursor.rowcount:
+                    continue
+                added_customers += 1
+                customer_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO equipment (customer_id, equipment_type) VALUES (?, ?)",
+                    [(customer_id, e.equipment_type) for e in record.equipment],
+                )
+                for call in record.call_history:
+                    row = [
+                        call.call_direction,
+                        call.call_outcome,
+                        call.created_at.isoformat(),
+                        call.notes,
+                    ]
+                    conn.execute(
+                        "INSERT INTO call_history "
+                        "(customer_id, call_direction, call_outcome, created_at, "
+                        "notes) VALUES (?, ?, ?, ?, ?)",
+                        (customer_id, *row),
+                    )
+                    self._add_to_digest(conn, customer_id, row)
+            for name, service_area, base in technicians:
+                latitude, longitude = base or (None, None)
+                added_technicians += conn.execute(
+                    "INSERT INTO technicians "
+                    "(name, service_area, base_latitude, base_longitude) "
+                    "SELECT ?, ?, ?, ? WHERE NOT EXISTS ("
+                    "SELECT 1 FROM technicians WHERE name = ? AND service_area = ?)",
+                    (name, service_area, latitude, longitude, name, service_area),
+                ).rowcount
+        return added_customers, added_technicians
+
+    def add_call(self, customer_id: int, call: CallHistory) -> None:
+        row = [
+            call.call_direction,
+            call.call_outcome,
+            call.created_at.isoformat(),
+            call.notes,
+        ]
+        with self._connection() as conn, conn:
+            conn.execute(
+                "INSERT INTO call_history "
+                "(customer_id, call_direction, call_outcome, created_at, notes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (customer_id, *row),
+            )
+            self._add_to_digest(conn, customer_id, row)
+            self._bump_version(conn, customer_id)
+        self._notify_write(customer_id)
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection, customer_id: int) -> None:
+        conn.execute(
+            "UPDATE customers SET version = version + 1 WHERE id = ?", (customer_id,)
+        )
+
+    def _add_to_digest(
+        self, conn: sqlite3.Connection, customer_id: int, call: list
+    ) -> None:
+        digest = conn.execute(
+            "SELECT total_calls, outcome_counts, recent_calls FROM call_digests "
+            "WHERE customer_id = ?",
+            (customer_id,),
+        ).fetchone()
+        total_calls, outcome_counts, recent = (
+            (digest[0], json.loads(digest[1]), json.loads(digest[2]))
+            if digest
+            else (0, {}, [])
+        )
+        outcome = call[1]
+        outcome_counts[outcome] = outcome_counts.get(outcome, 0) + 1
+        # Kept ordered by created_at; calls are usually written as they happen
+        bisect.insort(recent, call, key=lambda c: c[2])
+        conn.execute(
+            "INSERT OR REPLACE INTO call_digests "
+            "(customer_id, total_calls, outcome_counts, recent_calls) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                customer_id,
+                total_calls + 1,
+                json.dumps(outcome_counts),
+                json.dumps(recent[-self.digest_size :]),
+            ),
+        )
+
+    def _rebuild_digests(
+        self, conn: sqlite3.Connection, customer_ids: Iterable[int] | None
+    ) -> None:
+        ids = None if customer_ids is None else json.dumps(sorted(set(customer_ids)))
+        conn.execute(REBUILD_DIGESTS, {"size": self.digest_size, "ids": ids})
+
+    async def record_call(self, customer_id: int, call: CallHistory) -> None:
+        await self._run(self.add_call, customer_id, call)
+
+    def bulk_load(
+        self,
+        customers: Iterable[tuple],
+        equipment: Iterable[tuple] = (),
+        calls: Iterable[tuple] = (),
+    ) -> None:
+        """
+        Insert raw rows in one transaction, for imports and benchmarks.
+
+        Rows are (id, first_name, last_name, phone_e164, last_service_date),
+        (customer_id, equipment_type) and
+        (customer_id, call_direction, call_outcome, created_at, notes). The
+        digests of customers given calls are rebuilt; write listeners are not
+        notified.
+        """
+        calls = list(calls)
+        with self._connection() as conn, conn:
+            conn.executemany(
+                "INSERT INTO customers "
+                "(id, first_name, last_name, phone_e164, last_service_date) "
+                "VALUES (?, ?, ?, ?, ?)",
+                customers,
+            )
+            conn.executemany(
+                "INSERT INTO equipment (customer_id, equipment_type) VALUES (?, ?)",
+                equipment,
+            )
+            conn.executemany(
+                "INSERT INTO call_history "
+                "(customer_id, call_direction, call_outcome, created_at, notes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                calls,
+            )
+            if calls:
+                self._rebuild_digests(conn, (call[0] for call in calls))
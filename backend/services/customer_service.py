@@ -2,19 +2,71 @@
 Customer Service module for retrieving customer data and context.
 """
 
-from dataclasses import dataclass
-from datetime import date, datetime, timedelta
-from typing import Any
+import asyncio
+import logging
+import os
+import re
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
+from services.context_cache import ContextCache
 
-@dataclass
+if TYPE_CHECKING:
+    from services.availability import AvailabilityEngine
+    from services.call_history_store import CallHistoryStore
+    from services.customer_repository import CustomerRecord, CustomerRepository
+    from services.reservations import ReservationStore
+    from services.service_areas import ServiceAreas
+
+logger = logging.getLogger(__name__)
+
+customer_db_path = Path(
+    os.getenv(
+        "CUSTOMER_DB_PATH", Path(__file__).parent.parent / ".cache" / "customers.db"
+    )
+)
+customer_db_pool_size = int(os.getenv("CUSTOMER_DB_POOL_SIZE", "4"))
+# Country of numbers written without one, e.g. "(555) 123-4567"
+default_country_code = os.getenv("DEFAULT_COUNTRY_CODE", "1")
+# Template contexts by customer id, dropped when the customer's data is written
+context_cache_ttl = float(os.getenv("CUSTOMER_CONTEXT_CACHE_TTL", "300"))
+context_cache_size = int(os.getenv("CUSTOMER_CONTEXT_CACHE_SIZE", "10000"))
+# Keep every customer's call history in memory, in columnar form, instead of
+# reading the digests from the database on each lookup. The worker builds it
+# once into a snapshot next to the database, which job processes map.
+CALL_HISTORY_IN_MEMORY = os.getenv("CALL_HISTORY_IN_MEMORY", "").lower() in (
+    "1",
+    "true",
+)
+call_history_snapshot_path = customer_db_path.with_name(
+    f"{customer_db_path.name}.calls"
+)
+# Add the demo customers and technicians when the worker starts, for trying the
+# agent out; the database is otherwise never written to on its own
+SEED_DEMO_DATA = os.getenv("SEED_DEMO_DATA", "").lower() in ("1", "true")
+# Appointment windows offered to customers, from the technicians' schedules
+availability_horizon_days = int(os.getenv("AVAILABILITY_HORIZON_DAYS", "90"))
+appointment_minutes = int(os.getenv("APPOINTMENT_MINUTES", "120"))
+# Seconds a window chosen by a customer stays reserved for them until booked
+appointment_hold_seconds = float(os.getenv("APPOINTMENT_HOLD_SECONDS", "120"))
+# Customers with a geocoded address are offered the windows of the technicians
+# based nearest to them, up to this many within this distance
+nearest_technicians = int(os.getenv("NEAREST_TECHNICIANS", "5"))
+service_radius_km = float(os.getenv("SERVICE_RADIUS_KM", "40"))
+
+
+@dataclass(frozen=True, slots=True)
 class Customer:
     first_name: str
     last_name: str
     phone_primary: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CallHistory:
     call_direction: str  # 'inbound', 'outbound'
     call_outcome: str  # 'scheduled', 'voicemail', 'no_answer', 'completed'
@@ -22,7 +74,7 @@ class CallHistory:
     notes: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Equipment:
     equipment_type: str  # 'hvac', 'hot_water_heater', 'furnace'
 
@@ -37,25 +89,161 @@ def _date_days_ago(days: int) -> date:
     return date.today() - timedelta(days=days)
 
 
-@dataclass
+_EXTENSION = re.compile(r"(?:;ext=|\s*(?:ext\.?|extension|x|#)\s*\d+$)", re.I)
+_NON_DIGITS = re.compile(r"\D")
+# A trunk prefix written after the country code, as in "+44 (0)20 7946 0958",
+# that is not dialed from abroad
+_PARENTHESIZED_TRUNK_ZERO = re.compile(r"\(\s*0\s*\)")
+
+# Countries whose national numbers are dialed with a trunk "0" that E.164 drops,
+# e.g. Australia's 0412 345 678 is +61412345678. Elsewhere a leading 0 is not a
+# trunk prefix, so numbers written that way are ambiguous.
+_TRUNK_ZERO_COUNTRY_CODES = frozenset(
+    "20 27 31 32 33 41 43 44 46 49 61 62 64 66 81 82 84 86 90 91 92 234 254 353 "
+    "358 972".split()
+)
+# Digits in a national number, where every number has the same length: the
+# North American Numbering Plan's area code and seven digit local number
+_NATIONAL_NUMBER_DIGITS = {"1": 10}
+
+
+def normalize_phone_number(
+    phone_number: str, country_code: str = default_country_code
+) -> str | None:
+    """
+    E.164 form of a phone number as it arrives from SIP, Twilio or a user.
+
+    Accepts "+15551234567", "15551234567", "(555) 123-4567", "0015551234567"
+    (international prefix), "+44 (0)20 7946 0958" (trunk prefix in
+    parentheses, dropped), "sip:+15551234567@host" and numbers with an
+    extension, which is dropped. A national number with a trunk prefix, like
+    "0412 345 678", is accepted for countries that dial one (here with
+    country code 61). Returns None when there is no plausible number, e.g. a
+    7 digit local number without its area code, or a leading 0 in a country
+    without a trunk prefix.
+    """
+    number = phone_number.strip()
+    if number[:4].lower() in ("sip:", "tel:"):
+        number = number[4:].split("@", 1)[0]
+    number = _EXTENSION.split(number, 1)[0]
+    international = number.startswith("+")
+    if international or number.startswith("00"):
+        number = _PARENTHESIZED_TRUNK_ZERO.sub("", number, count=1)
+    digits = _NON_DIGITS.sub("", number)
+    if not international:
+        national_digits = _NATIONAL_NUMBER_DIGITS.get(country_code)
+        if digits.startswith("00"):
+            digits = digits[2:]
+        elif digits.startswith("0"):
+            if country_code not in _TRUNK_ZERO_COUNTRY_CODES:
+                return None
+            digits = country_code + digits[1:]
+        elif national_digits is not None:
+            if len(digits) == national_digits:
+                digits = country_code + digits
+            elif not digits.startswith(country_code):
+                return None
+        # Longer than a national number means the country code is already there
+        elif not (digits.startswith(country_code) and len(digits) > 10):
+            digits = country_code + digits
+    for code, national_digits in _NATIONAL_NUMBER_DIGITS.items():
+        if digits.startswith(code) and len(digits) != len(code) + national_digits:
+            return None
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+class PhoneIndex:
+    """
+    Customer ids by normalized phone number.
+
+    Every stored number is normalized once when the index is built, so any
+    form of the same number finds the customer with one dict lookup. Keys are
+    the E.164 digits as ints, which keeps a million customers compact.
+    """
+
+    def __init__(self, country_code: str = default_country_code):
+        self.country_code = country_code
+        self._ids: dict[int, int] = {}
+
+    @classmethod
+    def build(
+        cls,
+        phone_numbers: Iterable[tuple[int, str]],
+        country_code: str = default_country_code,
+    ) -> "PhoneIndex":
+        """Index (customer id, phone number) pairs in one pass."""
+        index = cls(country_code)
+        for customer_id, phone_number in phone_numbers:
+            index.add(phone_number, customer_id)
+        return index
+
+    def _key(self, phone_number: str) -> int | None:
+        # Stored numbers are E.164 already, skip the regexes for them
+        if phone_number[:1] == "+" and phone_number[1:].isdigit():
+            return int(phone_number[1:])
+        normalized = normalize_phone_number(phone_number, self.country_code)
+        return int(normalized[1:]) if normalized else None
+
+    def add(self, phone_number: str, customer_id: int) -> None:
+        key = self._key(phone_number)
+        if key is None:
+            logger.warning(f"Not indexing invalid phone number {phone_number!r}")
+            return
+        self._ids[key] = customer_id
+
+    def get(self, phone_number: str) -> int | None:
+        key = self._key(phone_number)
+        return self._ids.get(key) if key is not None else None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+@dataclass(frozen=True, slots=True)
 class CustomerContext:
     customer_name: str
     equipment_type: str
     last_service_date: date | None
     current_date: date
+    service_area: str | None
     available_time_windows: list[str]
+    # The most recent calls, oldest first
     call_history: list[CallHistory]
+    # All calls ever, including those not in call_history
+    total_calls: int = 0
+    outcome_counts: dict[str, int] = field(default_factory=dict)
+    # (latitude, longitude) of the customer's address, if geocoded
+    location: tuple[float, float] | None = None
 
 
 class CustomerService:
     """Service class for customer data operations"""
 
-    # Hardcoded demo data - simplified for templates
+    _database: "CustomerRepository | None" = None
+    _repository: "CustomerRepository | None" = None
+    _phone_index: PhoneIndex | None = None
+    _call_history: "CallHistoryStore | None" = None
+    _availability: "AvailabilityEngine | None" = None
+    _reservations: "ReservationStore | None" = None
+    _service_areas: "ServiceAreas | None" = None
+    # (customer's version, template context) by customer id
+    _context_cache: ContextCache[tuple[int | None, dict[str, Any]]] = ContextCache(
+        context_cache_size, context_cache_ttl
+    )
+    _database_lock = threading.Lock()
+    _repository_lock = threading.Lock()
+    _call_history_lock = threading.Lock()
+
+    # Demo customers, seeded on request by seed_demo_data
     _customer_data = {
         "+15551234567": {
             "customer_name": "John Smith",
             "equipment_type": "furnace",
             "last_service_date": _date_days_ago(365),  # 1 year ago
+            "service_area": "north",
+            "location": (41.9484, -87.6553),
             "call_history": [
                 CallHistory(
                     call_direction="outbound",
@@ -69,12 +257,16 @@ class CustomerService:
             "customer_name": "Sarah Johnson",
             "equipment_type": "hvac",
             "last_service_date": _date_days_ago(280),  # ~9 months ago
+            "service_area": "north",
+            "location": (42.0450, -87.6877),
             "call_history": [],
         },
         "+15555551212": {
             "customer_name": "Mike Davis",
             "equipment_type": "hot_water_heater",
             "last_service_date": _date_days_ago(135),  # ~4.5 months ago
+            "service_area": "south",
+            "location": (41.7508, -87.6052),
             "call_history": [
                 CallHistory(
                     call_direction="outbound",
@@ -86,59 +278,537 @@ class CustomerService:
         },
     }
 
-    # Standard available time windows for scheduling
-    _available_time_windows = [
-        "Monday 9:00 AM - 12:00 PM",
-        "Monday 1:00 PM - 5:00 PM",
-        "Tuesday 9:00 AM - 12:00 PM",
-        "Tuesday 1:00 PM - 5:00 PM",
-        "Wednesday 9:00 AM - 12:00 PM",
-        "Wednesday 1:00 PM - 5:00 PM",
-        "Thursday 9:00 AM - 12:00 PM",
-        "Thursday 1:00 PM - 5:00 PM",
-        "Friday 9:00 AM - 12:00 PM",
-        "Friday 1:00 PM - 5:00 PM",
+    # Demo technicians (name, service area, base), seeded with the customers
+    _technician_data = [
+        ("Alex Rivera", "north", (41.9742, -87.6694)),
+        ("Priya Patel", "north", (42.0334, -87.7334)),
+        ("Sam Chen", "south", (41.7943, -87.5907)),
     ]
 
+    # Windows put in the prompt
+    _offered_windows = 5
+
     @classmethod
-    def find_by_phone_number(cls, phone_number: str) -> CustomerContext:
+    def database(cls) -> "CustomerRepository":
         """
-        Find customer by phone number and return complete context for template rendering.
-        For demo purposes, always returns the same customer data.
+        The customer database alone, opened on first use in this process.
 
-        Args:
-            phone_number: Customer phone number (ignored for demo)
+        For processes that only read customers, like the dialer, which need
+        none of what repository() builds.
+        """
+        with cls._database_lock:
+            if cls._database is None:
+                from services.customer_repository import CustomerRepository
 
-        Returns:
-            CustomerContext with demo customer data
+                cls._database = CustomerRepository(
+                    customer_db_path,
+                    customer_db_pool_size,
+                    load_call_history=not CALL_HISTORY_IN_MEMORY,
+                )
+                cls._database.add_write_listener(cls.invalidate_customer)
+            return cls._database
+
+    @classmethod
+    def repository(cls) -> "CustomerRepository":
+        """
+        The customer database, opened on first use in this process.
+
+        The phone index, the technicians' availability, and the in-memory call
+        history if enabled, are built from it at the same time; worker
+        processes are started per job, so each call sees the customers and
+        appointments of its start.
+        """
+        with cls._repository_lock:
+            if cls._repository is None:
+                from services.call_history_store import CallHistoryStore
+                from services.reservations import ReservationStore
+                from services.service_areas import ServiceAreas
+
+                repository = cls.database()
+                cls._phone_index = PhoneIndex.build(repository.iter_phone_numbers())
+                logger.info(f"Indexed {len(cls._phone_index)} customer phone numbers")
+                cls._availability = cls._build_availability(repository)
+                cls._reservations = ReservationStore(
+                    repository, cls._availability, appointment_hold_seconds
+                )
+                cls._service_areas = ServiceAreas(
+                    cls._availability,
+                    service_radius_km,
+                    customer_locations=repository.iter_customer_locations,
+                )
+                for technician_id, *base in repository.iter_technician_bases():
+                    cls._service_areas.add_technician(technician_id, *base)
+                if CALL_HISTORY_IN_MEMORY:
+                    try:
+                        cls._call_history = CallHistoryStore.open(
+                            call_history_snapshot_path
+                        )
+                    except (FileNotFoundError, ValueError):
+                        logger.warning(
+                            "No call history snapshot, building one in this process"
+                        )
+                        cls._call_history = cls.snapshot_call_history(repository)
+                    cls._catch_up_call_history(repository)
+                    logger.info(
+                        f"Mapped {len(cls._call_history)} calls in "
+                        f"{cls._call_history.nbytes() / 2**20:.1f}MB"
+                    )
+                cls._repository = repository
+            return cls._repository
+
+    @classmethod
+    def snapshot_call_history(
+        cls, repository: "CustomerRepository | None" = None
+    ) -> "CallHistoryStore":
+        """
+        Build the columnar call history and save it for job processes to map.
+
+        Run once by the worker's main process before it starts job processes,
+        so each of them maps the file in milliseconds instead of building its
+        own copy.
+        """
+        from services.call_history_store import CallHistoryStore
+        from services.customer_repository import CustomerRepository
+
+        owned = repository is None
+        if owned:
+            repository = CustomerRepository(
+                customer_db_path, 1, load_call_history=False
+            )
+        try:
+            last_call_id = repository.last_call_id()
+            store = CallHistoryStore.build(
+                repository.iter_call_history(last_call_id), last_call_id
+            )
+            store.save(call_history_snapshot_path)
+        finally:
+            if owned:
+                repository.close()
+        logger.info(f"Saved {len(store)} calls to {call_history_snapshot_path}")
+        return store
+
+    @classmethod
+    def seed_demo_data(cls) -> tuple[int, int]:
+        """
+        Add the demo customers and technicians to the customer database.
+
+        Only run on request, by SEED_DEMO_DATA or scripts/seed_demo_data.py,
+        never on its own, so a production database is never given them. Those
+        already there are kept. Returns how many customers and technicians
+        were added.
+        """
+        from services.customer_repository import CustomerRecord, CustomerRepository
+
+        customers = []
+        for phone_number, data in cls._customer_data.items():
+            first_name, _, last_name = data["customer_name"].partition(" ")
+            customers.append(
+                CustomerRecord(
+                    id=0,
+                    customer=Customer(
+                        first_name, last_name, normalize_phone_number(phone_number)
+                    ),
+                    last_service_date=data["last_service_date"],
+                    service_area=data["service_area"],
+                    location=data["location"],
+                    equipment=[Equipment(data["equipment_type"])],
+                    call_history=data["call_history"],
+                )
+            )
+        repository = CustomerRepository(customer_db_path, 1)
+        try:
+            added = repository.seed(customers, cls._technician_data)
+        finally:
+            repository.close()
+        logger.info(
+            f"Seeded {added[0]} demo customers and {added[1]} demo technicians "
+            f"into {customer_db_path}"
+        )
+        return added
+
+    @staticmethod
+    def _build_availability(repository: "CustomerRepository") -> "AvailabilityEngine":
+        from services.availability import AvailabilityEngine
+
+        availability = AvailabilityEngine(
+            horizon_days=availability_horizon_days,
+            appointment_minutes=appointment_minutes,
+        )
+        for technician_id, _, service_area, work_days in repository.iter_technicians():
+            availability.add_technician(technician_id, service_area, work_days)
+        horizon_end = availability.origin + timedelta(days=availability.horizon_days)
+        appointments = 0
+        for technician_id, start, end in repository.iter_appointments(
+            datetime.combine(availability.origin, time(0))
+        ):
+            if start.date() >= horizon_end:
+                break
+            try:
+                availability.book(technician_id, start, end)
+                appointments += 1
+            except ValueError as e:
+                logger.warning(f"Skipping appointment at {start}: {e}")
+        # Days booked through reservations, with their holds, once the holds of
+        # calls that ended without committing or releasing them are freed
+        repository.release_expired_holds(datetime.now().timestamp())
+        for technician_id, day, busy in repository.iter_technician_days(
+            availability.origin
+        ):
+            if day < horizon_end:
+                availability.set_day(technician_id, day, busy)
+        logger.info(
+            f"Loaded availability of {len(availability)} technicians "
+            f"with {appointments} appointments"
+        )
+        return availability
+
+    @classmethod
+    def availability(cls) -> "AvailabilityEngine":
+        """Open windows of the technicians, kept current as appointments change."""
+        cls.repository()
+        return cls._availability
+
+    @classmethod
+    def reservations(cls) -> "ReservationStore":
+        """Holds and bookings of appointment windows, shared across processes."""
+        cls.repository()
+        return cls._reservations
+
+    @classmethod
+    def service_areas(cls) -> "ServiceAreas":
+        """Technicians by base location, and customers by address."""
+        cls.repository()
+        return cls._service_areas
+
+    @classmethod
+    def nearby_technicians(
+        cls, location: tuple[float, float] | list[float] | None
+    ) -> list[int] | None:
+        """
+        The technicians based nearest to an address with a window open, nearest
+        first; None without an address or anyone within the service radius.
+        """
+        if location is None:
+            return None
+        nearby = cls.service_areas().nearest_technicians(*location, nearest_technicians)
+        return [technician_id for technician_id, _ in nearby] or None
+
+    @classmethod
+    def available_time_windows(
+        cls,
+        service_area: str | None = None,
+        location: tuple[float, float] | list[float] | None = None,
+    ) -> list[str]:
+        """
+        The next windows the technicians nearest to the customer's address can
+        take, or without one, a technician of the area, or any.
+        """
+        technicians = cls.nearby_technicians(location)
+        # Windows held by calls that dropped become free again
+        cls.reservations().sweep()
+        return [
+            str(window)
+            for window in cls.availability().next_windows(
+                service_area if technicians is None else None,
+                cls._offered_windows,
+                technicians=technicians,
+            )
+        ]
+
+    @classmethod
+    def with_available_windows(cls, template_context: dict[str, Any]) -> dict[str, Any]:
         """
-        # Fallback to John Smith data for demo
-        demo_data = cls._customer_data.get(
-            phone_number, cls._customer_data["+15551234567"]
+        Copy of a template context with the windows open now.
+
+        Contexts are cached, or resolved by the dialer, for minutes while
+        appointments are booked; the windows are cheap to find again.
+        """
+        template_context = dict(template_context)
+        template_context["available_time_windows"] = ", ".join(
+            cls.available_time_windows(
+                template_context.get("service_area"), template_context.get("location")
+            )
         )
+        return template_context
+
+    @classmethod
+    def invalidate_customer(cls, customer_id: int) -> None:
+        """Drop the cached context of a customer whose calls or appointments changed."""
+        cls._context_cache.invalidate(customer_id)
 
+    @classmethod
+    def record_call(cls, customer_id: int, call: CallHistory) -> None:
+        cls.repository().add_call(customer_id, call)
+        cls._add_to_call_history(customer_id)
+
+    @classmethod
+    async def record_call_async(cls, customer_id: int, call: CallHistory) -> None:
+        await cls.repository().record_call(customer_id, call)
+        await asyncio.to_thread(cls._add_to_call_history, customer_id)
+
+    @classmethod
+    def _add_to_call_history(cls, customer_id: int) -> None:
+        if cls._call_history is not None:
+            cls._catch_up_call_history(cls._repository)
+            # Contexts loaded since the database write are missing this call
+            cls.invalidate_customer(customer_id)
+
+    @classmethod
+    def _catch_up_call_history(cls, repository: "CustomerRepository") -> None:
+        """Add the calls written since the call history was loaded, by any process."""
+        with cls._call_history_lock:
+            for call_id, customer_id, call in repository.iter_calls_since(
+                cls._call_history.last_call_id
+            ):
+                cls._call_history.add(customer_id, call)
+                cls._call_history.last_call_id = call_id
+
+    @classmethod
+    def _customer_context(
+        cls, record: "CustomerRecord | None", with_windows: bool = True
+    ) -> CustomerContext:
+        if record is None:
+            return CustomerContext(
+                customer_name="Unknown caller",
+                equipment_type="unknown",
+                last_service_date=None,
+                current_date=date.today(),
+                service_area=None,
+                available_time_windows=cls.available_time_windows()
+                if with_windows
+                else [],
+                call_history=[],
+            )
         return CustomerContext(
-            customer_name=demo_data["customer_name"],
-            equipment_type=demo_data["equipment_type"],
-            last_service_date=demo_data["last_service_date"],
+            customer_name=f"{record.customer.first_name} {record.customer.last_name}",
+            equipment_type=record.equipment[0].equipment_type
+            if record.equipment
+            else "unknown",
+            last_service_date=record.last_service_date,
             current_date=date.today(),
-            available_time_windows=cls._available_time_windows,
-            call_history=demo_data["call_history"],
+            service_area=record.service_area,
+            available_time_windows=cls.available_time_windows(
+                record.service_area, record.location
+            )
+            if with_windows
+            else [],
+            location=record.location,
+            **cls._call_history_of(record),
         )
 
+    @classmethod
+    def _call_history_of(cls, record: "CustomerRecord") -> dict[str, Any]:
+        if cls._call_history is None:
+            return {
+                "call_history": record.call_history,
+                "total_calls": record.total_calls,
+                "outcome_counts": record.outcome_counts,
+            }
+        return {
+            "call_history": cls._call_history.recent(
+                record.id, cls._repository.digest_size
+            ),
+            "total_calls": cls._call_history.total_calls(record.id),
+            "outcome_counts": cls._call_history.outcome_counts(record.id),
+        }
+
+    @classmethod
+    def find_customer_id(cls, phone_number: str) -> int | None:
+        """Id of the customer with this number, in any format, or None."""
+        cls.repository()  # Builds the index on first use
+        customer_id = cls._phone_index.get(phone_number)
+        if customer_id is None:
+            logger.warning(f"No customer found for {phone_number}")
+        return customer_id
+
+    @classmethod
+    def find_by_phone_number(cls, phone_number: str) -> CustomerContext:
+        """
+        Find customer by phone number and return complete context for template rendering.
+
+        Args:
+            phone_number: Customer phone number, in E.164, national or SIP URI form
+
+        Returns:
+            CustomerContext of the customer, or of an unknown caller if not found
+        """
+        customer_id = cls.find_customer_id(phone_number)
+        record = None
+        if customer_id is not None:
+            record = cls.repository().get_by_id(customer_id)
+        return cls._customer_context(record)
+
+    @classmethod
+    async def find_by_phone_number_async(cls, phone_number: str) -> CustomerContext:
+        """Like find_by_phone_number, querying the database off the event loop."""
+        customer_id = cls.find_customer_id(phone_number)
+        record = None
+        if customer_id is not None:
+            record = await cls.repository().find_by_id(customer_id)
+        return cls._customer_context(record)
+
+    @classmethod
+    def unknown_caller_context(cls) -> dict[str, Any]:
+        """Template context of a caller who is not a customer, or can't be looked up."""
+        return cls.format_template_context(cls._customer_context(None))
+
     @classmethod
     def get_template_context(cls, phone_number: str) -> dict[str, Any]:
         """
         Get template context dictionary for Jinja2 rendering.
-        For demo purposes, always returns the same customer data.
 
         Args:
-            phone_number: Customer phone number (ignored for demo)
+            phone_number: Customer phone number, in E.164, national or SIP URI form
 
         Returns:
-            Dictionary with all template variables
+            Dictionary with all template variables, from the cache when fresh
+        """
+        customer_id = cls.find_customer_id(phone_number)
+        if customer_id is None:
+            return cls.unknown_caller_context()
+
+        repository = cls.repository()
+        cached = cls._context_cache.get(customer_id)
+        if cached is not None and cls._is_fresh(
+            cached, repository.customer_version(customer_id)
+        ):
+            return cls.with_available_windows(cached[1])
+
+        generation = cls._context_cache.generation(customer_id)
+        if cls._call_history is not None:
+            cls._catch_up_call_history(repository)
+        record = repository.get_by_id(customer_id)
+        cached = cls._versioned_context(record)
+        cls._context_cache.put(customer_id, cached, generation)
+        return cls.with_available_windows(cached[1])
+
+    @classmethod
+    async def get_template_context_async(cls, phone_number: str) -> dict[str, Any]:
+        """
+        Like get_template_context, querying the database off the event loop.
+
+        Concurrent calls for the same customer share a single query.
+        """
+        customer_id = cls.find_customer_id(phone_number)
+        if customer_id is None:
+            return cls.unknown_caller_context()
+        return await cls.get_template_context_by_id_async(customer_id)
+
+    @classmethod
+    async def get_template_context_by_id_async(cls, customer_id: int) -> dict[str, Any]:
+        """
+        Template context of a customer whose id is already known.
+
+        A cached context is checked against the customer's version in the
+        database, so calls and appointments written by other processes are
+        never missed. A customer not cached is loaded with a single query.
+        """
+        repository = cls.repository()
+
+        async def load() -> tuple[int | None, dict[str, Any]]:
+            if cls._call_history is not None:
+                await asyncio.to_thread(cls._catch_up_call_history, repository)
+            return cls._versioned_context(await repository.find_by_id(customer_id))
+
+        cached = cls._context_cache.get(customer_id)
+        if cached is not None and not cls._is_fresh(
+            cached, await repository.find_customer_version(customer_id)
+        ):
+            cls._context_cache.invalidate(customer_id)
+            cached = None
+        if cached is None:
+            cached = await cls._context_cache.get_or_load(customer_id, load)
+        return cls.with_available_windows(cached[1])
+
+    @classmethod
+    async def get_template_contexts_async(
+        cls, phone_numbers: Iterable[str]
+    ) -> dict[str, dict[str, Any] | None]:
+        """
+        Template contexts of customers about to be called, for the dialer to
+        hand to the agents it dispatches.
+
+        The numbers are looked up in the database, not the phone index, so a
+        number given to another customer since this process started is never
+        taken for its old one, and only the database is opened. Contexts
+        cached at the customer's version are reused; the rest are fetched
+        together in a few set-based queries. They carry no available windows,
+        which the agent finds when the call starts.
+
+        Returns the contexts keyed by the phone numbers as given, None for
+        numbers of no customer.
         """
-        customer_context = cls.find_by_phone_number(phone_number)
+        phone_numbers = list(phone_numbers)
+        e164s = {number: normalize_phone_number(number) for number in phone_numbers}
+        database = cls.database()
+        found = await database.find_customer_versions_by_phone(
+            set(e164s.values()) - {None}
+        )
+        contexts, generations = {}, {}
+        for customer_id, version in found.values():
+            cached = cls._context_cache.get(customer_id)
+            if cached is not None and cls._is_fresh(cached, version):
+                contexts[customer_id] = cached[1]
+            else:
+                generations[customer_id] = cls._context_cache.generation(customer_id)
+        if generations and cls._call_history is not None:
+            await asyncio.to_thread(cls._catch_up_call_history, database)
+        # This process may keep no call history of its own
+        records = await database.find_by_ids(
+            generations, load_call_history=cls._call_history is None
+        )
+        for customer_id, generation in generations.items():
+            record = records.get(customer_id)
+            if record is None:
+                continue
+            cached = cls._versioned_context(record)
+            cls._context_cache.put(customer_id, cached, generation)
+            contexts[customer_id] = cached[1]
+        return {
+            number: contexts.get(found[e164s[number]][0])
+            if e164s[number] in found
+            else None
+            for number in phone_numbers
+        }
+
+    @classmethod
+    def _versioned_context(
+        cls, record: "CustomerRecord | None"
+    ) -> tuple[int | None, dict[str, Any]]:
+        """
+        Cache entry of a customer: the record's version and template context.
+
+        The context is cached without windows, which with_available_windows
+        finds again whenever it is used.
+        """
+        return (
+            record.version if record else None,
+            cls.format_template_context(
+                cls._customer_context(record, with_windows=False)
+            ),
+        )
+
+    @classmethod
+    def _is_fresh(
+        cls, entry: tuple[int | None, dict[str, Any]], version: int | None
+    ) -> bool:
+        """Whether a cached entry is at the customer's version and from today."""
+        return entry[0] == version and cls._is_current(entry[1])
+
+    @staticmethod
+    def _is_current(template_context: dict[str, Any]) -> bool:
+        # Contexts hold today's date and "N days ago" text, stale after midnight
+        return template_context["current_date"] == date.today().strftime("%Y-%m-%d")
+
+    @classmethod
+    def context_cache_stats(cls) -> dict[str, Any]:
+        return cls._context_cache.stats()
+
+    @classmethod
+    def format_template_context(
+        cls, customer_context: CustomerContext
+    ) -> dict[str, Any]:
+        """Template variables for a customer context."""
         last_service_date = (
             customer_context.last_service_date.strftime("%Y-%m-%d")
             if customer_context.last_service_date
@@ -162,14 +832,32 @@ class CustomerService:
                 history_items.append(
                     f"We called {day_text} and left a {call.call_outcome} about {call.notes}"
                 )
+            # Older calls are summarized from the counts, never iterated
+            earlier = customer_context.total_calls - len(customer_context.call_history)
+            if earlier > 0:
+                earlier_counts = dict(customer_context.outcome_counts)
+                for call in customer_context.call_history:
+                    earlier_counts[call.call_outcome] = (
+                        earlier_counts.get(call.call_outcome, 0) - 1
+                    )
+                outcomes = ", ".join(
+                    f"{count} {outcome}"
+                    for outcome, count in sorted(earlier_counts.items())
+                    if count > 0
+                )
+                history_items.insert(0, f"{earlier} earlier calls ({outcomes})")
             call_history_text = "; ".join(history_items)
 
         return {
             "current_date": customer_context.current_date.strftime("%Y-%m-%d"),
             "last_service_date": last_service_date,
+            "service_area": customer_context.service_area,
+            "location": (
+                list(customer_context.location) if customer_context.location else None
+            ),
             "available_time_windows": ", ".join(
-                customer_context.available_time_windows[:5]
-            ),  # First 5 slots
+                customer_context.available_time_windows
+            ),
             "customer_name": customer_context.customer_name,
             "equipment_type": customer_context.equipment_type,
             "call_history": call_history_text,
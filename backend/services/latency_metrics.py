@@ -0,0 +1,205 @@
+"""
+Per-turn voice latency histograms, exported to Prometheus.
+"""
+
+import atexit
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+import time
+from collections.abc import AsyncIterable
+from pathlib import Path
+
+# Every job runs in its own process, so metrics are written to a directory shared
+# by the worker's processes and aggregated on scrape. prometheus_client picks its
+# storage when it is imported, hence the directory is configured first. Unless
+# set, it is a new directory of this worker's own, created by the main process,
+# inherited by its job processes through the environment and removed on exit.
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+        prefix="customer_service_agent_metrics_"
+    )
+    atexit.register(
+        shutil.rmtree, os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True
+    )
+metrics_dir = Path(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+metrics_dir.mkdir(parents=True, exist_ok=True)
+
+from livekit.agents import metrics  # noqa: E402
+from prometheus_client import (  # noqa: E402
+    CollectorRegistry,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.mmap_dict import MmapedDict  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Voice turns live between ~100ms and a few seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+END_OF_SPEECH_DELAY = Histogram(
+    "agent_end_of_speech_delay_seconds",
+    "Time from the end of user speech (VAD) to the turn being committed",
+    ["direction"],
+    buckets=LATENCY_BUCKETS,
+)
+STT_FINAL_LATENCY = Histogram(
+    "agent_stt_final_latency_seconds",
+    "Time from the end of user speech to the final transcript",
+    ["direction"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TTFT = Histogram(
+    "agent_llm_ttft_seconds",
+    "Time from starting the LLM request to its first token",
+    ["direction"],
+    buckets=LATENCY_BUCKETS,
+)
+TTS_TTFB = Histogram(
+    "agent_tts_ttfb_seconds",
+    "Time from sending text to TTS to its first audio",
+    ["direction"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_LATENCY = Histogram(
+    "agent_response_latency_seconds",
+    "Time from the end of user speech to the first audio of the reply",
+    ["direction"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# The histograms of every job process that has exited, summed
+MERGED_HISTOGRAMS = "histogram_merged.db"
+
+
+class _MergingCollector(multiprocess.MultiProcessCollector):
+    """Collects again when a job process merges its file away mid-scrape."""
+
+    def collect(self):
+        for _ in range(2):
+            try:
+                return super().collect()
+            except FileNotFoundError:
+                continue
+        return super().collect()
+
+
+def start_metrics_server(port: int, addr: str = "127.0.0.1") -> None:
+    """
+    Serve the metrics of every process in this worker on http://addr:port/metrics.
+
+    Call once from the main worker process, before any job process starts. A
+    PROMETHEUS_MULTIPROC_DIR given in the environment must belong to this
+    worker alone and be emptied before it starts, or the files left in it are
+    added to this run's counts.
+    """
+    registry = CollectorRegistry()
+    _MergingCollector(registry)
+    start_http_server(port, addr=addr, registry=registry)
+    logger.info(f"Serving latency metrics on http://{addr}:{port}/metrics")
+
+
+def mark_process_dead() -> None:
+    """
+    Drop this job process's live values from the worker's metrics, as it exits.
+
+    Its histograms are added to the worker's merged file and its own file is
+    removed, so the directory holds one histogram file per running job rather
+    than one per job ever run.
+    """
+    pid = os.getpid()
+    multiprocess.mark_process_dead(pid)
+    path = metrics_dir / f"histogram_{pid}.db"
+    if path.exists():
+        _merge_histograms(path)
+
+
+def _merge_histograms(path: Path) -> None:
+    # Job processes exit concurrently; one merges at a time
+    with open(metrics_dir / "histogram_merged.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merged_path = metrics_dir / MERGED_HISTOGRAMS
+        totals: dict[str, float] = {}
+        for source in (merged_path, path):
+            if source.exists():
+                for key, value, _, _ in MmapedDict.read_all_values_from_file(
+                    str(source)
+                ):
+                    totals[key] = totals.get(key, 0.0) + value
+        # Not named *.db, so scrapes don't read it half written
+        staged = metrics_dir / "histogram_merged.tmp"
+        staged.unlink(missing_ok=True)
+        merged = MmapedDict(str(staged))
+        try:
+            for key, value in totals.items():
+                merged.write_value(key, value, 0.0)
+        finally:
+            merged.close()
+        os.replace(staged, merged_path)
+        path.unlink()
+
+
+class TurnLatency:
+    """
+    Collects the latency of each stage of a turn for one call.
+
+    End of speech and STT delays come from the session's EOU metrics, LLM TTFT
+    from llm_node and TTS TTFB from tts_node, so cached and live audio are
+    measured alike. Each stage is observed as it arrives, and the end of speech
+    to first audio total once the reply starts playing.
+    """
+
+    def __init__(self, direction: str):
+        self.direction = direction
+        self._speech_ended_at: float | None = None
+        self._text_at: float | None = None
+        self._turn: dict[str, float] = {}
+
+    def on_metrics(self, collected: metrics.AgentMetrics) -> None:
+        if not isinstance(collected, metrics.EOUMetrics):
+            return
+        # Emitted when the turn is committed, end_of_utterance_delay after the
+        # user stopped speaking
+        self._speech_ended_at = collected.timestamp - collected.end_of_utterance_delay
+        self._turn = {
+            "end_of_speech": collected.end_of_utterance_delay,
+            "stt_final": collected.transcription_delay,
+        }
+        END_OF_SPEECH_DELAY.labels(self.direction).observe(
+            collected.end_of_utterance_delay
+        )
+        STT_FINAL_LATENCY.labels(self.direction).observe(collected.transcription_delay)
+
+    def record_llm_ttft(self, ttft: float) -> None:
+        self._turn.setdefault("llm_ttft", ttft)
+        LLM_TTFT.labels(self.direction).observe(ttft)
+
+    async def watch_text(self, text: AsyncIterable[str]) -> AsyncIterable[str]:
+        """Pass TTS input through, noting when its first chunk arrives."""
+        self._text_at = None
+        async for chunk in text:
+            if self._text_at is None:
+                self._text_at = time.perf_counter()
+            yield chunk
+
+    def record_first_audio(self) -> None:
+        """Mark the first audio frame of a reply."""
+        if self._text_at is not None:
+            ttfb = time.perf_counter() - self._text_at
+            self._text_at = None
+            self._turn.setdefault("tts_ttfb", ttfb)
+            TTS_TTFB.labels(self.direction).observe(ttfb)
+
+        # Only replies to a user turn have an end of speech, not the greeting
+        if self._speech_ended_at is None:
+            return
+        total = time.time() - self._speech_ended_at
+        self._speech_ended_at = None
+        RESPONSE_LATENCY.labels(self.direction).observe(total)
+        stages = " ".join(f"{name}={value:.3f}s" for name, value in self._turn.items())
+        logger.info(f"TURN LATENCY: total={total:.3f}s {stages}")
+        self._turn = {}
@@ -3,6 +3,7 @@ Outbound call service to replace lk CLI usage.
 Provides programmatic API for initiating customer service calls.
 """
 
+import asyncio
 import logging
 import os
 from uuid import uuid4
@@ -10,6 +11,9 @@ from uuid import uuid4
 from dotenv import load_dotenv
 from livekit import api
 
+from services.call_metadata import encode_customer_context
+from services.customer_service import CustomerService, normalize_phone_number
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -21,6 +25,8 @@ class OutboundCallService:
         self.livekit_api_secret = os.getenv("LIVEKIT_API_SECRET")
         self.livekit_url = os.getenv("LIVEKIT_URL")
         self.sip_trunk_id = os.getenv("LIVEKIT_SIP_TRUNK_ID")
+        # Name the agent worker registers with, to dispatch it explicitly
+        self.agent_name = os.getenv("AGENT_NAME", "")
 
         if not all([self.livekit_api_key, self.livekit_api_secret, self.livekit_url]):
             raise ValueError("Missing required LiveKit environment variables")
@@ -31,18 +37,22 @@ class OutboundCallService:
             api_secret=self.livekit_api_secret,
         )
 
-    async def make_call(self, phone_number: str) -> dict:
+    async def make_call(
+        self, phone_number: str, context_metadata: str | None = None
+    ) -> dict:
         """
         Initiate an outbound call to a customer.
 
         Args:
             phone_number: Customer's phone number (e.g., "+15551234567")
+            context_metadata: Dispatch metadata already resolved by make_calls,
+                resolved here when None
 
         Returns:
             Dict with call details including room_name and participant_id
         """
         # Format room name to match dispatch rule pattern: outbound_<caller>_<random>
-        caller_clean = phone_number.replace("-", "")
+        caller_clean = _caller_id(phone_number)
         room_name = f"outbound_{caller_clean}_{uuid4().hex[:8]}"
 
         try:
@@ -50,8 +60,14 @@ class OutboundCallService:
                 f"Initiating outbound call to {phone_number} in room {room_name}"
             )
 
+            if context_metadata is None:
+                metadata = await self._customer_context_metadata([caller_clean])
+                context_metadata = metadata[caller_clean]
+            await self.lk_api.room.create_room(
+                self._room_request(room_name, context_metadata)
+            )
+
             # Create SIP participant for outbound call
-            # The agent should be dispatched automatically via dispatch rules
             sip_request = api.CreateSIPParticipantRequest(
                 room_name=room_name,
                 sip_trunk_id=self.sip_trunk_id,
@@ -83,6 +99,83 @@ class OutboundCallService:
             logger.error(f"Unexpected error making call to {phone_number}: {e}")
             return {"success": False, "error": str(e), "phone_number": phone_number}
 
+    async def make_calls(
+        self, phone_numbers: list[str], wave_size: int = 10
+    ) -> list[dict]:
+        """
+        Call customers in waves of `wave_size` concurrent calls.
+
+        The customers of each wave are resolved together just before it is
+        dialed, in a few queries instead of a few per call.
+        """
+        waves = [
+            phone_numbers[i : i + wave_size]
+            for i in range(0, len(phone_numbers), wave_size)
+        ]
+        results = []
+        for i, wave in enumerate(waves):
+            logger.info(f"Dialing wave {i + 1}/{len(waves)} of {len(wave)} calls")
+            metadata = await self._customer_context_metadata(
+                [_caller_id(number) for number in wave]
+            )
+            results.extend(
+                await asyncio.gather(
+                    *(
+                        self.make_call(number, metadata[_caller_id(number)])
+                        for number in wave
+                    )
+                )
+            )
+        return results
+
+    def _room_request(
+        self, room_name: str, context_metadata: str
+    ) -> api.CreateRoomRequest:
+        """
+        The room to call the customer from, dispatching the agent into it.
+
+        With AGENT_NAME set, the agent is dispatched explicitly with the
+        customer already resolved in the dispatch's metadata, so it skips the
+        lookup. Otherwise it is dispatched automatically, and looks the
+        customer up itself.
+        """
+        if not self.agent_name:
+            return api.CreateRoomRequest(name=room_name)
+        return api.CreateRoomRequest(
+            name=room_name,
+            agents=[
+                api.RoomAgentDispatch(
+                    agent_name=self.agent_name, metadata=context_metadata
+                )
+            ],
+        )
+
+    async def _customer_context_metadata(
+        self, phone_numbers: list[str]
+    ) -> dict[str, str]:
+        """
+        Dispatch metadata carrying each customer's context, by phone number;
+        empty for numbers of no customer, or when it can't be resolved.
+        """
+        if not self.agent_name:
+            return dict.fromkeys(phone_numbers, "")
+        try:
+            contexts = await CustomerService.get_template_contexts_async(phone_numbers)
+        except Exception as e:
+            # The agents look the customers up themselves when metadata is missing
+            logger.warning(f"Failed to resolve customers {phone_numbers}: {e}")
+            return dict.fromkeys(phone_numbers, "")
+        return {
+            number: encode_customer_context(number, template_context)
+            if template_context is not None
+            else ""
+            for number, template_context in contexts.items()
+        }
+
     async def close(self):
         """Clean up API client connections."""
         await self.lk_api.aclose()
+
+
+def _caller_id(phone_number: str) -> str:
+    return normalize_phone_number(phone_number) or phone_number.replace("-", "")
@@ -0,0 +1,226 @@
+"""
+Appointment reservations, safe across concurrent calls and worker processes.
+"""
+
+import asyncio
+import logging
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any
+
+from services.availability import AvailabilityEngine, TimeWindow, slot_mask
+from services.customer_repository import CustomerRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Hold:
+    id: int
+    customer_id: int
+    technician_id: int
+    start: datetime
+    end: datetime
+    # time.time() after which the slots are freed unless committed
+    expires_at: float
+
+
+@dataclass(frozen=True, slots=True)
+class Appointment:
+    id: int
+    customer_id: int
+    technician_id: int
+    start: datetime
+    end: datetime
+
+
+class ReservationStore:
+    """
+    Two-phase booking of technician windows: hold, then commit.
+
+    Calls run in separate worker processes and offer the same windows, so the
+    source of truth is each technician day's slot bitmap in the customer
+    database, with a version number. A hold reads the bitmap, picks the
+    earliest start in the window with room for an appointment, and swaps in
+    the bitmap with those slots set only if the version is unchanged
+    (compare-and-swap), retrying on a fresh read when another booker got
+    there first. Committing turns a hold that has not expired into an
+    appointment. Expired holds are released when a window looks full, and by
+    sweep() every `sweep_interval` seconds before windows are offered, so a
+    call that drops mid-booking blocks the slots for about `hold_seconds`.
+
+    The process's AvailabilityEngine is updated with every bitmap read, so
+    windows taken by other calls stop being offered here too. Appointment
+    writes notify the repository's write listeners, which invalidate the
+    customer's cached context.
+    """
+
+    def __init__(
+        self,
+        repository: CustomerRepository,
+        availability: AvailabilityEngine,
+        hold_seconds: float = 120.0,
+        max_attempts: int = 8,
+        sweep_interval: float = 10.0,
+    ):
+        self.repository = repository
+        self.availability = availability
+        self.hold_seconds = hold_seconds
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self._swept_at = time.monotonic()
+        self.holds = 0
+        self.commits = 0
+        self.conflicts = 0
+        self.expired = 0
+
+    def hold(
+        self,
+        customer_id: int,
+        window: TimeWindow,
+        service_area: str | None = None,
+        technicians: list[int] | None = None,
+    ) -> Hold | None:
+        """
+        Hold time in the window with one of the given technicians, in order,
+        e.g. nearest to the customer first, or else a technician of the area,
+        or any.
+
+        Technicians of an area are tried in random order so concurrent
+        bookers of the same window spread over them. Returns None if none has
+        room left.
+        """
+        for attempt in range(2):
+            if technicians is None:
+                candidates = self.availability.technicians_for(window, service_area)
+                random.shuffle(candidates)
+            else:
+                candidates = [
+                    technician_id
+                    for technician_id in technicians
+                    if self.availability.appointment_start(technician_id, window)
+                ]
+            for technician_id in candidates:
+                hold = self._hold_technician(customer_id, technician_id, window)
+                if hold is not None:
+                    return hold
+            # The window may only be full of holds nobody committed
+            if attempt or not self.release_expired():
+                break
+        return None
+
+    def _hold_technician(
+        self, customer_id: int, technician_id: int, window: TimeWindow
+    ) -> Hold | None:
+        day = window.start.date()
+        for _ in range(self.max_attempts):
+            busy, version = self.repository.technician_day(technician_id, day)
+            self.availability.set_day(technician_id, day, busy)
+            start = self.availability.appointment_start(technician_id, window)
+            if start is None:
+                return None
+            end = start + self.availability.appointment_duration
+            held = busy | slot_mask(start, end)
+            expires_at = time.time() + self.hold_seconds
+            hold_id = self.repository.hold_slots(
+                technician_id, version, held, customer_id, start, end, expires_at
+            )
+            if hold_id is not None:
+                self.availability.set_day(technician_id, day, held)
+                self.holds += 1
+                return Hold(hold_id, customer_id, technician_id, start, end, expires_at)
+            # Another booker changed the day since we read it
+            self.conflicts += 1
+        logger.warning(
+            f"Gave up holding technician {technician_id} on {day} after "
+            f"{self.max_attempts} conflicts"
+        )
+        return None
+
+    def commit(self, hold: Hold) -> Appointment | None:
+        """Book the held time; None if the hold expired and was released."""
+        appointment_id = self.repository.commit_hold(hold.id, time.time())
+        if appointment_id is None:
+            self.expired += 1
+            self._refresh(hold.technician_id, hold.start.date())
+            return None
+        self.commits += 1
+        return Appointment(
+            appointment_id, hold.customer_id, hold.technician_id, hold.start, hold.end
+        )
+
+    def book(
+        self,
+        customer_id: int,
+        window: TimeWindow,
+        service_area: str | None = None,
+        technicians: list[int] | None = None,
+    ) -> Appointment | None:
+        """Hold and commit at once, for bookings already confirmed."""
+        hold = self.hold(customer_id, window, service_area, technicians)
+        return self.commit(hold) if hold is not None else None
+
+    def release(self, hold: Hold) -> None:
+        """Give up a hold before it expires."""
+        for technician_id, day in self.repository.release_hold(hold.id):
+            self._refresh(technician_id, day)
+
+    def release_expired(self) -> int:
+        """Free the slots of expired holds; returns the number of days changed."""
+        changed = self.repository.release_expired_holds(time.time())
+        for technician_id, day in changed:
+            self._refresh(technician_id, day)
+        return len(changed)
+
+    def sweep(self) -> int:
+        """release_expired(), if it hasn't run in the last `sweep_interval` seconds."""
+        now = time.monotonic()
+        if now - self._swept_at < self.sweep_interval:
+            return 0
+        self._swept_at = now
+        try:
+            return self.release_expired()
+        except sqlite3.Error as e:
+            # Windows are still offered; the next sweep tries again
+            logger.warning(f"Failed to release expired holds: {e}")
+            return 0
+
+    def cancel(self, appointment: Appointment) -> None:
+        for technician_id, day in self.repository.cancel_appointment(appointment.id):
+            self._refresh(technician_id, day)
+
+    def _refresh(self, technician_id: int, day: date) -> None:
+        try:
+            busy, _ = self.repository.technician_day(technician_id, day)
+            self.availability.set_day(technician_id, day, busy)
+        except ValueError:
+            # Outside this process's horizon, nothing offered to update
+            pass
+
+    async def hold_async(
+        self,
+        customer_id: int,
+        window: TimeWindow,
+        service_area: str | None = None,
+        technicians: list[int] | None = None,
+    ) -> Hold | None:
+        return await asyncio.to_thread(
+            self.hold, customer_id, window, service_area, technicians
+        )
+
+    async def commit_async(self, hold: Hold) -> Appointment | None:
+        return await asyncio.to_thread(self.commit, hold)
+
+    async def release_async(self, hold: Hold) -> None:
+        await asyncio.to_thread(self.release, hold)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "holds": self.holds,
+            "commits": self.commits,
+            "conflicts": self.conflicts,
+            "expired": self.expired,
+        }
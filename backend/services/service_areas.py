@@ -0,0 +1,244 @@
+"""
+Where technicians are based and customers live, for dispatch by distance.
+"""
+
+import heapq
+import logging
+from collections.abc import Callable, Iterable
+from datetime import datetime
+from math import cos, floor, hypot, inf, radians
+
+from services.availability import AvailabilityEngine, TimeWindow
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.195
+
+
+class GeoIndex:
+    """
+    Points bucketed in a grid of `cell_km` square cells, for nearest and
+    radius queries that never scan every point.
+
+    Cells are the buckets a geohash of similar precision gives, addressed by
+    integer coordinates so neighbouring cells are found by arithmetic rather
+    than by decoding. Nearest queries visit rings of cells outwards from the
+    query's cell and stop as soon as no unvisited cell can hold anything
+    closer than what was found, so they touch a handful of cells whatever
+    the number of points.
+
+    Coordinates are projected equirectangularly around `reference_latitude`,
+    by default that of the first point added, which is accurate to well
+    under a percent over the few hundred kilometres a service region spans.
+    Distances are in km.
+    """
+
+    def __init__(self, cell_km: float = 5.0, reference_latitude: float | None = None):
+        self.cell_km = cell_km
+        self._lon_scale = (
+            cos(radians(reference_latitude)) * KM_PER_DEGREE
+            if reference_latitude is not None
+            else None
+        )
+        self._cells: dict[tuple[int, int], list[int]] = {}
+        # Projected (x, y) km by point id
+        self._points: dict[int, tuple[float, float]] = {}
+        # Smallest and largest cell coordinates in use, bounding ring searches
+        self._bounds = (0, 0, -1, -1)
+
+    def _project(self, latitude: float, longitude: float) -> tuple[float, float]:
+        if self._lon_scale is None:
+            self._lon_scale = cos(radians(latitude)) * KM_PER_DEGREE
+        return longitude * self._lon_scale, latitude * KM_PER_DEGREE
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return floor(x / self.cell_km), floor(y / self.cell_km)
+
+    def add(self, point_id: int, latitude: float, longitude: float) -> None:
+        """Index a point, moving it if it was indexed before."""
+        if point_id in self._points:
+            self.remove(point_id)
+        x, y = self._project(latitude, longitude)
+        cell = self._cell(x, y)
+        self._points[point_id] = (x, y)
+        self._cells.setdefault(cell, []).append(point_id)
+        min_x, min_y, max_x, max_y = self._bounds
+        if min_x > max_x:
+            self._bounds = (*cell, *cell)
+        else:
+            self._bounds = (
+                min(min_x, cell[0]),
+                min(min_y, cell[1]),
+                max(max_x, cell[0]),
+                max(max_y, cell[1]),
+            )
+
+    def remove(self, point_id: int) -> None:
+        x, y = self._points.pop(point_id)
+        cell = self._cell(x, y)
+        self._cells[cell].remove(point_id)
+        if not self._cells[cell]:
+            del self._cells[cell]
+
+    def _ring(self, cx: int, cy: int, r: int) -> Iterable[tuple[int, int]]:
+        """Cells at Chebyshev distance r from (cx, cy), within the bounds."""
+        min_x, min_y, max_x, max_y = self._bounds
+        if r == 0:
+            yield cx, cy
+            return
+        for x in range(max(cx - r, min_x), min(cx + r, max_x) + 1):
+            if min_y <= cy - r <= max_y:
+                yield x, cy - r
+            if min_y <= cy + r <= max_y:
+                yield x, cy + r
+        for y in range(max(cy - r + 1, min_y), min(cy + r - 1, max_y) + 1):
+            if min_x <= cx - r <= max_x:
+                yield cx - r, y
+            if min_x <= cx + r <= max_x:
+                yield cx + r, y
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 1,
+        max_km: float = inf,
+        accept: Callable[[int], bool] | None = None,
+    ) -> list[tuple[int, float]]:
+        """
+        Up to k (point id, km) pairs, closest first, within max_km.
+
+        `accept` filters points, e.g. to technicians with room left; it is
+        only called for points close enough to make the result.
+        """
+        if not self._points:
+            return []
+        x, y = self._project(latitude, longitude)
+        cx, cy = self._cell(x, y)
+        min_x, min_y, max_x, max_y = self._bounds
+        last_ring = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy)
+        # Max-heap of the best k so far, as (-km, point id)
+        best: list[tuple[float, int]] = []
+        for r in range(last_ring + 1):
+            # The query lies in the centre cell, so ring r is at least r - 1
+            # cells away
+            reach = (r - 1) * self.cell_km
+            if reach > max_km or (len(best) == k and reach > -best[0][0]):
+                break
+            for cell in self._ring(cx, cy, r):
+                for point_id in self._cells.get(cell, ()):
+                    px, py = self._points[point_id]
+                    km = hypot(px - x, py - y)
+                    if km > max_km or (len(best) == k and km >= -best[0][0]):
+                        continue
+                    if accept is not None and not accept(point_id):
+                        continue
+                    if len(best) == k:
+                        heapq.heapreplace(best, (-km, point_id))
+                    else:
+                        heapq.heappush(best, (-km, point_id))
+        return [(point_id, -km) for km, point_id in sorted(best, reverse=True)]
+
+    def within(
+        self, latitude: float, longitude: float, km: float
+    ) -> list[tuple[int, float]]:
+        """(point id, km) of every point within km, closest first."""
+        return self.nearest(latitude, longitude, len(self._points), km)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, point_id: int) -> bool:
+        return point_id in self._points
+
+
+class ServiceAreas:
+    """
+    Technicians by base location and customers by address, matched against
+    the technicians' availability.
+
+    The windows offered to a customer with a known address come from the
+    technicians nearest to it that still have room, instead of from every
+    technician of their service area. The customer index is built on first
+    use from `customer_locations`, as only dispatch planning needs it and it
+    grows with the customer base.
+    """
+
+    def __init__(
+        self,
+        availability: AvailabilityEngine,
+        max_km: float = 40.0,
+        cell_km: float = 5.0,
+        customer_locations: Callable[[], Iterable[tuple[int, float, float]]]
+        | None = None,
+    ):
+        self.availability = availability
+        self.max_km = max_km
+        self.technicians = GeoIndex(cell_km)
+        self._cell_km = cell_km
+        self._customer_locations = customer_locations
+        self._customers: GeoIndex | None = None
+
+    def add_technician(
+        self, technician_id: int, latitude: float, longitude: float
+    ) -> None:
+        self.technicians.add(technician_id, latitude, longitude)
+
+    def nearest_technicians(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 5,
+        after: datetime | None = None,
+    ) -> list[tuple[int, float]]:
+        """(technician id, km) of the k nearest with an open window after `after`."""
+        return self.technicians.nearest(
+            latitude,
+            longitude,
+            k,
+            self.max_km,
+            lambda technician_id: self.availability.is_available(technician_id, after),
+        )
+
+    def nearest_available_technician(
+        self, latitude: float, longitude: float, window: TimeWindow
+    ) -> tuple[int, float] | None:
+        """(technician id, km) of the nearest technician with room in window."""
+        found = self.technicians.nearest(
+            latitude,
+            longitude,
+            1,
+            self.max_km,
+            lambda technician_id: (
+                self.availability.appointment_start(technician_id, window) is not None
+            ),
+        )
+        return found[0] if found else None
+
+    def next_windows(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int = 5,
+        technicians: int = 5,
+        after: datetime | None = None,
+    ) -> list[TimeWindow]:
+        """The first windows the `technicians` nearest available ones can take."""
+        nearby = self.nearest_technicians(latitude, longitude, technicians, after)
+        if not nearby:
+            return []
+        return self.availability.next_windows(
+            limit=limit, after=after, technicians=[t for t, _ in nearby]
+        )
+
+    def customers_near(
+        self, latitude: float, longitude: float, km: float
+    ) -> list[tuple[int, float]]:
+        """(customer id, km) of the customers within km, e.g. of a booked visit."""
+        if self._customers is None:
+            self._customers = GeoIndex(self._cell_km)
+            locations = self._customer_locations() if self._customer_locations else ()
+            for customer_id, customer_latitude, customer_longitude in locations:
+                self._customers.add(customer_id, customer_latitude, customer_longitude)
+            logger.info(f"Indexed {len(self._customers)} customer addresses")
+        return self._customers.within(latitude, longitude, km)
@@ -0,0 +1,176 @@
+"""
+Speculative LLM generation started from stable interim STT transcripts.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from typing import Any
+
+from livekit.agents import llm, stt
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w\s']")
+
+# Sentinel marking the end of a speculative stream
+_END = object()
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace for transcript matching."""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+class SpeculativeGeneration:
+    """
+    Starts the LLM on the user's transcript before the turn detector commits it.
+
+    Each Deepgram final segment is stable text, so once one arrives and no newer
+    interim transcript follows, generation starts on the turn so far. When the
+    turn is committed with the same transcript and chat history, the buffered
+    and remaining output is handed to llm_node; otherwise it is cancelled.
+    """
+
+    def __init__(self, min_chars: int = 4):
+        self.min_chars = min_chars
+        self._turn_segments: list[str] = []
+        self._task: asyncio.Task | None = None
+        self._queue: asyncio.Queue | None = None
+        self._transcript = ""
+        self._base_item_ids: list[str] = []
+        self._started_at = 0.0
+        self._first_chunk_at: float | None = None
+        self.started = 0
+        self.won = 0
+        self.lost = 0
+        self.saved_total = 0.0
+
+    def on_speech_event(
+        self,
+        event: stt.SpeechEvent,
+        chat_ctx: llm.ChatContext,
+        stream_factory: Callable[[llm.ChatContext], AsyncIterable[Any]],
+    ) -> None:
+        """Track the user's turn and start or cancel speculation accordingly."""
+        if event.type == stt.SpeechEventType.START_OF_SPEECH:
+            self.cancel()
+        elif event.type == stt.SpeechEventType.INTERIM_TRANSCRIPT:
+            # The user kept talking, the speculated transcript is already stale
+            if event.alternatives and event.alternatives[0].text.strip():
+                self.cancel()
+        elif event.type == stt.SpeechEventType.FINAL_TRANSCRIPT:
+            text = event.alternatives[0].text.strip() if event.alternatives else ""
+            if text:
+                self._turn_segments.append(text)
+                self._start(chat_ctx, stream_factory)
+
+    def _start(
+        self,
+        chat_ctx: llm.ChatContext,
+        stream_factory: Callable[[llm.ChatContext], AsyncIterable[Any]],
+    ) -> None:
+        self.cancel()
+        transcript = " ".join(self._turn_segments)
+        if len(transcript) < self.min_chars:
+            return
+
+        speculative_ctx = chat_ctx.copy()
+        self._base_item_ids = [item.id for item in speculative_ctx.items]
+        speculative_ctx.add_message(role="user", content=transcript)
+
+        self._transcript = normalize_transcript(transcript)
+        self._queue = asyncio.Queue()
+        self._started_at = time.perf_counter()
+        self._first_chunk_at = None
+        self._task = asyncio.create_task(
+            self._run(stream_factory(speculative_ctx), self._queue),
+            name="speculative_llm",
+        )
+        self.started += 1
+
+    async def _run(self, stream: AsyncIterable[Any], queue: asyncio.Queue) -> None:
+        try:
+            async for chunk in stream:
+                if self._first_chunk_at is None:
+                    self._first_chunk_at = time.perf_counter()
+                queue.put_nowait(chunk)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(_END)
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._queue = None
+            self.lost += 1
+
+    def take(self, chat_ctx: llm.ChatContext) -> AsyncIterator[Any] | None:
+        """
+        Claim the speculative output for the committed turn.
+
+        Returns:
+            The speculative stream if it was generated for exactly this turn, else None
+        """
+        self._turn_segments = []
+        if self._task is None:
+            return None
+
+        items = chat_ctx.items
+        committed = items[-1] if items else None
+        matches = (
+            committed is not None
+            and committed.type == "message"
+            and committed.role == "user"
+            and normalize_transcript(committed.text_content or "") == self._transcript
+            and [item.id for item in items[:-1]] == self._base_item_ids
+        )
+        if not matches:
+            self.cancel()
+            return None
+
+        committed_at = time.perf_counter()
+        # LLM latency already paid before the turn was committed
+        saved = (
+            min(committed_at, self._first_chunk_at or committed_at) - self._started_at
+        )
+        self.won += 1
+        self.saved_total += saved
+        logger.info(f"SPECULATION WON: saved={saved:.3f}s win_rate={self.win_rate:.1%}")
+
+        task, queue = self._task, self._queue
+        self._task = None
+        self._queue = None
+        return self._drain(task, queue)
+
+    async def _drain(
+        self, task: asyncio.Task, queue: asyncio.Queue
+    ) -> AsyncIterator[Any]:
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stop generating if the reply was interrupted
+            task.cancel()
+
+    @property
+    def win_rate(self) -> float:
+        return self.won / self.started if self.started else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "started": self.started,
+            "won": self.won,
+            "lost": self.lost,
+            "win_rate": self.win_rate,
+            "avg_saved": self.saved_total / self.won if self.won else 0.0,
+        }
@@ -0,0 +1,85 @@
+"""
+Template registry for precompiled prompt templates.
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateRegistry:
+    """
+    Compiles prompt templates once per process.
+
+    Renders are not memoized: every call runs in its own job process, so a
+    per-process memo of a customer's prompts would never be hit by a later
+    call, and rendering a precompiled template is cheap.
+    """
+
+    def __init__(self, template_dir: Path, bytecode_cache_dir: str | None = None):
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir),
+            auto_reload=False,
+        )
+        self._templates: dict[str, Template] = {}
+
+    def precompile(self) -> int:
+        """
+        Compile every template in the template directory.
+
+        Returns:
+            Number of templates compiled
+        """
+        for name in self.env.list_templates(extensions=["j2"]):
+            self._templates[name] = self.env.get_template(name)
+        return len(self._templates)
+
+    def template_fingerprint(self, name: str) -> str:
+        """Content hash of a template's source, changes whenever it is edited."""
+        source, _, _ = self.env.loader.get_source(self.env, name)
+        return hashlib.sha1(source.encode()).hexdigest()
+
+    def get_template(self, name: str) -> Template:
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self.env.get_template(name)
+        return template
+
+    def render_prompts(
+        self, call_direction: str, template_context: dict[str, Any]
+    ) -> tuple[str, str]:
+        """
+        Render the instructions and initial prompt for a call direction.
+
+        Args:
+            call_direction: 'inbound' or 'outbound'
+            template_context: Template variables for the customer
+
+        Returns:
+            Tuple of (instructions, initial_prompt)
+        """
+        return (
+            self.get_template(f"instructions_{call_direction}.j2").render(
+                template_context
+            ),
+            self.get_template(f"initial_prompt_{call_direction}.j2").render(
+                template_context
+            ),
+        )
+
+    def render_greeting(
+        self, call_direction: str, template_context: dict[str, Any]
+    ) -> str:
+        """Render the exact opening line from the initial prompt's greeting block."""
+        template = self.get_template(f"initial_prompt_{call_direction}.j2")
+        render_block = template.blocks["greeting"]
+        return "".join(render_block(template.new_context(template_context))).strip()
+
+    def stats(self) -> dict[str, Any]:
+        return {"templates": len(self._templates)}
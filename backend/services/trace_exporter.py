@@ -0,0 +1,145 @@
+"""
+Background exporter that keeps Langfuse tracing off the audio hot path.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+from random import random
+from typing import Any
+
+from langfuse import Langfuse
+
+logger = logging.getLogger(__name__)
+
+
+class TraceExporter:
+    """
+    Queues trace observations in-process and exports them from a background task.
+
+    The hot path only does a non-blocking put on a bounded queue. When the queue
+    is full the observation is dropped and counted instead of applying backpressure.
+    Field values may be zero-argument callables; they are evaluated at export time,
+    off the event loop, so expensive serialization never runs inside a turn.
+    """
+
+    def __init__(
+        self,
+        client: Langfuse,
+        max_queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        sample_rate: float | None = None,
+    ):
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = (
+            sample_rate
+            if sample_rate is not None
+            else float(os.getenv("LANGFUSE_SAMPLE_RATE", "1.0"))
+        )
+        self._max_queue_size = max_queue_size
+        self._queue: asyncio.Queue[tuple[str, dict[str, Any]]] | None = None
+        self._task: asyncio.Task | None = None
+        # Taken off the queue, waiting out the flush interval
+        self._batch: list[tuple[str, dict[str, Any]]] = []
+        self.submitted = 0
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def should_sample(self) -> bool:
+        """Per-session sampling decision."""
+        return random() < self.sample_rate
+
+    def submit(self, kind: str, **fields: Any) -> bool:
+        """
+        Queue a Langfuse observation without blocking.
+
+        Args:
+            kind: Langfuse client method to call ('trace', 'generation' or 'span')
+            **fields: Keyword arguments for that method
+
+        Returns:
+            True if queued, False if dropped because the queue is full
+        """
+        if self._task is None or self._task.done():
+            self._start()
+        try:
+            self._queue.put_nowait((kind, fields))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def _start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_queue_size)
+        self._task = asyncio.create_task(self._run(), name="trace_exporter")
+
+    async def _run(self) -> None:
+        while True:
+            self._batch.append(await self._queue.get())
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except TimeoutError:
+                    break
+            # Handed to the thread, which finishes it even if we are cancelled
+            batch, self._batch = self._batch, []
+            await asyncio.to_thread(self._export_batch, batch)
+
+    def _export_batch(self, batch: list[tuple[str, dict[str, Any]]]) -> None:
+        for kind, fields in batch:
+            try:
+                resolved = {
+                    key: value() if callable(value) else value
+                    for key, value in fields.items()
+                }
+                getattr(self.client, kind)(**resolved)
+                self.exported += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Failed to export {kind} to Langfuse: {e}")
+
+    async def aclose(self, timeout: float = 2.0) -> None:
+        """
+        Export whatever is queued or batched within the timeout, then flush the
+        client.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._queue is not None:
+            pending, self._batch = self._batch, []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            try:
+                await asyncio.wait_for(
+                    asyncio.to_thread(self._export_batch, pending), timeout
+                )
+                await asyncio.wait_for(asyncio.to_thread(self.client.flush), timeout)
+            except TimeoutError:
+                logger.warning("Timed out flushing traces to Langfuse")
+        logger.info(f"Trace exporter stats: {self.stats()}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
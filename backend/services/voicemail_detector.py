@@ -0,0 +1,165 @@
+"""
+Fast local voicemail detection on the STT and audio streams.
+"""
+
+import logging
+import re
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+from livekit import rtc
+
+logger = logging.getLogger(__name__)
+
+# Phrases starting with "^" only match at the start of the greeting, after an
+# optional "hi", "hello" or "hey"; the rest are recording cues nobody answering
+# the phone says, matched anywhere
+DEFAULT_VOICEMAIL_PHRASES = (
+    "^you've reached",
+    "^you have reached",
+    "^the person you are calling",
+    "^the person you're calling",
+    "^the party you are trying to reach",
+    "^the number you have dialed",
+    "^the mailbox is full",
+    "^your call has been forwarded",
+    "leave a message after",
+    "leave your message after",
+    "leave your name and number",
+    "at the tone",
+    "after the tone",
+    "at the beep",
+    "after the beep",
+    "record your message",
+    "unable to take your call",
+)
+
+
+def load_phrases(path: Path) -> list[str]:
+    """
+    Load a phrase set, one phrase per line, ignoring blanks and # comments.
+    Start a phrase with "^" to match it only at the start of the greeting.
+    """
+    lines = Path(path).read_text().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+class VoicemailDetector:
+    """
+    Detects answering machines from the greeting's transcript or the beep.
+
+    Transcripts are matched against a phrase set with a single precompiled regex,
+    so a detection costs microseconds per STT event. Phrases are greeting
+    openers anchored at the start of the transcript, or recording cues, never
+    single words a live person could say. The detector is only meant for the
+    greeting: the caller disarms it once it answers the first turn, and a
+    voicemail missed here is left to the LLM's voicemail tool.
+
+    Once a phrase is heard the detector is `detected`, and the caller waits for
+    the beep (or the end of the greeting) before leaving the message. A beep
+    heard first is a detection on its own.
+    """
+
+    def __init__(
+        self,
+        phrases: Iterable[str] = DEFAULT_VOICEMAIL_PHRASES,
+        detect_beep: bool = True,
+        beep_min_duration: float = 0.2,
+        beep_frequency_range: tuple[float, float] = (400.0, 2500.0),
+        beep_tonality: float = 0.6,
+    ):
+        phrases = sorted((p.lower().strip() for p in phrases), key=len, reverse=True)
+        greetings = [p[1:].strip() for p in phrases if p.startswith("^")]
+        cues = [p for p in phrases if p and not p.startswith("^")]
+        alternatives = []
+        if greetings:
+            alternatives.append(
+                r"^\W*(?:(?:hi|hello|hey)\b\W*)?("
+                + "|".join(re.escape(p) for p in greetings)
+                + r")\b"
+            )
+        if cues:
+            alternatives.append(r"\b(" + "|".join(re.escape(p) for p in cues) + r")\b")
+        self._pattern = re.compile("|".join(alternatives) or r"(?!)")
+        self.armed = True
+        self.detect_beep = detect_beep
+        self.beep_min_duration = beep_min_duration
+        self.beep_frequency_range = beep_frequency_range
+        self.beep_tonality = beep_tonality
+        self._tone_duration = 0.0
+        self._tone_frequency: float | None = None
+        self.matched_phrase: str | None = None
+        self.detected_at: float | None = None
+        self.beep_at: float | None = None
+
+    @property
+    def detected(self) -> bool:
+        return self.matched_phrase is not None or self.beep_at is not None
+
+    def disarm(self) -> None:
+        """Stop detecting, once the greeting is over and a person was answered."""
+        self.armed = False
+
+    def feed_transcript(self, text: str) -> bool:
+        """
+        Match a (partial or final) transcript against the phrase set.
+
+        Returns:
+            True the first time a voicemail phrase is matched
+        """
+        if self.matched_phrase is not None or not self.armed:
+            return False
+        match = self._pattern.search(text.lower().replace("’", "'"))
+        if match is None:
+            return False
+        self.matched_phrase = next(group for group in match.groups() if group)
+        self.detected_at = time.perf_counter()
+        return True
+
+    def feed_audio(self, frame: rtc.AudioFrame) -> bool:
+        """
+        Look for a sustained pure tone (the record beep) in an audio frame.
+
+        Returns:
+            True the first time a beep is heard
+        """
+        if not self.detect_beep or self.beep_at is not None:
+            return False
+        if not self.armed and self.matched_phrase is None:
+            return False
+
+        samples = np.frombuffer(frame.data, dtype=np.int16)
+        if frame.num_channels > 1:
+            samples = samples.reshape(-1, frame.num_channels).mean(axis=1)
+        samples = samples.astype(np.float32)
+        duration = len(samples) / frame.sample_rate
+
+        spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples)))) ** 2
+        total = spectrum.sum()
+        peak = int(spectrum.argmax())
+        frequency = peak * frame.sample_rate / len(samples)
+        # Energy in the peak bin and its neighbours vs the whole frame
+        tonality = spectrum[max(peak - 2, 0) : peak + 3].sum() / total if total else 0
+
+        low, high = self.beep_frequency_range
+        is_tone = (
+            tonality >= self.beep_tonality
+            and low <= frequency <= high
+            and np.sqrt(np.mean(samples**2)) > 500
+        )
+        if is_tone and (
+            self._tone_frequency is None
+            or abs(frequency - self._tone_frequency) <= 0.05 * self._tone_frequency
+        ):
+            self._tone_frequency = self._tone_frequency or frequency
+            self._tone_duration += duration
+        else:
+            self._tone_frequency = frequency if is_tone else None
+            self._tone_duration = duration if is_tone else 0.0
+
+        if self._tone_duration >= self.beep_min_duration:
+            self.beep_at = time.perf_counter()
+            return True
+        return False
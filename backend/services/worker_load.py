@@ -0,0 +1,106 @@
+"""
+Load score reported by the worker to LiveKit for job dispatch.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any
+
+import psutil
+from livekit.agents.utils import hw
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerLoad:
+    """
+    load_fnc for WorkerOptions combining sessions, child process CPU and loop lag.
+
+    Each component is normalized so that 1.0 means saturated:
+    - active sessions / max_sessions
+    - CPU used by all of the worker's child processes over the available CPUs:
+      the job processes, with their VAD, STT and TTS streams and LLM calls, and
+      the inference process running the turn detector
+    - lag of the main event loop, which routes every turn detector request
+      between the job processes and the inference process, / max_loop_lag
+
+    The score is the most saturated component, averaged over the last `window`
+    samples so a single spike doesn't take the worker out of rotation.
+
+    The worker calls it from a thread of its event loop's executor every
+    `interval` seconds, timed by the loop, so the loop lag is how much later
+    than that each call arrives.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 8,
+        max_loop_lag: float = 0.1,
+        window: int = 5,
+        interval: float = 0.5,
+    ):
+        self.max_sessions = max_sessions
+        self.max_loop_lag = max_loop_lag
+        self.interval = interval
+        self._samples: deque[float] = deque(maxlen=window)
+        # Created on first use, in the worker process
+        self._process: psutil.Process | None = None
+        self._cpu_count = 0.0
+        self._child_cpu_times: dict[int, float] = {}
+        self._sampled_at = 0.0
+        self._called_at: float | None = None
+        self.components: dict[str, float] = {}
+
+    def __call__(self, worker: Any) -> float:
+        sessions = len(worker.active_jobs) / self.max_sessions
+        child_cpu = self._child_cpu()
+        lag = self._loop_lag() / self.max_loop_lag
+        self.components = {
+            "sessions": sessions,
+            "child_cpu": child_cpu,
+            "loop_lag": lag,
+        }
+        self._samples.append(min(max(sessions, child_cpu, lag), 1.0))
+        load = sum(self._samples) / len(self._samples)
+        logger.debug(
+            f"WORKER LOAD: {load:.2f} sessions={sessions:.2f} "
+            f"child_cpu={child_cpu:.2f} loop_lag={lag:.2f}"
+        )
+        return load
+
+    def _child_cpu(self) -> float:
+        """Share of the available CPUs used by child processes since the last call."""
+        if self._process is None:
+            self._process = psutil.Process()
+            self._cpu_count = hw.get_cpu_monitor().cpu_count()
+            self._sampled_at = time.monotonic()
+
+        cpu_times: dict[int, float] = {}
+        for child in self._process.children(recursive=True):
+            try:
+                times = child.cpu_times()
+            except psutil.Error:
+                continue
+            cpu_times[child.pid] = times.user + times.system
+        now = time.monotonic()
+
+        # Processes started since the last call used all of their CPU time since then
+        used = sum(
+            total - self._child_cpu_times.get(pid, 0.0)
+            for pid, total in cpu_times.items()
+        )
+        elapsed = now - self._sampled_at
+        self._child_cpu_times = cpu_times
+        self._sampled_at = now
+        if elapsed <= 0:
+            return 0.0
+        return used / (elapsed * self._cpu_count)
+
+    def _loop_lag(self) -> float:
+        """How much later than `interval` after the previous call this one came."""
+        now = time.monotonic()
+        called_at, self._called_at = self._called_at, now
+        if called_at is None:
+            return 0.0
+        return max(now - called_at - self.interval, 0.0)